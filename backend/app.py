@@ -1,29 +1,74 @@
-from flask import Flask, request, jsonify
+import time
+from startup_report import StartupTimer
+# Created before the other imports so they are timed too
+startup = StartupTimer()
+
+from flask import Flask, Response, g, request, jsonify, send_file
 from flask_cors import CORS
-import requests
+import jwt as pyjwt
+startup.mark('flask')
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_batch
+startup.mark('psycopg2')
 import os
 from dotenv import load_dotenv
-import openai
-import bcrypt
-import jwt as pyjwt
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from functools import wraps
-import time
+import hmac
 import json
+import threading
+import csv
+import io
+import math
+import re
+import tempfile
+from urllib.parse import urlsplit
+from json_provider import OrjsonProvider, Rows, dumps_bytes, split_rows
+from categorizer import FOOD_CATEGORIES, categorizer_stats, local_category
+from product_catalog import copy_buffer, goupc_to_product
+import shelf_life
+from gtin import canonical_upc, display_gtin, normalize_gtin, upc_keys
+from single_flight import SingleFlight
+from refresher import BackgroundRefresher
+from http_client import HttpClient, UpstreamError
+from image_cache import ImageCache, make_thumbnail
+from write_behind import WriteBehindQueue
+from query_stats import CountingConnection, begin_request, current_stats, query_budget
+from db_router import ReplicaRouter
+from password_hashing import HashingBusy, PasswordHasher
+from pantry_snapshots import SnapshotCache
+from pantry_feed import ChangeFeed, FeedFull
+from product_cache import ProductCache
+from offline_catalog import catalog_product, catalog_stats
+from pg_listener import PgListener
+startup.mark('app modules')
+# openai and requests are imported on first use: see openai_client() and
+# HttpClient
 
 load_dotenv()
+startup.mark('dotenv')
 
 app = Flask(__name__)
+if os.getenv('JSON_PROVIDER', 'orjson') == 'orjson':
+    app.json = OrjsonProvider(app)
 
-# Configure OpenAI and Go-UPC API keys
-openai.api_key = os.getenv('OPENAI_API_KEY')
+# Go-UPC API key; the OpenAI client reads OPENAI_API_KEY itself
 GOUPC_API_KEY = os.getenv('GOUPC_API_KEY')
 
 # Rate limiting configuration for Go-UPC API (2 requests per second)
 RATE_LIMIT_REQUESTS = 1  # requests per second
 RATE_LIMIT_WINDOW = 1  # second
+
+# Keep-alive connections to Go-UPC, one pool per worker
+goupc_client = HttpClient(
+    pool_size=int(os.getenv('GOUPC_POOL_SIZE', '8')),
+    connect_timeout=float(os.getenv('GOUPC_CONNECT_TIMEOUT', '3.05')),
+    read_timeout=float(os.getenv('GOUPC_READ_TIMEOUT', '10')),
+    max_attempts=int(os.getenv('GOUPC_MAX_ATTEMPTS', '3')),
+    deadline=float(os.getenv('GOUPC_DEADLINE', '20')),
+    hedge_after=float(os.getenv('GOUPC_HEDGE_AFTER_MS', '0')) / 1000,
+    name='goupc'
+)
 last_request_time = None
 request_count = 0
 
@@ -31,29 +76,40 @@ request_count = 0
 JWT_SECRET = os.getenv('JWT_SECRET', 'your-secret-key')
 JWT_EXPIRATION_HOURS = 24
 
-client = openai.OpenAI()
-
-# Predefined food categories
-FOOD_CATEGORIES = [
-    "Fruits & Vegetables",
-    "Meat & Seafood",
-    "Dairy & Eggs",
-    "Bread & Bakery",
-    "Pantry Staples",
-    "Snacks",
-    "Beverages",
-    "Frozen Foods",
-    "Canned Goods",
-    "Condiments & Sauces",
-    "Baking Supplies",
-    "Breakfast Foods",
-    "Pasta & Rice",
-    "Herbs & Spices",
-    "Ready-to-Eat Meals",
-    "Baby Food & Formula",
-    "Pet Food",
-    "Other"
-]
+# bcrypt runs on its own small pool so login bursts cannot starve other routes
+password_hasher = PasswordHasher(
+    max_workers=int(os.getenv('BCRYPT_THREADS', '2')),
+    max_queue=int(os.getenv('BCRYPT_QUEUE', '32')),
+    rounds=int(os.getenv('BCRYPT_ROUNDS', '0')) or None,
+    target_ms=float(os.getenv('BCRYPT_TARGET_MS', '250')),
+    min_rounds=int(os.getenv('BCRYPT_MIN_ROUNDS', '10'))
+)
+
+def hashing_busy_response():
+    response = jsonify({
+        'success': False,
+        'error': 'Server is busy, please try again',
+        'status': 'SERVER_BUSY'
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# OpenAI client, built on first use: importing openai takes longer than the
+# rest of the app together, and most requests never call GPT
+_openai_client = None
+_openai_lock = threading.Lock()
+
+def openai_client():
+    """The OpenAI client, importing openai on the first call in this process"""
+    global _openai_client
+    if _openai_client is None:
+        with _openai_lock:
+            if _openai_client is None:
+                started = time.perf_counter()
+                import openai
+                _openai_client = openai.OpenAI()
+                startup.record_lazy('openai', started)
+    return _openai_client
 
 # Enable CORS for all routes with specific configuration
 CORS(app, 
@@ -66,12 +122,36 @@ CORS(app,
              ],
              "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
              "allow_headers": ["Content-Type", "Accept", "Authorization"],
+             # Read by the pantry feed client when the server is busy
+             "expose_headers": ["Retry-After"],
              "supports_credentials": True,
              "max_age": 3600
          }
      })
 
 # Authentication decorator
+@app.before_request
+def start_query_stats():
+    begin_request()
+    if startup.first_request():
+        print(startup.summary())
+
+@app.after_request
+def report_query_stats(response):
+    """SQL statements and time spent on them, for tests and load checks"""
+    stats = current_stats()
+    if stats:
+        response.headers['X-SQL-Statements'] = str(stats['statements'])
+        response.headers['X-SQL-Time-Ms'] = f"{stats['seconds'] * 1000:.1f}"
+    return response
+
+@app.after_request
+def note_user_write(response):
+    """Keep a user who just changed something reading from the primary"""
+    if replica_router and request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400:
+        replica_router.note_write(g.get('current_user_id'))
+    return response
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -90,7 +170,11 @@ def token_required(f):
             
         try:
             data = pyjwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+            if data.get('scope'):
+                # Narrow tokens such as pantry event tickets are not logins
+                raise pyjwt.InvalidTokenError("scoped token")
             current_user_id = data['user_id']
+            g.current_user_id = current_user_id
             
             # Verify user exists in database
             conn = get_db_connection()
@@ -131,9 +215,85 @@ def token_required(f):
     
     return decorated
 
-def get_days_to_expire(product_data):
-    """Get the days to expire for a product
-    call openai to get the days to expire for a product"""
+# Shelf life learned from user edits, cached per worker: {upc: (days, expires_at)}
+SHELF_LIFE_MIN_OBSERVATIONS = int(os.getenv('SHELF_LIFE_MIN_OBSERVATIONS', '2'))
+SHELF_LIFE_CACHE_SECONDS = 600
+learned_shelf_life = {}
+learned_shelf_life_lock = threading.Lock()
+
+def get_learned_shelf_life(upc):
+    """Average days between purchase and expiry that users set for this product, or None"""
+    upc = canonical_upc(upc)
+    if not upc:
+        return None
+    now = time.time()
+    with learned_shelf_life_lock:
+        cached = learned_shelf_life.get(upc)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    days = None
+    conn = get_db_connection()
+    if conn:
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT round(totalDays::numeric / observations) FROM productShelfLife "
+                "WHERE productUPC = %s AND observations >= %s",
+                (upc, SHELF_LIFE_MIN_OBSERVATIONS)
+            )
+            row = cur.fetchone()
+            cur.close()
+            days = int(row[0]) if row else None
+        except Exception as e:
+            print(f"Error reading learned shelf life: {e}")
+        finally:
+            conn.close()
+
+    with learned_shelf_life_lock:
+        if len(learned_shelf_life) > 10000:
+            learned_shelf_life.clear()
+        learned_shelf_life[upc] = (days, now + SHELF_LIFE_CACHE_SECONDS)
+    return days
+
+# Learns from an expiration date a user entered for a pantry item. Appended
+# to the UPDATE in update_pantry_item, which it reads as the "updated" CTE.
+# The edit form sends the date with every save, so only a date that differs
+# from the stored one is learned; otherwise every quantity edit would record
+# our own estimate as an observation. The join reads usersProducts from the
+# statement's snapshot, i.e. the row as it was before the UPDATE.
+LEARN_SHELF_LIFE_SQL = """
+    learned AS (
+        INSERT INTO productShelfLife (productUPC, observations, totalDays)
+        SELECT updated.productUPC, 1, updated.expiration_date - updated.date_purchased
+        FROM updated
+        JOIN usersProducts previous
+            ON previous.pantryID = updated.pantryID AND previous.userID = updated.userID
+        WHERE updated.expiration_date IS DISTINCT FROM previous.expiration_date
+          AND updated.expiration_date - updated.date_purchased BETWEEN 1 AND 3650
+        ON CONFLICT (productUPC) DO UPDATE SET
+            observations = productShelfLife.observations + 1,
+            totalDays = productShelfLife.totalDays + EXCLUDED.totalDays
+    )
+"""
+
+def forget_learned_shelf_life(upc):
+    with learned_shelf_life_lock:
+        learned_shelf_life.pop(upc, None)
+
+def get_days_to_expire(product_data, category=None):
+    """Get the days to expire for a product.
+
+    Uses, in order: what users have entered for this product, the shelf-life
+    rules in shelf_life.py, and only then GPT for products no rule covers.
+    """
+    learned = get_learned_shelf_life(product_data.get('upc'))
+    if learned:
+        return str(learned)
+    days = shelf_life.rule_days(product_data, category)
+    if days:
+        return days
+
     try:
         prompt = f"""You are a food expiration expert. Your task is to analyze product information and output ONLY a number representing days until expiry, or "n/a" for non-perishable items.
         Rules:
@@ -153,13 +313,13 @@ def get_days_to_expire(product_data):
 
         Remember: Output ONLY a number or "n/a". No other text."""
 
-        response = openai.chat.completions.create(
+        response = openai_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a precise food expiration expert, creating data for analysis. You only respond with numbers or 'n/a'."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=1,
+            temperature=0,
             max_tokens=10
         )
         return response.choices[0].message.content.strip()
@@ -167,57 +327,314 @@ def get_days_to_expire(product_data):
         print(f"Error getting days to expire: {e}")
         return "n/a"  # Fail safe default
 
+class PooledConnection(CountingConnection):
+    """Connection whose close() hands it back to the worker pool"""
+    pool = None
+
+    def close(self):
+        if self.pool is None or self.closed:
+            return super().close()
+        self.pool.release(self)
+
+class ConnectionPool:
+    """Per-worker pool of idle Postgres connections, safe across gthread threads"""
+
+    def __init__(self, params, max_idle):
+        self.params = params
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if not conn.closed:
+                    return conn
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self.params)
+        conn.pool = self
+        return conn
+
+    def release(self, conn):
+        try:
+            # Never hand out a connection with a half-finished transaction
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+        with self._lock:
+            if any(idle is conn for idle in self._idle):
+                return  # closed twice
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        conn.pool = None
+        if not conn.closed:
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+# Set per worker by init_worker(); None means one fresh connection per call
+db_pool = None
+# Set per worker by init_worker() when DB_REPLICA_URLS lists read replicas
+replica_router = None
+
+def get_db_connection_params():
+    """Connection keyword arguments for the current environment"""
+    # Check if running on Railway
+    if os.getenv('RAILWAY_ENVIRONMENT'):
+        # Use Railway's provided DATABASE_URL if available
+        database_url = os.getenv('DATABASE_URL')
+        if database_url:
+            return {'dsn': database_url}
+
+        # If DATABASE_URL is not available, use individual Railway PostgreSQL environment variables
+        return {
+            'dbname': os.getenv('PGDATABASE'),
+            'user': os.getenv('PGUSER'),
+            'password': os.getenv('PGPASSWORD'),
+            'host': os.getenv('PGHOST'),
+            'port': os.getenv('PGPORT', '5432')  # Ensure port is a string
+        }
+
+    # Local development environment
+    return {
+        'dbname': os.getenv('DB_NAME', 'pantrydatabase'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', 'postgres'),
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
 def get_db_connection():
     try:
-        # Check if running on Railway
-        if os.getenv('RAILWAY_ENVIRONMENT'):
-            # Use Railway's provided DATABASE_URL if available
-            database_url = os.getenv('DATABASE_URL')
-            if database_url:
-                conn = psycopg2.connect(database_url)
-                return conn
-            
-            # If DATABASE_URL is not available, use individual Railway PostgreSQL environment variables
-            conn = psycopg2.connect(
-                dbname=os.getenv('PGDATABASE'),
-                user=os.getenv('PGUSER'),
-                password=os.getenv('PGPASSWORD'),
-                host=os.getenv('PGHOST'),
-                port=os.getenv('PGPORT', '5432')  # Ensure port is a string
-            )
-            return conn
-        else:
-            # Local development environment
-            conn = psycopg2.connect(
-                dbname=os.getenv('DB_NAME', 'pantrydatabase'),
-                user=os.getenv('DB_USER', 'postgres'),
-                password=os.getenv('DB_PASSWORD', 'postgres'),
-                host=os.getenv('DB_HOST', 'localhost'),
-                port=os.getenv('DB_PORT', '5432')
-            )
-            return conn
+        if db_pool:
+            return db_pool.acquire()
+        return psycopg2.connect(connection_factory=PooledConnection, **get_db_connection_params())
     except Exception as e:
         print(f"Database connection error: {e}")
         return None
 
-def find_product_in_db(upc):
-    """Check if product exists in database"""
+def get_read_connection(user_id=None, primary=False):
+    """Connection for read-only queries: a healthy replica if there is one.
+
+    Reads by a user who has just written, and reads passed ``primary=True``,
+    go to the primary.
+    """
+    if replica_router and not primary:
+        conn = replica_router.acquire(user_id)
+        if conn:
+            return conn
+    elif replica_router:
+        replica_router.count_primary()
+    return get_db_connection()
+
+def on_pantry_changed(payload):
+    # Sent by the usersProducts trigger from any worker (migration 005);
+    # None means the listener reconnected and may have missed some
+    if payload is None:
+        pantry_snapshots.clear()
+        pantry_feed.publish_all()
+        return
+    pantry_snapshots.invalidate_user(int(payload))
+    pantry_feed.publish(int(payload))
+    if replica_router:
+        replica_router.note_write(int(payload))
+
+def init_worker(pool_size=None, feed_streams=None):
+    """Set up per-process state after a gunicorn fork.
+
+    Sockets and HTTP clients created in the master before the fork must not be
+    shared between workers, so each worker builds its own.
+    """
+    global _openai_client, db_pool, replica_router, last_request_time, request_count, pg_listener
+    startup.worker_start()
+    # Rebuilt on first use in this worker
+    _openai_client = None
+    last_request_time = None
+    request_count = 0
+    if pool_size is None:
+        pool_size = int(os.getenv('DB_POOL_SIZE', '4'))
+    if feed_streams is not None:
+        pantry_feed.max_subscribers = feed_streams
+    if db_pool:
+        db_pool.close_all()
+    db_pool = ConnectionPool(get_db_connection_params(), pool_size) if pool_size > 0 else None
+    if replica_router:
+        replica_router.close_all()
+    replica_urls = [url.strip() for url in os.getenv('DB_REPLICA_URLS', '').split(',') if url.strip()]
+    replica_router = ReplicaRouter(
+        [(f'replica-{i}', ConnectionPool({'dsn': url}, max(pool_size, 1))) for i, url in enumerate(replica_urls)],
+        max_lag=float(os.getenv('DB_REPLICA_MAX_LAG', '5')),
+        sticky_seconds=float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'))
+    ) if replica_urls else None
+    product_cache.clear()
+    pg_listener = PgListener(get_db_connection_params())
+    pg_listener.subscribe(PRODUCT_CHANGED_CHANNEL, on_product_changed)
+    pg_listener.subscribe(PANTRY_CHANGED_CHANNEL, on_pantry_changed)
+    pg_listener.start()
+
+def shutdown_worker():
+    """Release per-process resources when a worker exits"""
+    global db_pool, replica_router
+    # Queued product writes need the pool, so they go first
+    if not product_writer.flush(float(os.getenv('PRODUCT_WRITE_FLUSH_TIMEOUT', '10'))):
+        print(f"Worker {os.getpid()} exiting with {product_writer.stats()['queue_depth']} product write(s) unflushed")
+    if db_pool:
+        db_pool.close_all()
+        db_pool = None
+    if replica_router:
+        replica_router.close_all()
+        replica_router = None
+    goupc_client.close()
+    image_client.close()
+
+def warm_up():
+    """Prime connections before the worker accepts traffic"""
+    started = time.time()
+    warm = int(os.getenv('DB_POOL_WARM', '2'))
+    conns = []
     try:
-        conn = get_db_connection()
+        for _ in range(warm):
+            conn = get_db_connection()
+            if not conn:
+                break
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conns.append(conn)
+    finally:
+        for conn in conns:
+            conn.close()
+    password_hasher.rounds  # calibrate the bcrypt cost now rather than on the first login
+    if os.getenv('OPENAI_WARM', 'true').lower() == 'true':
+        # Off the boot path, but usually ready before the first GPT call
+        threading.Thread(target=openai_client, name='openai-warm', daemon=True).start()
+    preloaded = preload_product_cache(int(os.getenv('PRODUCT_CACHE_PRELOAD', '1000')))
+    print(f"Worker {os.getpid()} warmed up {len(conns)} DB connection(s) and {preloaded} product(s) "
+          f"in {(time.time() - started) * 1000:.0f} ms")
+
+# Hot products, cached per worker. Every write to products sends NOTIFY
+# product_changed with the UPC (or '*' after bulk changes), and each worker's
+# listener drops that entry, so workers never serve a product another changed.
+PRODUCT_CHANGED_CHANNEL = 'product_changed'
+PANTRY_CHANGED_CHANNEL = 'pantry_changed'
+product_cache = ProductCache(int(float(os.getenv('PRODUCT_CACHE_MB', '32')) * 1024 * 1024))
+# Started by init_worker(); the dev server runs one process and needs none
+pg_listener = None
+
+def notify_product_changed(cur, upc):
+    """Tell every worker to drop ``upc`` (or everything for '*') once the transaction commits"""
+    cur.execute("SELECT pg_notify(%s, %s)", (PRODUCT_CHANGED_CHANNEL, str(upc)))
+
+def on_product_changed(payload):
+    # None means the listener reconnected and may have missed notifications
+    if payload is None or payload == '*':
+        product_cache.clear()
+        pantry_snapshots.clear()
+    else:
+        forget_product(int(payload))
+
+def forget_product(upc):
+    """Drop everything this worker cached about a product"""
+    product_cache.invalidate(upc)
+    pantry_snapshots.invalidate_upc(upc)
+
+def preload_product_cache(limit):
+    """Fill the product cache with the products most often in pantries"""
+    if limit <= 0:
+        return 0
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        # Least popular first, so if the cap is hit the LRU evicts those
+        cur.execute("""
+            SELECT p.*
+            FROM products p
+            JOIN (
+                SELECT productUPC, count(*) AS uses
+                FROM usersProducts
+                GROUP BY productUPC
+                ORDER BY uses DESC
+                LIMIT %s
+            ) top USING (productUPC)
+            ORDER BY top.uses
+        """, (limit,))
+        generation = product_cache.generation
+        rows = cur.fetchall()
+        cur.close()
+        for row in rows:
+            product_cache.put(row['productupc'], row, generation)
+        return len(rows)
+    except psycopg2.Error as e:
+        print(f"Product cache preload failed: {e}")
+        return 0
+    finally:
+        conn.close()
+
+def find_product_in_db(upc, primary=False):
+    """Check if product exists in database (a replica unless ``primary``).
+
+    Tries the code's own digits before its canonical key (see upc_keys).
+    """
+    keys = upc_keys(upc)
+    if not keys:
+        return None, None
+    for key in keys:
+        cached = product_cache.get(key)
+        if cached:
+            return cached.as_row(), None
+    if PRODUCT_WRITE_BEHIND:
+        product_writer.wait_for(keys[-1], PRODUCT_WRITE_WAIT)
+    try:
+        # Taken before the query, so a row read before a concurrent
+        # invalidation is not cached after it
+        generation = product_cache.generation
+        conn = get_read_connection(primary=primary)
         if not conn:
             return None, "Database connection failed"
         
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("SELECT * FROM products WHERE productUPC = %s", (upc,))
+        cur.execute("""
+            SELECT * FROM products WHERE productUPC = ANY(%s)
+            ORDER BY productUPC = %s DESC LIMIT 1
+        """, (list(keys), keys[0]))
         product = cur.fetchone()
         cur.close()
         conn.close()
+        if product:
+            product_cache.put(product['productupc'], product, generation)
         return product, None
     except Exception as e:
         return None, str(e)
 
+# Where a stored productCategory came from (productCategorySource). Only
+# 'gpt' labels are used to train and evaluate the local classifier; the
+# others are its own answers, keyword rules, fallbacks or user input.
+CATEGORY_SOURCES = ('gpt', 'local', 'rules', 'fallback', 'user')
+
 def get_gpt_category(product_data):
-    """Use GPT to categorize a food product based on available information"""
+    """Use GPT to categorize a food product based on available information.
+
+    Obvious products are answered by the local classifier (categorizer.py);
+    GPT is only asked when it is not confident. Records where the answer
+    came from in product_data['categorySource'].
+    """
+    category = local_category(product_data)
+    if category:
+        product_data['categorySource'] = 'local'
+        return category
+
     try:
         # Construct a detailed prompt with product information
         product_info = f"""
@@ -237,7 +654,7 @@ Remember:
 2. Do not add any explanation or additional text
 3. If unsure, use the most specific category that fits, or 'Other' as last resort"""
 
-        response = openai.chat.completions.create(
+        response = openai_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a precise food categorization assistant. You only respond with exact category names from the provided list."},
@@ -251,11 +668,14 @@ Remember:
         
         # Validate the response is in our category list
         if category not in FOOD_CATEGORIES:
+            product_data['categorySource'] = 'fallback'
             return "Other"
             
+        product_data['categorySource'] = 'gpt'
         return category
     except Exception as e:
         print(f"GPT categorization error: {e}")
+        product_data['categorySource'] = 'fallback'
         return "Other"
 
 def map_category(category, product_data):
@@ -263,86 +683,122 @@ def map_category(category, product_data):
     category = category.lower()
     return get_gpt_category(product_data)
 
+PRODUCT_UPSERT_SQL = """
+    INSERT INTO products (
+        productUPC, productName, productDescription, productBrand,
+        productCategory, productLowestPrice, productHighestPrice,
+        productCurrency, productImages, productModel, productColor,
+        productSize, productDimension, productWeight, productCategorySource,
+        productFetchedAt, productEnrichedAt
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, now(), now())
+    ON CONFLICT (productUPC) DO UPDATE SET
+        productName = EXCLUDED.productName,
+        productDescription = EXCLUDED.productDescription,
+        productBrand = EXCLUDED.productBrand,
+        productCategory = EXCLUDED.productCategory,
+        productLowestPrice = EXCLUDED.productLowestPrice,
+        productHighestPrice = EXCLUDED.productHighestPrice,
+        productCurrency = EXCLUDED.productCurrency,
+        productImages = EXCLUDED.productImages,
+        productModel = EXCLUDED.productModel,
+        productColor = EXCLUDED.productColor,
+        productSize = EXCLUDED.productSize,
+        productDimension = EXCLUDED.productDimension,
+        productWeight = EXCLUDED.productWeight,
+        productCategorySource = EXCLUDED.productCategorySource,
+        productFetchedAt = EXCLUDED.productFetchedAt,
+        productEnrichedAt = EXCLUDED.productEnrichedAt
+"""
+
+def product_params(product_data):
+    """PRODUCT_UPSERT_SQL parameters for a product in our format"""
+    # add_expiry_estimate has usually categorised it already; only
+    # categorise again when the category is still Go-UPC's own
+    mapped_category = product_data.get('category') or ''
+    if mapped_category not in FOOD_CATEGORIES:
+        mapped_category = map_category(mapped_category, product_data)
+    
+    return (
+        product_data.get('upc', ''),
+        product_data.get('title', ''),
+        product_data.get('description', '')[:515] if product_data.get('description') else '',
+        product_data.get('brand', ''),
+        mapped_category,
+        float(product_data.get('lowest_recorded_price', 0.0)),
+        float(product_data.get('highest_recorded_price', 0.0)),
+        product_data.get('currency', 'USD'),
+        product_data.get('images', []),
+        product_data.get('model', ''),
+        product_data.get('color', ''),
+        product_data.get('size', ''),
+        product_data.get('dimension', ''),
+        product_data.get('weight', ''),
+        product_data.get('categorySource')
+    )
+
+def write_products(rows):
+    """Upsert product_params() tuples in one transaction and tell every worker"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    upcs = [canonical_upc(row[0]) for row in rows]
+    try:
+        cur = conn.cursor()
+        execute_batch(cur, PRODUCT_UPSERT_SQL, rows)
+        for upc in upcs:
+            notify_product_changed(cur, upc)
+        conn.commit()
+        cur.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    for upc in upcs:
+        forget_product(upc)
+
 def save_product_to_db(product_data):
     """Save product to database"""
     try:
         print(f"Attempting to save product data: {product_data}")  # Debug log
-        conn = get_db_connection()
-        if not conn:
-            return False, "Database connection failed"
-        
-        # Map the category with enhanced food categorization
-        raw_category = product_data.get('category', '')
-        mapped_category = map_category(raw_category, product_data)
-        
-        # Extract values with detailed logging
-        upc = product_data.get('upc', '')
-        title = product_data.get('title', '')
-        description = product_data.get('description', '')[:515] if product_data.get('description') else ''
-        brand = product_data.get('brand', '')
-        lowest_price = float(product_data.get('lowest_recorded_price', 0.0))
-        highest_price = float(product_data.get('highest_recorded_price', 0.0))
-        currency = product_data.get('currency', 'USD')
-        images = product_data.get('images', [])
-        model = product_data.get('model', '')
-        color = product_data.get('color', '')
-        size = product_data.get('size', '')
-        dimension = product_data.get('dimension', '')
-        weight = product_data.get('weight', '')
-
+        params = product_params(product_data)
+        
         print(f"Processed values for DB insert:")  # Debug log
-        print(f"UPC: {upc}")
-        print(f"Title: {title}")
-        print(f"Brand: {brand}")
-        print(f"Category: {mapped_category}")
+        print(f"UPC: {params[0]}")
+        print(f"Title: {params[1]}")
+        print(f"Brand: {params[3]}")
+        print(f"Category: {params[4]}")
         
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO products (
-                productUPC, productName, productDescription, productBrand,
-                productCategory, productLowestPrice, productHighestPrice,
-                productCurrency, productImages, productModel, productColor,
-                productSize, productDimension, productWeight
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (productUPC) DO UPDATE SET
-                productName = EXCLUDED.productName,
-                productDescription = EXCLUDED.productDescription,
-                productBrand = EXCLUDED.productBrand,
-                productCategory = EXCLUDED.productCategory,
-                productLowestPrice = EXCLUDED.productLowestPrice,
-                productHighestPrice = EXCLUDED.productHighestPrice,
-                productCurrency = EXCLUDED.productCurrency,
-                productImages = EXCLUDED.productImages,
-                productModel = EXCLUDED.productModel,
-                productColor = EXCLUDED.productColor,
-                productSize = EXCLUDED.productSize,
-                productDimension = EXCLUDED.productDimension,
-                productWeight = EXCLUDED.productWeight
-        """, (
-            upc,
-            title,
-            description,
-            brand,
-            mapped_category,
-            lowest_price,
-            highest_price,
-            currency,
-            images,
-            model,
-            color,
-            size,
-            dimension,
-            weight
-        ))
-        conn.commit()
-        cur.close()
-        conn.close()
+        write_products([params])
         return True, None
     except Exception as e:
         print(f"Failed to cache product: {str(e)}")
         print(f"Full product data that caused error: {product_data}")  # Debug log
         return False, str(e)
 
+# Write-behind for products found on Go-UPC or in the offline catalog:
+# lookup_upc answers once the product is enriched and the upsert happens in
+# batches in the background. Off by default, since a product is briefly
+# missing from the database after it is first shown.
+PRODUCT_WRITE_BEHIND = os.getenv('PRODUCT_WRITE_BEHIND', 'false').lower() == 'true'
+# How long a read of a product still queued waits for its write
+PRODUCT_WRITE_WAIT = float(os.getenv('PRODUCT_WRITE_WAIT', '2'))
+product_writer = WriteBehindQueue(
+    write_products,
+    max_pending=int(os.getenv('PRODUCT_WRITE_QUEUE', '1000')),
+    batch_size=int(os.getenv('PRODUCT_WRITE_BATCH', '50')),
+    linger=float(os.getenv('PRODUCT_WRITE_LINGER_MS', '50')) / 1000,
+    # A row the database rejects is dropped on its own, not with its batch
+    permanent_errors=(psycopg2.DataError, psycopg2.IntegrityError),
+    name='product-writer'
+)
+
+def queue_product_save(product_data):
+    """Hand a product to the write-behind queue; False if it must be saved inline"""
+    if not PRODUCT_WRITE_BEHIND:
+        return False
+    return product_writer.submit(canonical_upc(product_data.get('upc')), product_params(product_data))
+
 def call_upc_api(upc):
     """Call the Go-UPC API with rate limiting"""
     global last_request_time, request_count
@@ -371,13 +827,13 @@ def call_upc_api(upc):
         url = f'{base_url}/{upc}'
         print(f"Attempting API call with Bearer token to: {url}")  # Debug log
         
-        response = requests.get(
+        # Retries 429s and server errors itself, honouring Retry-After
+        response = goupc_client.get(
             url,
             headers={
                 'Authorization': f'Bearer {GOUPC_API_KEY}',
                 'Accept': 'application/json'
-            },
-            timeout=10
+            }
         )
         
         # Update rate limit tracking
@@ -389,40 +845,343 @@ def call_upc_api(upc):
         if response.status_code != 200:
             print(f"API Error Response: {response.text}")
         
-        if response.status_code == 429:
-            # If rate limited, wait and retry once
-            time.sleep(RATE_LIMIT_WINDOW)
-            
-            # Retry the request
-            response = requests.get(
-                url,
-                headers={
-                    'Authorization': f'Bearer {GOUPC_API_KEY}',
-                    'Accept': 'application/json'
-                },
-                timeout=10
-            )
-            print(f"Retry Response Status: {response.status_code}")
-        
         return response
         
-    except requests.exceptions.RequestException as e:
+    except UpstreamError as e:
         print(f"API request error: {e}")
         return None
 
 def validate_upc(upc):
-    """Validate UPC format"""
+    """Validate a scanned barcode and return it in canonical form.
+
+    UPC-E, EAN-8, UPC-A, EAN-13 and GTIN-14 are accepted and check-digit
+    validated; every form of the same product returns the same UPC-A (or
+    EAN-13/GTIN-14) string, so they share one productUPC key.
+    """
+    gtin14, error = normalize_gtin(upc)
+    if not gtin14:
+        return False, error
+    return True, display_gtin(gtin14)
+
+def add_expiry_estimate(product_data, category=None):
+    """Set category, purchaseDate and expiryDate on a product for the review form.
+
+    Pass the stored category of an already-enriched product to skip
+    categorising it again.
+    """
+    gptCategory = category or get_gpt_category(product_data)
+    daysToExpire = get_days_to_expire(product_data, gptCategory)
+    currentDate = datetime.now().strftime("%Y-%m-%d")
+    
+    # Handle non-perishable items
+    if daysToExpire == "n/a":
+        # Set expiry date to 2 years from now for non-perishable items
+        expiryDate_ = (datetime.strptime(currentDate, "%Y-%m-%d") + timedelta(days=730)).strftime("%Y-%m-%d")
+    else:
+        expiryDate_ = (datetime.strptime(currentDate, "%Y-%m-%d") + timedelta(days=int(daysToExpire))).strftime("%Y-%m-%d")
+    
+    product_data["category"] = gptCategory
+    product_data["purchaseDate"] = currentDate
+    product_data["expiryDate"] = expiryDate_
+    return product_data
+
+def database_product_body(product):
+    """lookup_upc response for a product row from our database"""
+    # Normalize the data structure
+    normalized_product = {
+        "title": product["productname"],
+        "brand": product["productbrand"],
+        "category": product["productcategory"],
+        "description": product["productdescription"],
+        "lowest_recorded_price": product["productlowestprice"],
+        "highest_recorded_price": product["producthighestprice"],
+        "currency": product["productcurrency"],
+        "images": product["productimages"],
+        "model": product["productmodel"],
+        "color": product["productcolor"],
+        "size": product["productsize"],
+        "dimension": product["productdimension"],
+        "weight": product["productweight"],
+        "upc": product["productupc"]
+    }
+
+    # Serve what we have and refresh stale rows in the background. Products
+    # never enriched (bulk-loaded without --categorize, say) are categorised
+    # here, and the category saved, without asking Go-UPC again
+    stored_category = product["productcategory"] if product["productcategory"] in FOOD_CATEGORIES else None
+    add_expiry_estimate(normalized_product, stored_category)
+    if not stored_category or not product.get("productenrichedat"):
+        save_product_category(product["productupc"], normalized_product["category"],
+                              normalized_product.get("categorySource"))
+    if product_is_stale(product):
+        product_refresher.submit(product["productupc"])
+
+    return {
+        "success": True,
+        "source": "database",
+        "cached": True,
+        "items": [normalized_product],
+        "error": None,
+        "status": None,
+        "details": None
+    }
+
+# Stale-while-revalidate for cached products
+PRODUCT_FETCH_TTL = timedelta(days=int(os.getenv('PRODUCT_FETCH_TTL_DAYS', '30')))
+PRODUCT_ENRICH_TTL = timedelta(days=int(os.getenv('PRODUCT_ENRICH_TTL_DAYS', '90')))
+
+def product_is_stale(product):
+    """Whether a product row is due a background refresh from Go-UPC.
+
+    A row that was fetched but never enriched is not stale: it is enriched
+    locally by database_product_body.
+    """
+    # Made-up UPCs of manual entries are not on Go-UPC
+    if not normalize_gtin(str(product["productupc"]))[0]:
+        return False
+    now = datetime.now(timezone.utc)
+    fetched = product.get("productfetchedat")
+    enriched = product.get("productenrichedat")
+    return (not fetched or now - fetched > PRODUCT_FETCH_TTL
+            or bool(enriched and now - enriched > PRODUCT_ENRICH_TTL))
+
+def save_product_category(upc, category, source):
+    """Store a category computed for a product read from the database"""
+    conn = get_db_connection()
+    if not conn:
+        print(f"Could not save category for {upc}: database connection failed")
+        return
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE products
+            SET productCategory = %s, productCategorySource = %s, productEnrichedAt = now()
+            WHERE productUPC = %s
+        """, (category, source, upc))
+        notify_product_changed(cur, upc)
+        conn.commit()
+        cur.close()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Could not save category for {upc}: {e}")
+    finally:
+        conn.close()
+    forget_product(upc)
+
+def refresh_product(upc):
+    """Refetch a cached product from Go-UPC and re-enrich it (background thread)"""
+    upc = display_gtin(normalize_gtin(str(upc))[0])
+    response = call_upc_api(upc)
+    if response is None or response.status_code not in (200, 404):
+        raise RuntimeError(f"Go-UPC returned {getattr(response, 'status_code', 'no response')}")
+
+    api_data = response.json() if response.status_code == 200 else {}
+    if api_data.get('product'):
+        product_data = goupc_to_product(api_data)
+        product_data['upc'] = upc
+        success, save_error = save_product_to_db(product_data)
+        if not success:
+            raise RuntimeError(save_error)
+        return
+
+    # Gone from Go-UPC: keep our copy, but do not ask again until the TTL
+    # passes. There is nothing newer to enrich from either, so the enrichment
+    # clock restarts too; otherwise rows never enriched (legacy rows, manual
+    # add_product rows) would stay stale and queue a refresh on every scan
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE products SET productFetchedAt = now(), productEnrichedAt = now()
+            WHERE productUPC = %s
+        """, (canonical_upc(upc),))
+        notify_product_changed(cur, canonical_upc(upc))
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    forget_product(canonical_upc(upc))
+
+# Refreshes share Go-UPC's rate limit with user scans, so keep them slow
+product_refresher = BackgroundRefresher(
+    refresh_product,
+    max_pending=int(os.getenv('PRODUCT_REFRESH_QUEUE', '500')),
+    rate_per_second=float(os.getenv('PRODUCT_REFRESH_RATE', '0.2')),
+    name='product-refresher'
+)
+
+def fetch_product_from_api(upc):
+    """Look up a UPC missing from our database on Go-UPC, enrich and cache it.
+
+    Returns (response body, status code) for lookup_upc.
+    """
+    with upc_lookup_stats_lock:
+        upc_lookup_stats['upstream_fetches'] += 1
+    response = call_upc_api(upc)
+    
+    if not response:
+        return {
+            "success": False,
+            "source": "api",
+            "cached": False,
+            "items": None,
+            "error": "API request failed",
+            "status": "API_ERROR",
+            "details": "Failed to connect to UPC API"
+        }, 503
+        
+    if response.status_code != 200:
+        return {
+            "success": False,
+            "source": "api",
+            "cached": False,
+            "items": None,
+            "error": "UPC lookup failed",
+            "status": "API_ERROR",
+            "details": f"API returned status code: {response.status_code}"
+        }, response.status_code
+
+    api_data = response.json()
+    print(f"API Response data: {api_data}")  # Debug log
+    
+    # If API found the product, save it to our database
+    if api_data.get('product'):
+        # Transform Go-UPC response format to our format
+        product_data = goupc_to_product(api_data)
+        product_data['upc'] = upc  # canonical form, whatever Go-UPC echoes back
+        return found_product_body(product_data, "api"), 200
+    
+    # If API didn't find the product
+    print("API found no items for this UPC")  # Debug log
+    return {
+        "success": False,
+        "source": "api",
+        "cached": False,
+        "items": None,
+        "error": "Product not found",
+        "status": "NOT_FOUND",
+        "details": None
+    }, 404
+
+def found_product_body(product_data, source):
+    """Enrich a product new to our database, cache it and build the lookup_upc response"""
+    add_expiry_estimate(product_data)
+    
+    print(f"Transformed product data: {product_data}")  # Debug log
+    if queue_product_save(product_data):
+        success, save_error = True, None
+    else:
+        success, save_error = save_product_to_db(product_data)
+    
+    if not success:
+        print(f"Failed to cache product: {save_error}")
+        return {
+            "success": True,
+            "source": source,
+            "cached": False,
+            "items": [product_data],
+            "error": None,
+            "status": None,
+            "details": f"Failed to cache: {save_error}"
+        }
+
+    return {
+        "success": True,
+        "source": source,
+        "cached": True,
+        "items": [product_data],
+        "error": None,
+        "status": None,
+        "details": None
+    }
+
+# Coalescing of Go-UPC lookups: in-process via SingleFlight, across workers
+# via a Postgres advisory lock keyed on the canonical UPC
+upc_flight = SingleFlight()
+UPC_LEASE_TIMEOUT_MS = int(os.getenv('UPC_LEASE_TIMEOUT_MS', '30000'))
+upc_lookup_stats = {'upstream_fetches': 0, 'coalesced_across_workers': 0, 'lease_timeouts': 0}
+upc_lookup_stats_lock = threading.Lock()
+
+def acquire_upc_lease(upc):
+    """Take the cross-worker lease for a UPC.
+
+    Returns (connection holding the lock or None, whether we had to wait).
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None, False
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (canonical_upc(upc),))
+        if cur.fetchone()[0]:
+            conn.commit()
+            return conn, False
+        # Another worker is fetching this UPC; wait for it to finish
+        cur.execute("SET LOCAL lock_timeout = %s", (UPC_LEASE_TIMEOUT_MS,))
+        cur.execute("SELECT pg_advisory_lock(%s)", (canonical_upc(upc),))
+        conn.commit()
+        return conn, True
+    except psycopg2.errors.LockNotAvailable:
+        with upc_lookup_stats_lock:
+            upc_lookup_stats['lease_timeouts'] += 1
+        conn.close()
+        return None, True
+    except Exception:
+        conn.close()
+        raise
+
+def release_upc_lease(conn, upc):
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_unlock(%s)", (canonical_upc(upc),))
+        conn.commit()
+    except psycopg2.Error as e:
+        print(f"Error releasing UPC lease: {e}")
+    finally:
+        conn.close()
+
+def release_upc_lease_after_write(conn, upc):
+    """Release the lease once the queued write of ``upc`` has committed.
+
+    A worker waiting on the lease looks for the row in the database, and
+    cannot see this worker's write-behind queue, so releasing before the
+    write commits would send it to Go-UPC again. The wait happens in the
+    background so the lookup still answers at once.
+    """
+    def release():
+        product_writer.wait_for(canonical_upc(upc), PRODUCT_WRITE_WAIT)
+        release_upc_lease(conn, upc)
+
+    threading.Thread(target=release, name='upc-lease-release', daemon=True).start()
+
+def fetch_product_with_lease(upc):
+    """fetch_product_from_api, unless another worker cached the UPC while we waited"""
+    conn, waited = acquire_upc_lease(upc)
     try:
-        # Remove any non-digit characters
-        clean_upc = ''.join(filter(str.isdigit, upc))
-        # Convert to integer to ensure it's a valid number
-        int(clean_upc)
-        # Check length (UPC-A is 12 digits, UPC-E is 8 digits)
-        if len(clean_upc) not in [8, 12]:
-            return False, "Invalid UPC length. Must be 8 or 12 digits."
-        return True, clean_upc
-    except (ValueError, TypeError):
-        return False, "Invalid UPC format. Must contain only digits."
+        if waited:
+            # Just written by the lease holder; a replica may not have it yet
+            product, _ = find_product_in_db(upc, primary=True)
+            if product:
+                with upc_lookup_stats_lock:
+                    upc_lookup_stats['coalesced_across_workers'] += 1
+                return database_product_body(product), 200
+        return fetch_product_from_api(upc)
+    finally:
+        if conn and PRODUCT_WRITE_BEHIND and product_writer.is_pending(canonical_upc(upc)):
+            release_upc_lease_after_write(conn, upc)
+        elif conn:
+            release_upc_lease(conn, upc)
+
+def upc_lookup_metrics():
+    flight = upc_flight.stats()
+    with upc_lookup_stats_lock:
+        stats = dict(upc_lookup_stats)
+    stats['coalesced_in_worker'] = flight['followers']
+    stats['in_flight'] = flight['in_flight']
+    stats['upstream_calls_saved'] = flight['followers'] + stats['coalesced_across_workers']
+    return stats
 
 @app.route('/api/lookup-upc', methods=['GET'])
 def lookup_upc():
@@ -474,6 +1233,7 @@ def lookup_upc():
                     "status": "DB_ERROR",
                     "details": "Could not connect to the database. Please check server logs."
                 }), 503
+            conn.close()
             
             # If connection successful, proceed with lookup
             product, db_error = find_product_in_db(upc)
@@ -503,146 +1263,19 @@ def lookup_upc():
             }), 503
 
         if product:
-            # Normalize the data structure
-            normalized_product = {
-                "title": product["productname"],
-                "brand": product["productbrand"],
-                "category": product["productcategory"],
-                "description": product["productdescription"],
-                "lowest_recorded_price": product["productlowestprice"],
-                "highest_recorded_price": product["producthighestprice"],
-                "currency": product["productcurrency"],
-                "images": product["productimages"],
-                "model": product["productmodel"],
-                "color": product["productcolor"],
-                "size": product["productsize"],
-                "dimension": product["productdimension"],
-                "weight": product["productweight"],
-                "upc": product["productupc"]
-            }
-
-            # Enrich the data with GPT category and days to expire
-            gptCategory = get_gpt_category(normalized_product)
-            daysToExpire = get_days_to_expire(normalized_product)
-            currentDate = datetime.now().strftime("%Y-%m-%d")
-            
-            if daysToExpire == "n/a":
-                expiryDate_ = (datetime.strptime(currentDate, "%Y-%m-%d") + timedelta(days=730)).strftime("%Y-%m-%d")
-            else:
-                expiryDate_ = (datetime.strptime(currentDate, "%Y-%m-%d") + timedelta(days=int(daysToExpire))).strftime("%Y-%m-%d")
-            
-            normalized_product["category"] = gptCategory
-            normalized_product["expiryDate"] = expiryDate_
-            normalized_product["purchaseDate"] = currentDate
+            return jsonify(database_product_body(product))
 
-            return jsonify({
-                "success": True,
-                "source": "database",
-                "cached": True,
-                "items": [normalized_product],
-                "error": None,
-                "status": None,
-                "details": None
-            })
+        # Then the offline catalog file, which needs no network call
+        product_data = catalog_product(upc)
+        if product_data:
+            product_data['upc'] = upc
+            return jsonify(found_product_body(product_data, "catalog"))
 
-        # If not in database, try the API
+        # If not in database, try the API. Concurrent lookups of the same UPC
+        # share one fetch in this worker, and one across workers via a lease
         print(f"Hitting API for UPC: {upc}")
-        response = call_upc_api(upc)
-        
-        if not response:
-            return jsonify({
-                "success": False,
-                "source": "api",
-                "cached": False,
-                "items": None,
-                "error": "API request failed",
-                "status": "API_ERROR",
-                "details": "Failed to connect to UPC API"
-            }), 503
-            
-        if response.status_code != 200:
-            return jsonify({
-                "success": False,
-                "source": "api",
-                "cached": False,
-                "items": None,
-                "error": "UPC lookup failed",
-                "status": "API_ERROR",
-                "details": f"API returned status code: {response.status_code}"
-            }), response.status_code
-
-        api_data = response.json()
-        print(f"API Response data: {api_data}")  # Debug log
-        
-        # If API found the product, save it to our database
-        if api_data.get('product'):
-            gptCategory = get_gpt_category(api_data['product'])
-            currentDate = datetime.now().strftime("%Y-%m-%d")
-            daysToExpire = get_days_to_expire(api_data['product'])
-            
-            # Handle non-perishable items
-            if daysToExpire == "n/a":
-                # Set expiry date to 2 years from now for non-perishable items
-                expiryDate_ = (datetime.strptime(currentDate, "%Y-%m-%d") + timedelta(days=730)).strftime("%Y-%m-%d")
-            else:
-                expiryDate_ = (datetime.strptime(currentDate, "%Y-%m-%d") + timedelta(days=int(daysToExpire))).strftime("%Y-%m-%d")
-            
-            # Transform Go-UPC response format to our format
-            product_data = {
-                'upc': api_data.get('code'),
-                'title': api_data['product'].get('name'),
-                'brand': api_data['product'].get('brand'),
-                'category': gptCategory,
-                'description': api_data['product'].get('description'),
-                'images': [api_data['product'].get('imageUrl')] if api_data['product'].get('imageUrl') else [],
-                'model': '',  # Not provided by Go-UPC
-                'color': next((spec[1] for spec in api_data['product'].get('specs', []) if spec[0] == 'Color'), ''),
-                'size': next((spec[1] for spec in api_data['product'].get('specs', []) if spec[0] == 'Size'), ''),
-                'dimension': next((f"{spec[1]}" for spec in api_data['product'].get('specs', []) if any(dim in spec[0].lower() for dim in ['height', 'width', 'length'])), ''),
-                'weight': next((spec[1] for spec in api_data['product'].get('specs', []) if 'weight' in spec[0].lower()), ''),
-                'lowest_recorded_price': 0.0,  # Not provided by Go-UPC
-                'highest_recorded_price': 0.0,  # Not provided by Go-UPC
-                'currency': 'USD',  # Default currency
-                'purchaseDate': currentDate,
-                'expiryDate': expiryDate_,
-            }
-            
-            print(f"Transformed product data: {product_data}")  # Debug log
-            success, save_error = save_product_to_db(product_data)
-            
-            if not success:
-                print(f"Failed to cache product: {save_error}")
-                return jsonify({
-                    "success": True,
-                    "source": "api",
-                    "cached": False,
-                    "items": [product_data],
-                    "error": None,
-                    "status": None,
-                    "details": f"Failed to cache: {save_error}"
-                })
-
-            return jsonify({
-                "success": True,
-                "source": "api",
-                "cached": True,
-                "items": [product_data],
-                "error": None,
-                "status": None,
-                "details": None
-            })
-        
-        # If API didn't find the product
-        print("API found no items for this UPC")  # Debug log
-        return jsonify({
-            "success": False,
-            "source": "api",
-            "cached": False,
-            "items": None,
-            "error": "Product not found",
-            "status": "NOT_FOUND",
-            "details": None
-        }), 404
+        body, status = upc_flight.do(upc, lambda: fetch_product_with_lease(upc))
+        return jsonify(body), status
     
     except Exception as e:
         print(f"Server error in lookup_upc: {str(e)}")  # Add logging
@@ -712,7 +1345,7 @@ Now, suggest 6 recipes following the exact format above.
 """
 
         # Use the new OpenAI client-based method
-        response = client.chat.completions.create(
+        response = openai_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a helpful cooking assistant that creates recipes based on available ingredients."},
@@ -733,7 +1366,7 @@ Recipe text:
 Respond with ONLY valid JSON, no explanation or additional text.
 """
 
-        parser_response = client.chat.completions.create(
+        parser_response = openai_client().chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a precise JSON parser that converts recipe text to structured data."},
@@ -805,7 +1438,12 @@ def signup():
             }), 409
         
         # Hash the password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        try:
+            hashed_password = password_hasher.hash(password)
+        except HashingBusy:
+            cur.close()
+            conn.close()
+            return hashing_busy_response()
         
         # Insert new user - FIX: Correct column order to match table definition
         cur.execute(
@@ -870,7 +1508,13 @@ def login():
         user = cur.fetchone()
         
         # Check if user exists and password is correct
-        if not user or not bcrypt.checkpw(password.encode('utf-8'), user[2].encode('utf-8')):
+        try:
+            valid = bool(user) and password_hasher.check(password, user[2])
+        except HashingBusy:
+            cur.close()
+            conn.close()
+            return hashing_busy_response()
+        if not valid:
             cur.close()
             conn.close()
             return jsonify({
@@ -882,6 +1526,17 @@ def login():
         user_id = user[0]
         username = user[1]
         
+        # Upgrade hashes made at a lower cost while we have the password
+        if password_hasher.needs_rehash(user[2]):
+            try:
+                cur.execute("UPDATE users SET password_hash = %s WHERE userID = %s",
+                            (password_hasher.hash(password), user_id))
+                conn.commit()
+                password_hasher.note_rehash()
+            except (HashingBusy, psycopg2.Error) as e:
+                conn.rollback()
+                print(f"Password rehash for user {user_id} skipped: {e}")
+        
         # Generate JWT token - FIX: Use pyjwt instead of jwt
         token = pyjwt.encode({
             'user_id': user_id,
@@ -923,6 +1578,14 @@ def add_product(current_user_id):
                 'error': 'Product UPC is required',
                 'status': 'VALIDATION_ERROR'
             }), 400
+
+        data['productUPC'] = canonical_upc(data['productUPC'])
+        if data['productUPC'] is None:
+            return jsonify({
+                'success': False,
+                'error': 'Product UPC must be numeric',
+                'status': 'VALIDATION_ERROR'
+            }), 400
             
         if 'productName' not in data or not data['productName']:
             return jsonify({
@@ -930,6 +1593,11 @@ def add_product(current_user_id):
                 'error': 'Product name is required',
                 'status': 'VALIDATION_ERROR'
             }), 400
+
+        # A category typed in by a user is never a GPT training label
+        data.pop('productCategorySource', None)
+        if data.get('productCategory'):
+            data['productCategorySource'] = 'user'
         
         conn = get_db_connection()
         if not conn:
@@ -987,9 +1655,11 @@ def add_product(current_user_id):
             cur.execute(insert_query, values)
         
         product = cur.fetchone()
+        notify_product_changed(cur, data['productUPC'])
         conn.commit()
         cur.close()
         conn.close()
+        forget_product(data['productUPC'])
         
         return jsonify({
             'success': True,
@@ -1005,46 +1675,118 @@ def add_product(current_user_id):
         }), 500
 
 
-@app.route('/api/products/<int:product_upc>', methods=['GET'])
+# Product search over the productSearch tsvector and a trigram index on productName
+SEARCH_MAX_LIMIT = 50
+SEARCH_MAX_OFFSET = 1000
+SEARCH_COLUMNS = ['productupc', 'productname', 'productbrand', 'productcategory', 'productimage']
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+")
+# A shorter prefix matches too much of the catalog to rank within budget
+SEARCH_MIN_PREFIX = 3
+
+def search_tsquery(text):
+    """Prefix tsquery for autocomplete: every word must match, the last one as a prefix.
+
+    A last word shorter than SEARCH_MIN_PREFIX is ignored until more is
+    typed; None if nothing is left.
+    """
+    tokens = SEARCH_TOKEN_RE.findall(text.lower())
+    if tokens and len(tokens[-1]) < SEARCH_MIN_PREFIX:
+        tokens.pop()
+        return ' & '.join(tokens) or None
+    if not tokens:
+        return None
+    return ' & '.join(tokens[:-1] + [tokens[-1] + ':*'])
+
+@app.route('/api/products/search', methods=['GET'])
 @token_required
-def get_product_by_upc(current_user_id, product_upc):
+def search_products(current_user_id):
+    """Ranked product search by name, brand and description.
+
+    ?q= is matched word by word with the last word as a prefix, so it works
+    for autocomplete as the user types; near-misses on the name are caught
+    by trigram similarity. A search needs a word of at least
+    SEARCH_MIN_PREFIX characters. Paginate with ?limit= and ?page=.
+    """
     try:
-        conn = get_db_connection()
+        q = (request.args.get('q') or '').strip()
+        tsquery = search_tsquery(q)
+        if not tsquery:
+            return jsonify({
+                'success': False,
+                'error': f'Type at least {SEARCH_MIN_PREFIX} characters to search',
+                'status': 'VALIDATION_ERROR'
+            }), 400
+        try:
+            limit = min(max(int(request.args.get('limit', 10)), 1), SEARCH_MAX_LIMIT)
+            page = max(int(request.args.get('page', 1)), 1)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'limit and page must be whole numbers',
+                'status': 'VALIDATION_ERROR'
+            }), 400
+        offset = (page - 1) * limit
+        if offset > SEARCH_MAX_OFFSET:
+            return jsonify({
+                'success': False,
+                'error': 'Refine the search instead of paging this far',
+                'status': 'VALIDATION_ERROR'
+            }), 400
+
+        conn = get_read_connection(current_user_id)
         if not conn:
             return jsonify({
                 'success': False,
                 'error': 'Database connection failed',
                 'status': 'DB_ERROR'
             }), 503
-        
+
         cur = conn.cursor()
-        
-        # Query to get product by UPC
+        # Both predicates are GIN-indexed, so the OR becomes a BitmapOr;
+        # one extra row tells us whether there is another page
         cur.execute("""
-            SELECT 
-                productUPC, 
-                productName, 
-                productDescription, 
-                productBrand, 
-                productModel, 
-                productColor, 
-                productSize, 
-                productDimension, 
-                productWeight, 
-                productCategory, 
-                productLowestPrice, 
-                productHighestPrice, 
-                productCurrency, 
-                productImages
-            FROM products 
-            WHERE productUPC = %s
-        """, (product_upc,))
-        
-        product = cur.fetchone()
+            SELECT productUPC, productName, productBrand, productCategory, productImages[1]
+            FROM products, to_tsquery('simple', %(tsquery)s) query
+            WHERE productSearch @@ query OR productName %% %(q)s
+            ORDER BY ts_rank_cd(productSearch, query) + similarity(productName, %(q)s) DESC, productUPC
+            LIMIT %(limit)s OFFSET %(offset)s
+        """, {'tsquery': tsquery, 'q': q, 'limit': limit + 1, 'offset': offset})
+        rows = cur.fetchall()
+        cur.close()
+        conn.close()
+
+        return jsonify({
+            'success': True,
+            'query': q,
+            'page': page,
+            'limit': limit,
+            'has_more': len(rows) > limit,
+            'results': Rows(SEARCH_COLUMNS, rows[:limit])
+        })
+
+    except Exception as e:
+        print(f"Error searching products: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'status': 'SERVER_ERROR',
+            'details': str(e)
+        }), 500
+
+@app.route('/api/products/<int:product_upc>', methods=['GET'])
+@token_required
+def get_product_by_upc(current_user_id, product_upc):
+    try:
+        product, db_error = find_product_in_db(product_upc)
+        if db_error:
+            return jsonify({
+                'success': False,
+                'error': 'Database error',
+                'status': 'DB_ERROR',
+                'details': db_error
+            }), 503
         
         if not product:
-            cur.close()
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'Product not found',
@@ -1053,25 +1795,22 @@ def get_product_by_upc(current_user_id, product_upc):
         
         # Format product data
         product_data = {
-            'productUPC': product[0],
-            'productName': product[1],
-            'productDescription': product[2],
-            'productBrand': product[3],
-            'productModel': product[4],
-            'productColor': product[5],
-            'productSize': product[6],
-            'productDimension': product[7],
-            'productWeight': product[8],
-            'productCategory': product[9],
-            'productLowestPrice': float(product[10]) if product[10] is not None else None,
-            'productHighestPrice': float(product[11]) if product[11] is not None else None,
-            'productCurrency': product[12],
-            'productImages': product[13] if product[13] else []
+            'productUPC': product['productupc'],
+            'productName': product['productname'],
+            'productDescription': product['productdescription'],
+            'productBrand': product['productbrand'],
+            'productModel': product['productmodel'],
+            'productColor': product['productcolor'],
+            'productSize': product['productsize'],
+            'productDimension': product['productdimension'],
+            'productWeight': product['productweight'],
+            'productCategory': product['productcategory'],
+            'productLowestPrice': float(product['productlowestprice']) if product['productlowestprice'] is not None else None,
+            'productHighestPrice': float(product['producthighestprice']) if product['producthighestprice'] is not None else None,
+            'productCurrency': product['productcurrency'],
+            'productImages': product['productimages'] if product['productimages'] else []
         }
         
-        cur.close()
-        conn.close()
-        
         return jsonify({
             'success': True,
             'product': product_data
@@ -1085,30 +1824,174 @@ def get_product_by_upc(current_user_id, product_upc):
             'status': 'SERVER_ERROR',
             'details': str(e)
         }), 500
-# User Products Endpoints
-@app.route('/api/pantry', methods=['POST'])
-@token_required
-def add_to_pantry(current_user_id):
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['productUPC', 'quantity']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False,
-                    'error': f'{field} is required',
-                    'status': 'VALIDATION_ERROR'
-                }), 400
-        
-        # Convert productUPC to string to handle large numbers properly
-        product_upc = str(data['productUPC'])
+
+# Product image proxy: each remote image is fetched once per host, kept on
+# local disk and served (or scaled down) from there
+IMAGE_THUMB_WIDTHS = frozenset(int(w) for w in os.getenv('IMAGE_THUMB_WIDTHS', '96,192,384').split(',') if w.strip())
+IMAGE_PROXY_HOSTS = frozenset(h.strip().lower() for h in os.getenv('IMAGE_PROXY_HOSTS', 'go-upc.s3.amazonaws.com').split(',') if h.strip())
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', str(8 * 1024 * 1024)))
+IMAGE_MAX_AGE = int(os.getenv('IMAGE_MAX_AGE', str(30 * 24 * 3600)))
+image_cache = ImageCache(
+    os.getenv('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'pantry-image-cache')),
+    int(os.getenv('IMAGE_CACHE_MB', '512')) * 1024 * 1024
+)
+image_client = HttpClient(
+    pool_size=int(os.getenv('IMAGE_POOL_SIZE', '8')),
+    read_timeout=float(os.getenv('IMAGE_READ_TIMEOUT', '10')),
+    max_attempts=2,
+    deadline=15.0,
+    name='images'
+)
+image_flight = SingleFlight()
+
+class ImageFetchError(Exception):
+    pass
+
+def proxied_image_allowed(url):
+    """Only http(s) images on IMAGE_PROXY_HOSTS are fetched, so the proxy
+    cannot be pointed at internal addresses through a product row"""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return False
+    return '*' in IMAGE_PROXY_HOSTS or parts.hostname.lower() in IMAGE_PROXY_HOSTS
+
+def fetch_original_image(url):
+    """The cached original of ``url``, fetched from the origin on a miss"""
+    cached = image_cache.get(url)
+    if cached:
+        return cached
+
+    def fetch():
+        # Another request may have stored it while this one waited
+        cached = image_cache.get(url, record=False)
+        if cached:
+            return cached
+        try:
+            response = image_client.get(url, headers={'Accept': 'image/*'})
+        except UpstreamError as e:
+            raise ImageFetchError(f"Image origin unreachable: {e}")
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if response.status_code != 200:
+            raise ImageFetchError(f"Image origin answered {response.status_code}")
+        if not content_type.startswith('image/'):
+            raise ImageFetchError(f"Image origin sent {content_type or 'no content type'}")
+        if len(response.content) > IMAGE_MAX_BYTES:
+            raise ImageFetchError("Image is too large")
+        return image_cache.put(url, response.content, content_type)
+
+    return image_flight.do(url, fetch)
+
+def cached_image(url, width=None):
+    """The cached image for ``url``, scaled to ``width`` if given and Pillow is installed"""
+    if not width:
+        return fetch_original_image(url)
+    key = f"{url}#w={width}"
+    cached = image_cache.get(key)
+    if cached:
+        return cached
+
+    def scale():
+        cached = image_cache.get(key, record=False)
+        if cached:
+            return cached
+        original = fetch_original_image(url)
+        with open(original.path, 'rb') as f:
+            thumbnail = make_thumbnail(f.read(), width)
+        if thumbnail is None:
+            return original
+        return image_cache.put(key, *thumbnail)
+
+    return image_flight.do(key, scale)
+
+@app.route('/api/products/<int:product_upc>/images/<int:index>', methods=['GET'])
+def get_product_image(product_upc, index):
+    """Serve a product image from the local cache, optionally as a ``?w=`` thumbnail.
+
+    Not behind token_required so that <img> tags can load it.
+    """
+    width = request.args.get('w', type=int)
+    if width is not None and width not in IMAGE_THUMB_WIDTHS:
+        return jsonify({
+            'success': False,
+            'error': f"w must be one of {sorted(IMAGE_THUMB_WIDTHS)}",
+            'status': 'INVALID_WIDTH'
+        }), 400
+
+    product, db_error = find_product_in_db(product_upc)
+    if db_error:
+        return jsonify({
+            'success': False,
+            'error': 'Database error',
+            'status': 'DB_ERROR',
+            'details': db_error
+        }), 503
+    images = (product or {}).get('productimages') or []
+    if index >= len(images):
+        return jsonify({
+            'success': False,
+            'error': 'Image not found',
+            'status': 'NOT_FOUND'
+        }), 404
+
+    url = images[index]
+    if not proxied_image_allowed(url):
+        # Not a redirect: a product row must not turn this route into an
+        # open redirect to any URL
+        return jsonify({
+            'success': False,
+            'error': 'Image is not on an allowed host',
+            'status': 'NOT_FOUND'
+        }), 404
+    try:
+        image = cached_image(url, width)
+        # send_file answers If-None-Match with 304 and Range with 206. It
+        # opens the blob right away, so an eviction by another worker
+        # surfaces here rather than mid-response
+        return send_file(image.path, mimetype=image.content_type, conditional=True,
+                         etag=image.digest, max_age=IMAGE_MAX_AGE)
+    except ImageFetchError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'status': 'IMAGE_UNAVAILABLE'
+        }), 502
+    except OSError:
+        # Evicted between lookup and open; the next request refetches it
+        return jsonify({
+            'success': False,
+            'error': 'Image unavailable, try again',
+            'status': 'IMAGE_UNAVAILABLE'
+        }), 503
+
+# User Products Endpoints
+@app.route('/api/pantry', methods=['POST'])
+@query_budget(2)
+@token_required
+def add_to_pantry(current_user_id):
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        required_fields = ['productUPC', 'quantity']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({
+                    'success': False,
+                    'error': f'{field} is required',
+                    'status': 'VALIDATION_ERROR'
+                }), 400
+        
+        product_keys = list(upc_keys(data['productUPC']))
+        product_upc = product_keys[-1] if product_keys else None
         quantity = data['quantity']
         quantity_type = data.get('quantityType', 'items')  # Default to 'items' if not provided
         date_purchased = data.get('date_purchased')
         expiration_date = data.get('expiration_date')
         
+        # The product may have just been scanned and still be queued
+        if PRODUCT_WRITE_BEHIND:
+            product_writer.wait_for(product_upc, PRODUCT_WRITE_WAIT)
+        
         # Connect to database
         conn = get_db_connection()
         if not conn:
@@ -1120,58 +2003,46 @@ def add_to_pantry(current_user_id):
         
         cur = conn.cursor()
         
-        # First, check if the product exists
-        cur.execute("SELECT productUPC FROM products WHERE productUPC = %s", (product_upc,))
-        product = cur.fetchone()
-        
-        if not product:
-            cur.close()
-            conn.close()
-            return jsonify({
-                'success': False,
-                'error': 'Product not found',
-                'status': 'NOT_FOUND'
-            }), 404
-        
-        # Insert into usersProducts (not pantry)
-        cur.execute("""
-            INSERT INTO usersProducts 
-            (userID, productUPC, quantity, quantityType, date_purchased, expiration_date) 
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING pantryID
-        """, (current_user_id, product_upc, quantity, quantity_type, date_purchased, expiration_date))
-        
-        # Get the newly created pantry item ID
-        new_pantry_id = cur.fetchone()[0]
-        conn.commit()
-        
-        # Get the complete pantry item details
+        # One round trip: insert only if the product exists, and return the
+        # new item joined with its product
         cur.execute("""
+            WITH inserted AS (
+                INSERT INTO usersProducts 
+                (userID, productUPC, quantity, quantityType, date_purchased, expiration_date) 
+                SELECT %s, productUPC, %s::float, %s, %s::date, %s::date
+                FROM products
+                WHERE productUPC = ANY(%s)
+                ORDER BY productUPC = %s DESC
+                LIMIT 1
+                RETURNING pantryID, userID, productUPC, quantity, quantityType, date_purchased, expiration_date
+            )
             SELECT 
-                up.pantryID, 
-                up.userID, 
-                up.productUPC, 
-                up.quantity, 
-                up.quantityType, 
-                up.date_purchased, 
-                up.expiration_date,
+                i.pantryID, 
+                i.userID, 
+                i.productUPC, 
+                i.quantity, 
+                i.quantityType, 
+                i.date_purchased, 
+                i.expiration_date,
                 p.productName,
                 p.productBrand
-            FROM usersProducts up
-            JOIN products p ON up.productUPC = p.productUPC
-            WHERE up.pantryID = %s
-        """, (new_pantry_id,))
+            FROM inserted i
+            JOIN products p ON i.productUPC = p.productUPC
+        """, (current_user_id, quantity, quantity_type, date_purchased, expiration_date,
+              product_keys, product_keys[0] if product_keys else None))
         
         pantry_item = cur.fetchone()
+        conn.commit()
+        forget_pantry(current_user_id)
         cur.close()
         conn.close()
         
         if not pantry_item:
             return jsonify({
                 'success': False,
-                'error': 'Failed to retrieve added pantry item',
-                'status': 'SERVER_ERROR'
-            }), 500
+                'error': 'Product not found',
+                'status': 'NOT_FOUND'
+            }), 404
         
         # Format the response
         pantry_data = {
@@ -1204,6 +2075,7 @@ def add_to_pantry(current_user_id):
         }), 500
 
 @app.route('/api/pantry/<int:pantry_id>', methods=['PUT'])
+@query_budget(2)
 @token_required
 def update_pantry_item(current_user_id, pantry_id):
     try:
@@ -1216,32 +2088,6 @@ def update_pantry_item(current_user_id, pantry_id):
                 'status': 'VALIDATION_ERROR'
             }), 400
         
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({
-                'success': False,
-                'error': 'Database connection failed',
-                'status': 'DB_ERROR'
-            }), 503
-        
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Verify pantry item exists and belongs to user
-        cur.execute(
-            "SELECT * FROM usersProducts WHERE pantryID = %s AND userID = %s",
-            (pantry_id, current_user_id)
-        )
-        pantry_item = cur.fetchone()
-        
-        if not pantry_item:
-            cur.close()
-            conn.close()
-            return jsonify({
-                'success': False,
-                'error': 'Pantry item not found or does not belong to user',
-                'status': 'NOT_FOUND'
-            }), 404
-        
         # Build update query
         update_fields = []
         update_values = []
@@ -1252,30 +2098,52 @@ def update_pantry_item(current_user_id, pantry_id):
                 update_values.append(value)
         
         if not update_fields:
-            cur.close()
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'No valid fields to update',
                 'status': 'VALIDATION_ERROR'
             }), 400
         
-        # Add pantry_id for WHERE clause
-        update_values.append(pantry_id)
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection failed',
+                'status': 'DB_ERROR'
+            }), 503
+        
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        # The WHERE clause checks ownership, so no separate SELECT is needed
+        update_values.extend([pantry_id, current_user_id])
         
         update_query = f"""
-            UPDATE usersProducts 
-            SET {', '.join(update_fields)}
-            WHERE pantryID = %s
-            RETURNING *
+            WITH updated AS (
+                UPDATE usersProducts 
+                SET {', '.join(update_fields)}
+                WHERE pantryID = %s AND userID = %s
+                RETURNING *
+            )
+            {', ' + LEARN_SHELF_LIFE_SQL if 'expiration_date' in data else ''}
+            SELECT * FROM updated
         """
         
         cur.execute(update_query, update_values)
         updated_item = cur.fetchone()
         conn.commit()
+        forget_pantry(current_user_id)
         cur.close()
         conn.close()
         
+        if not updated_item:
+            return jsonify({
+                'success': False,
+                'error': 'Pantry item not found or does not belong to user',
+                'status': 'NOT_FOUND'
+            }), 404
+        if 'expiration_date' in data:
+            forget_learned_shelf_life(updated_item['productupc'])
+        
         return jsonify({
             'success': True,
             'pantry_item': updated_item
@@ -1290,6 +2158,7 @@ def update_pantry_item(current_user_id, pantry_id):
         }), 500
 
 @app.route('/api/pantry/<int:pantry_id>', methods=['DELETE'])
+@query_budget(2)
 @token_required
 def remove_from_pantry(current_user_id, pantry_id):
     try:
@@ -1303,31 +2172,24 @@ def remove_from_pantry(current_user_id, pantry_id):
         
         cur = conn.cursor()
         
-        # Verify pantry item exists and belongs to user
+        # Delete the pantry item if it belongs to the user
         cur.execute(
-            "SELECT * FROM usersProducts WHERE pantryID = %s AND userID = %s",
+            "DELETE FROM usersProducts WHERE pantryID = %s AND userID = %s",
             (pantry_id, current_user_id)
         )
-        pantry_item = cur.fetchone()
+        deleted = cur.rowcount
+        conn.commit()
+        forget_pantry(current_user_id)
+        cur.close()
+        conn.close()
         
-        if not pantry_item:
-            cur.close()
-            conn.close()
+        if not deleted:
             return jsonify({
                 'success': False,
                 'error': 'Pantry item not found or does not belong to user',
                 'status': 'NOT_FOUND'
             }), 404
         
-        # Delete the pantry item
-        cur.execute(
-            "DELETE FROM usersProducts WHERE pantryID = %s",
-            (pantry_id,)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
-        
         return jsonify({
             'success': True,
             'message': 'Item removed from pantry'
@@ -1341,11 +2203,43 @@ def remove_from_pantry(current_user_id, pantry_id):
             'details': str(e)
         }), 500
 
+# Encoded GET /api/pantry responses per user. Pantry writes in any worker
+# reach every worker through the pantry_changed notification (migration 005)
+pantry_snapshots = SnapshotCache(
+    max_bytes=int(float(os.getenv('PANTRY_SNAPSHOT_MB', '64')) * 1024 * 1024),
+    ttl=float(os.getenv('PANTRY_SNAPSHOT_TTL', '300'))
+)
+
+def forget_pantry(user_id):
+    """Drop a user's pantry snapshot after changing their pantry"""
+    pantry_snapshots.invalidate_user(user_id)
+    if pg_listener is None:
+        # No listener to hear the NOTIFY (dev server): tell open streams here
+        pantry_feed.publish(user_id)
+
+def snapshot_response(snapshot):
+    response = Response(snapshot.body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    return response.make_conditional(request)
+
+# Product columns the compact pantry shape sends once per UPC
+PANTRY_PRODUCT_FIELDS = ('productname', 'productbrand', 'productcategory', 'productimages')
+
 @app.route('/api/pantry', methods=['GET'])
 @token_required
 def get_user_pantry(current_user_id):
     try:
-        conn = get_db_connection()
+        # Plain tuples; ?layout=columns sends them as-is with one column list
+        columnar = request.args.get('layout') == 'columns'
+        # ?shape=compact sends each product once, keyed by UPC
+        compact = request.args.get('shape') == 'compact'
+        snapshot_key = (current_user_id, (columnar, compact))
+        snapshot = pantry_snapshots.get(snapshot_key)
+        if snapshot:
+            return snapshot_response(snapshot)
+        started = pantry_snapshots.clock()
+        
+        conn = get_read_connection(current_user_id)
         if not conn:
             return jsonify({
                 'success': False,
@@ -1353,7 +2247,7 @@ def get_user_pantry(current_user_id):
                 'status': 'DB_ERROR'
             }), 503
         
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur = conn.cursor()
         
         # Get all pantry items for the user with product details
         cur.execute("""
@@ -1364,14 +2258,27 @@ def get_user_pantry(current_user_id):
             ORDER BY up.date_purchased DESC
         """, (current_user_id,))
         
-        pantry_items = cur.fetchall()
+        pantry_items = Rows.from_cursor(cur, columnar=columnar)
         cur.close()
         conn.close()
         
-        return jsonify({
-            'success': True,
-            'pantry_items': pantry_items
-        })
+        upc_index = pantry_items.columns.index('productupc')
+        upcs = [row[upc_index] for row in pantry_items.rows]
+        if compact:
+            products, lots = split_rows(pantry_items, 'productupc', PANTRY_PRODUCT_FIELDS, drop=('userid',))
+            response = jsonify({
+                'success': True,
+                'shape': 'compact',
+                'products': products,
+                'pantry_items': lots
+            })
+        else:
+            response = jsonify({
+                'success': True,
+                'pantry_items': pantry_items
+            })
+        pantry_snapshots.put(snapshot_key, response.get_data(), upcs, started)
+        return response
         
     except Exception as e:
         return jsonify({
@@ -1385,7 +2292,7 @@ def get_user_pantry(current_user_id):
 @token_required
 def get_pantry_item_by_upc(current_user_id, product_upc):
     try:
-        conn = get_db_connection()
+        conn = get_read_connection(current_user_id)
         if not conn:
             return jsonify({
                 'success': False,
@@ -1395,13 +2302,16 @@ def get_pantry_item_by_upc(current_user_id, product_upc):
         
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        # Get pantry item for the user with specific UPC
+        # Get pantry item for the user with specific UPC, trying the code's
+        # own digits before its canonical key
+        keys = upc_keys(product_upc)
         cur.execute("""
             SELECT up.*, p.productName, p.productBrand, p.productCategory, p.productImages
             FROM usersProducts up
             JOIN products p ON up.productUPC = p.productUPC
-            WHERE up.userID = %s AND up.productUPC = %s
-        """, (current_user_id, product_upc))
+            WHERE up.userID = %s AND up.productUPC = ANY(%s)
+            ORDER BY up.productUPC = %s DESC
+        """, (current_user_id, list(keys), keys[0] if keys else None))
         
         pantry_item = cur.fetchone()
         cur.close()
@@ -1427,6 +2337,541 @@ def get_pantry_item_by_upc(current_user_id, product_upc):
             'details': str(e)
         }), 500
 
+# Expiry queries, answered with range scans on (userID, expiration_date)
+EXPIRY_COLUMNS = ['pantryid', 'productupc', 'productname', 'quantity', 'quantitytype', 'expiration_date']
+EXPIRY_SELECT = """
+    SELECT up.pantryID, up.productUPC, p.productName, up.quantity, up.quantityType, up.expiration_date
+    FROM usersProducts up
+    JOIN products p ON up.productUPC = p.productUPC
+"""
+
+def date_arg(name, default):
+    """A YYYY-MM-DD query parameter; raises ValueError if malformed"""
+    value = request.args.get(name)
+    return date.fromisoformat(value) if value else default
+
+def expiry_bucket(days_left):
+    """Same thresholds as the frontend's getExpirationClass"""
+    if days_left < 0:
+        return 'expired'
+    if days_left < 3:
+        return 'expiring_soon'
+    if days_left < 7:
+        return 'expiring_week'
+    return 'later'
+
+def expiry_query_error(message):
+    return jsonify({
+        'success': False,
+        'error': message,
+        'status': 'VALIDATION_ERROR'
+    }), 400
+
+@app.route('/api/pantry/expiring', methods=['GET'])
+@token_required
+def get_expiring_items(current_user_id):
+    """Items expiring in [today, today + days), bucketed like the UI colours.
+
+    ?today= lets the client pass its local date; ?days= defaults to 7.
+    """
+    try:
+        try:
+            today = date_arg('today', date.today())
+            days = int(request.args.get('days', 7))
+        except ValueError:
+            return expiry_query_error('today must be YYYY-MM-DD and days a whole number')
+        if not 0 < days <= 366:
+            return expiry_query_error('days must be between 1 and 366')
+
+        conn = get_read_connection(current_user_id)
+        if not conn:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection failed',
+                'status': 'DB_ERROR'
+            }), 503
+
+        cur = conn.cursor()
+        cur.execute(EXPIRY_SELECT + """
+            WHERE up.userID = %s AND up.expiration_date >= %s AND up.expiration_date < %s
+            ORDER BY up.expiration_date
+        """, (current_user_id, today, today + timedelta(days=days)))
+        rows = cur.fetchall()
+        cur.close()
+        conn.close()
+
+        buckets = {'expiring_soon': [], 'expiring_week': [], 'later': []}
+        for row in rows:
+            buckets[expiry_bucket((row[5] - today).days)].append(row)
+
+        return jsonify({
+            'success': True,
+            'from': today.isoformat(),
+            'to': (today + timedelta(days=days)).isoformat(),
+            'counts': {name: len(items) for name, items in buckets.items()},
+            'buckets': {name: Rows(EXPIRY_COLUMNS, items) for name, items in buckets.items()}
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'status': 'SERVER_ERROR',
+            'details': str(e)
+        }), 500
+
+@app.route('/api/pantry/expired', methods=['GET'])
+@token_required
+def get_expired_items(current_user_id):
+    """Items whose expiration date is before today, most recently expired first"""
+    try:
+        try:
+            today = date_arg('today', date.today())
+        except ValueError:
+            return expiry_query_error('today must be YYYY-MM-DD')
+
+        conn = get_read_connection(current_user_id)
+        if not conn:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection failed',
+                'status': 'DB_ERROR'
+            }), 503
+
+        cur = conn.cursor()
+        cur.execute(EXPIRY_SELECT + """
+            WHERE up.userID = %s AND up.expiration_date < %s
+            ORDER BY up.expiration_date DESC
+        """, (current_user_id, today))
+        expired_items = Rows.from_cursor(cur)
+        cur.close()
+        conn.close()
+
+        return jsonify({
+            'success': True,
+            'count': len(expired_items),
+            'expired_items': expired_items
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'status': 'SERVER_ERROR',
+            'details': str(e)
+        }), 500
+
+@app.route('/api/pantry/calendar', methods=['GET'])
+@token_required
+def get_expiry_calendar(current_user_id):
+    """Number of items expiring on each day of a month (?month=YYYY-MM)"""
+    try:
+        try:
+            today = date_arg('today', date.today())
+            month = request.args.get('month')
+            first = date.fromisoformat(month + '-01') if month else today.replace(day=1)
+        except ValueError:
+            return expiry_query_error('month must be YYYY-MM')
+        next_month = (first + timedelta(days=32)).replace(day=1)
+
+        conn = get_read_connection(current_user_id)
+        if not conn:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection failed',
+                'status': 'DB_ERROR'
+            }), 503
+
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT expiration_date, count(*)
+            FROM usersProducts
+            WHERE userID = %s AND expiration_date >= %s AND expiration_date < %s
+            GROUP BY expiration_date
+            ORDER BY expiration_date
+        """, (current_user_id, first, next_month))
+        rows = cur.fetchall()
+        cur.close()
+        conn.close()
+
+        return jsonify({
+            'success': True,
+            'month': first.strftime('%Y-%m'),
+            'days': {
+                day.isoformat(): {'count': count, 'status': expiry_bucket((day - today).days)}
+                for day, count in rows
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'status': 'SERVER_ERROR',
+            'details': str(e)
+        }), 500
+
+# Bulk pantry import
+MAX_IMPORT_ROWS = int(os.getenv('MAX_IMPORT_ROWS', '200000'))
+IMPORT_FIELDS = ['productUPC', 'quantity', 'quantityType', 'date_purchased', 'expiration_date']
+
+def read_import_records(text, content_type):
+    """Yield (row_number, record) from the decoded text of a CSV or NDJSON upload"""
+    if 'csv' in content_type:
+        reader = csv.DictReader(io.StringIO(text))
+        # Match headers case-insensitively against the POST /api/pantry field names
+        lookup = {name.lower(): name for name in IMPORT_FIELDS}
+        lookup['upc'] = 'productUPC'
+        for row_number, row in enumerate(reader, start=1):
+            yield row_number, {lookup.get((k or '').strip().lower(), k): v for k, v in row.items()}
+        return
+    for row_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, e
+            continue
+        yield row_number, record
+
+def parse_import_record(record):
+    """Validate one import record, returning (row tuple, error).
+
+    The row's UPC is the tuple of upc_keys candidates; import_pantry replaces
+    it with the one that exists.
+    """
+    if isinstance(record, Exception):
+        return None, f"Invalid JSON: {record}"
+    if not isinstance(record, dict):
+        return None, "Row must be an object"
+
+    raw_upc = str(record.get('productUPC') or '').strip()
+    if not raw_upc:
+        return None, "productUPC is required"
+    upc = upc_keys(raw_upc)
+    if not upc:
+        return None, "productUPC must be numeric"
+
+    try:
+        quantity = float(record.get('quantity'))
+    except (TypeError, ValueError):
+        return None, "quantity must be a number"
+    if not math.isfinite(quantity) or quantity < 0:
+        return None, "quantity must be a non-negative number"
+
+    quantity_type = str(record.get('quantityType') or 'items').strip()
+    if len(quantity_type) > 25:
+        return None, "quantityType must be at most 25 characters"
+
+    dates = []
+    for field in ('date_purchased', 'expiration_date'):
+        value = record.get(field)
+        if value in (None, ''):
+            dates.append(None)
+            continue
+        try:
+            dates.append(date.fromisoformat(str(value).strip()))
+        except ValueError:
+            return None, f"{field} must be a YYYY-MM-DD date"
+
+    return (upc, quantity, quantity_type, dates[0], dates[1]), None
+
+@app.route('/api/pantry/import', methods=['POST'])
+@token_required
+def import_pantry(current_user_id):
+    """Bulk-add pantry items from a CSV or NDJSON file.
+
+    The whole file is validated first. Unless ?partial=true is given, any bad
+    row rejects the import; otherwise valid rows are imported and the rest are
+    reported. Rows are loaded with COPY in a single transaction.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload:
+            body = upload.read()
+            content_type = upload.mimetype or ''
+            if upload.filename and upload.filename.lower().endswith('.csv'):
+                content_type = 'text/csv'
+        else:
+            body = request.get_data()
+            content_type = request.mimetype or ''
+
+        if not body:
+            return jsonify({
+                'success': False,
+                'error': 'Import file is required',
+                'status': 'VALIDATION_ERROR'
+            }), 400
+
+        try:
+            text = body.decode('utf-8-sig')
+        except UnicodeDecodeError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Import file must be UTF-8: {e.reason} at byte {e.start}',
+                'status': 'VALIDATION_ERROR'
+            }), 400
+
+        partial = request.args.get('partial', '').lower() in ('1', 'true', 'yes')
+
+        rows = []
+        row_numbers = []
+        errors = []
+        for row_number, record in read_import_records(text, content_type):
+            if row_number > MAX_IMPORT_ROWS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Import is limited to {MAX_IMPORT_ROWS} rows',
+                    'status': 'VALIDATION_ERROR'
+                }), 413
+            row, error = parse_import_record(record)
+            if error:
+                errors.append({'row': row_number, 'error': error})
+            else:
+                rows.append(row)
+                row_numbers.append(row_number)
+
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection failed',
+                'status': 'DB_ERROR'
+            }), 503
+
+        cur = conn.cursor()
+        try:
+            # Resolve every candidate key in one query
+            upcs = list({key for row in rows for key in row[0]})
+            cur.execute("SELECT productUPC FROM products WHERE productUPC = ANY(%s)", (upcs,))
+            known = {r[0] for r in cur.fetchall()}
+            valid = []
+            for row, row_number in zip(rows, row_numbers):
+                key = next((key for key in row[0] if key in known), None)
+                if key is not None:
+                    valid.append((key,) + row[1:])
+                else:
+                    errors.append({'row': row_number, 'error': f'Product {row[0][-1]} not found'})
+            rows = valid
+            errors.sort(key=lambda e: e['row'])
+
+            if errors and not partial:
+                return jsonify({
+                    'success': False,
+                    'error': 'Import file has invalid rows; nothing was imported',
+                    'status': 'VALIDATION_ERROR',
+                    'imported': 0,
+                    'errors': errors
+                }), 400
+
+            if rows:
+                buffer = copy_buffer(rows)
+
+                cur.execute("""
+                    CREATE TEMP TABLE pantry_import (
+                        productUPC BIGINT,
+                        quantity FLOAT,
+                        quantityType VARCHAR(25),
+                        date_purchased DATE,
+                        expiration_date DATE
+                    ) ON COMMIT DROP
+                """)
+                cur.copy_expert("COPY pantry_import FROM STDIN WITH (FORMAT csv)", buffer)
+                cur.execute("""
+                    INSERT INTO usersProducts
+                    (userID, productUPC, quantity, quantityType, date_purchased, expiration_date)
+                    SELECT %s, productUPC, quantity, quantityType, date_purchased, expiration_date
+                    FROM pantry_import
+                """, (current_user_id,))
+                imported = cur.rowcount
+            else:
+                imported = 0
+            conn.commit()
+            forget_pantry(current_user_id)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+        return jsonify({
+            'success': True,
+            'message': f'Imported {imported} pantry items',
+            'imported': imported,
+            'errors': errors
+        })
+
+    except Exception as e:
+        print(f"Error importing pantry: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': 'Server error',
+            'status': 'SERVER_ERROR',
+            'details': str(e)
+        }), 500
+
+# Streaming pantry export
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '2000'))
+EXPORT_FIELDS = IMPORT_FIELDS + ['pantryID', 'productName', 'productBrand', 'productCategory']
+
+def stream_pantry_rows(conn, user_id):
+    """Yield pantry rows for a user in chunks from a server-side cursor"""
+    # A named cursor keeps the result set on the server; only one chunk is
+    # held in the worker at a time
+    cur = conn.cursor(name=f'pantry_export_{user_id}')
+    cur.itersize = EXPORT_CHUNK_ROWS
+    cur.execute("""
+        SELECT up.productUPC, up.quantity, up.quantityType, up.date_purchased,
+               up.expiration_date, up.pantryID, p.productName, p.productBrand,
+               p.productCategory
+        FROM usersProducts up
+        JOIN products p ON up.productUPC = p.productUPC
+        WHERE up.userID = %s
+        ORDER BY up.pantryID
+    """, (user_id,))
+    while True:
+        chunk = cur.fetchmany(EXPORT_CHUNK_ROWS)
+        if not chunk:
+            break
+        yield chunk
+    cur.close()
+
+def export_ndjson(chunks):
+    for chunk in chunks:
+        yield b"".join(
+            dumps_bytes(dict(zip(EXPORT_FIELDS, row)), iso_dates=True) + b"\n" for row in chunk
+        )
+
+def export_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.route('/api/pantry/export', methods=['GET'])
+@token_required
+def export_pantry(current_user_id):
+    """Stream the user's pantry as NDJSON (default) or CSV.
+
+    The columns match POST /api/pantry/import, so an export can be re-imported.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({
+            'success': False,
+            'error': 'format must be ndjson or csv',
+            'status': 'VALIDATION_ERROR'
+        }), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({
+            'success': False,
+            'error': 'Database connection failed',
+            'status': 'DB_ERROR'
+        }), 503
+
+    chunks = stream_pantry_rows(conn, current_user_id)
+    if export_format == 'csv':
+        body, mimetype = export_csv(chunks), 'text/csv'
+    else:
+        body, mimetype = export_ndjson(chunks), 'application/x-ndjson'
+
+    response = Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=pantry.{export_format}'
+    })
+    # Runs when the stream finishes or the client disconnects; closing the
+    # connection also discards the named cursor
+    response.call_on_close(conn.close)
+    return response
+
+# Server-sent pantry change events, so open clients refetch the pantry when
+# it changes instead of polling. EventSource cannot send an Authorization
+# header, so the stream is opened with a short-lived ticket in the query
+# string rather than the login token, which would end up in access logs.
+PANTRY_FEED_TICKET_SECONDS = 60
+PANTRY_FEED_HEARTBEAT = float(os.getenv('PANTRY_FEED_HEARTBEAT', '25'))
+# Streams end after this long and the browser reconnects, which spreads
+# them over workers again after a deploy
+PANTRY_FEED_MAX_SECONDS = float(os.getenv('PANTRY_FEED_MAX_SECONDS', '900'))
+# Set per worker by init_worker() from the gunicorn worker class
+pantry_feed = ChangeFeed(int(os.getenv('PANTRY_FEED_MAX_STREAMS', '100')))
+# Seconds a client turned away from a full feed polls before trying again
+PANTRY_FEED_RETRY_AFTER = int(os.getenv('PANTRY_FEED_RETRY_AFTER', '120'))
+
+def pantry_feed_busy():
+    response = jsonify({
+        'success': False,
+        'error': 'Too many open event streams, poll instead',
+        'status': 'SERVER_BUSY'
+    })
+    response.headers['Retry-After'] = str(PANTRY_FEED_RETRY_AFTER)
+    return response, 503
+
+@app.route('/api/pantry/events/ticket', methods=['POST'])
+@token_required
+def pantry_events_ticket(current_user_id):
+    # Turn clients away here, where fetch() can read the status; EventSource
+    # hides it. Another worker may still be full when the stream opens
+    if pantry_feed.is_full():
+        return pantry_feed_busy()
+    ticket = pyjwt.encode({
+        'user_id': current_user_id,
+        'scope': 'pantry-events',
+        'exp': datetime.utcnow() + timedelta(seconds=PANTRY_FEED_TICKET_SECONDS)
+    }, JWT_SECRET, algorithm="HS256")
+    return jsonify({
+        'success': True,
+        'ticket': ticket,
+        'expiresIn': PANTRY_FEED_TICKET_SECONDS
+    })
+
+@app.route('/api/pantry/events', methods=['GET'])
+def pantry_events():
+    """text/event-stream of pantry-changed events for the ticket's user"""
+    try:
+        data = pyjwt.decode(request.args.get('ticket', ''), JWT_SECRET, algorithms=["HS256"])
+        if data.get('scope') != 'pantry-events':
+            raise pyjwt.InvalidTokenError("not a pantry events ticket")
+    except pyjwt.InvalidTokenError:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid or expired event stream ticket',
+            'status': 'AUTH_ERROR'
+        }), 401
+    user_id = data['user_id']
+
+    try:
+        subscription = pantry_feed.subscribe(user_id)
+    except FeedFull:
+        return pantry_feed_busy()
+
+    def stream():
+        give_up_at = time.monotonic() + PANTRY_FEED_MAX_SECONDS
+        yield "retry: 5000\nevent: ready\ndata: {}\n\n"
+        while time.monotonic() < give_up_at:
+            if subscription.event.wait(PANTRY_FEED_HEARTBEAT):
+                subscription.event.clear()
+                yield f'event: pantry-changed\ndata: {{"userID": {user_id}}}\n\n'
+            else:
+                yield ": keep-alive\n\n"
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(lambda: pantry_feed.unsubscribe(subscription))
+    return response
+
 @app.route('/api/cook-recipe', methods=['POST'])
 @token_required
 def cook_recipe(current_user_id):
@@ -1477,7 +2922,7 @@ Only include pantry items that should be modified. Be precise with quantities an
 """
             print("Sending prompt to OpenAI")
             
-            response = client.chat.completions.create(
+            response = openai_client().chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a precise cooking assistant that helps track pantry inventory."},
@@ -1565,8 +3010,8 @@ Only include pantry items that should be modified. Be precise with quantities an
                 
                 if remove_completely:
                     cur.execute(
-                        "DELETE FROM usersProducts WHERE pantryID = %s",
-                        (pantry_id,)
+                        "DELETE FROM usersProducts WHERE pantryID = %s AND userID = %s",
+                        (pantry_id, current_user_id)
                     )
                     removed_items.append(pantry_id)
                 else:
@@ -1577,20 +3022,21 @@ Only include pantry items that should be modified. Be precise with quantities an
                     if new_quantity <= 0:
                         # If quantity becomes 0 or negative, remove the item
                         cur.execute(
-                            "DELETE FROM usersProducts WHERE pantryID = %s",
-                            (pantry_id,)
+                            "DELETE FROM usersProducts WHERE pantryID = %s AND userID = %s",
+                            (pantry_id, current_user_id)
                         )
                         removed_items.append(pantry_id)
                     else:
                         # Update the quantity
                         cur.execute(
-                            "UPDATE usersProducts SET quantity = %s WHERE pantryID = %s RETURNING *",
-                            (new_quantity, pantry_id)
+                            "UPDATE usersProducts SET quantity = %s WHERE pantryID = %s AND userID = %s RETURNING *",
+                            (new_quantity, pantry_id, current_user_id)
                         )
                         updated_item = cur.fetchone()
                         updated_items.append(updated_item)
             
             conn.commit()
+            forget_pantry(current_user_id)
             cur.close()
             conn.close()
             
@@ -1626,6 +3072,48 @@ Only include pantry items that should be modified. Be precise with quantities an
             'details': str(e)
         }), 500
 
+# The counters name replicas and cache paths and show queue depths and
+# upstream traffic, so they are for operators only: /api/metrics needs
+# "Authorization: Bearer <METRICS_TOKEN>" and is off when it is unset
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Per-worker counters for the caches and local shortcuts in front of the APIs"""
+    if not METRICS_TOKEN:
+        return jsonify({
+            'success': False,
+            'error': 'Metrics are disabled',
+            'status': 'NOT_FOUND'
+        }), 404
+    supplied = request.headers.get('Authorization', '').encode('utf-8')
+    if not hmac.compare_digest(supplied, f'Bearer {METRICS_TOKEN}'.encode('utf-8')):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid metrics token',
+            'status': 'AUTH_ERROR'
+        }), 401
+    return jsonify({
+        "success": True,
+        "pid": os.getpid(),
+        "categorizer": categorizer_stats(),
+        "upc_lookups": upc_lookup_metrics(),
+        "product_refresher": product_refresher.stats(),
+        "product_cache": product_cache.stats(),
+        "offline_catalog": catalog_stats(),
+        "goupc_http": goupc_client.stats(),
+        "product_writer": product_writer.stats(),
+        "db_routing": replica_router.stats() if replica_router else None,
+        "password_hashing": password_hasher.stats(),
+        "pantry_snapshots": pantry_snapshots.stats(),
+        "pantry_feed": pantry_feed.stats(),
+        "image_cache": image_cache.stats(),
+        "image_http": image_client.stats(),
+        "image_fetches": image_flight.stats(),
+        "pg_listener": pg_listener.stats() if pg_listener else None,
+        "startup": startup.report()
+    })
+
 @app.route('/api/test', methods=['GET'])
 def test_endpoint():
     """Simple test endpoint to check if the backend is running"""
@@ -1670,6 +3158,9 @@ def test_endpoint():
             "error": str(e)
         }), 500
 
+startup.mark('routes')
+startup.finish_import()
+
 if __name__ == '__main__':
     # Run on port 5001 to avoid conflicts
     app.run(debug=True, port=5001)
@@ -0,0 +1,82 @@
+"""Encode-time benchmark for a large pantry response.
+
+Compares Flask's stdlib encoder against the orjson provider, with RealDictRow
+style dict rows, with tuple rows wrapped in Rows, and with the compact shape
+that sends each product once. Sizes are shown raw and gzipped.
+
+    python bench_json.py [rows] [repeats]
+"""
+import gzip
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+from flask.json.provider import _default as flask_default
+
+from json_provider import Rows, dumps_bytes, split_rows
+
+COLUMNS = ['pantryid', 'userid', 'productupc', 'quantity', 'quantitytype',
+           'date_purchased', 'expiration_date', 'productname', 'productbrand',
+           'productcategory', 'productimages']
+PRODUCT_FIELDS = ('productname', 'productbrand', 'productcategory', 'productimages')
+
+
+def make_rows(n):
+    today = date.today()
+    return [
+        (i, 1, 12345678900 + i % 500, float(i % 7 + 1), 'items', today - timedelta(days=i % 30),
+         today + timedelta(days=i % 90), f'Product {i % 500}', f'Brand {i % 40}', 'Dairy & Eggs',
+         [f'https://go-upc.s3.amazonaws.com/images/{12345678900 + i % 500}.jpeg'])
+        for i in range(n)
+    ]
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, out
+
+
+def compact(tuples, columnar=False):
+    products, lots = split_rows(Rows(COLUMNS, tuples, columnar), 'productupc', PRODUCT_FIELDS, drop=('userid',))
+    return {'success': True, 'shape': 'compact', 'products': products, 'pantry_items': lots}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    tuples = make_rows(n)
+
+    cases = [
+        ('stdlib json, dict rows (Flask default)',
+         lambda: json.dumps({'success': True, 'pantry_items': [dict(zip(COLUMNS, r)) for r in tuples]},
+                            default=flask_default, sort_keys=True).encode('utf-8')),
+        ('orjson, dict rows',
+         lambda: dumps_bytes({'success': True, 'pantry_items': [dict(zip(COLUMNS, r)) for r in tuples]})),
+        ('orjson, Rows',
+         lambda: dumps_bytes({'success': True, 'pantry_items': Rows(COLUMNS, tuples)})),
+        ('orjson, Rows, ISO dates',
+         lambda: dumps_bytes({'success': True, 'pantry_items': Rows(COLUMNS, tuples)}, iso_dates=True)),
+        ('orjson, Rows columnar, ISO dates',
+         lambda: dumps_bytes({'success': True, 'pantry_items': Rows(COLUMNS, tuples, columnar=True)}, iso_dates=True)),
+        ('orjson, compact',
+         lambda: dumps_bytes(compact(tuples))),
+        ('orjson, compact columnar, ISO dates',
+         lambda: dumps_bytes(compact(tuples, columnar=True), iso_dates=True)),
+    ]
+
+    print(f"Encoding a {n}-row pantry, best of {repeats}")
+    baseline = None
+    for name, fn in cases:
+        ms, out = best_of(fn, repeats)
+        baseline = baseline or ms
+        zipped = len(gzip.compress(out, 6))
+        print(f"  {name:<40} {ms:8.2f} ms  {len(out) / 1024:8.0f} KiB  {zipped / 1024:6.0f} KiB gz  {baseline / ms:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
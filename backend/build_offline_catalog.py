@@ -0,0 +1,124 @@
+"""Compile a Go-UPC catalog dump into an offline catalog file for lookup_upc.
+
+    python build_offline_catalog.py catalog.jsonl [-o upc_catalog.bin] [--run-size 1000000]
+
+Accepts the same JSONL and CSV dumps as load_catalog.py. Records are
+streamed into a temporary heap file. Their index entries (key, offset,
+length) are sorted in runs of --run-size entries, written to temporary
+files and merged, so memory stays around 100 MB for the default run size
+however many products the dump holds. When a UPC appears more than once
+the last record wins, and only that one is copied into the output; disk use
+is about twice the output plus any duplicates. Workers pick up a rebuilt
+file on restart.
+"""
+import argparse
+import heapq
+import json
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from operator import itemgetter
+
+from gtin import canonical_upc, display_gtin, normalize_gtin
+from offline_catalog import CATALOG_PATH, write_catalog
+from product_catalog import goupc_to_product, read_catalog
+
+# Index entry in a sorted run: key, heap offset, record length
+ENTRY = struct.Struct('<QQI')
+READ_ENTRIES = 65536
+
+def write_run(keys, offsets, lengths):
+    """Sort one run of index entries by key (stably) into a temporary file"""
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    run = tempfile.TemporaryFile()
+    for start in range(0, len(order), READ_ENTRIES):
+        run.write(b''.join(ENTRY.pack(keys[i], offsets[i], lengths[i])
+                           for i in order[start:start + READ_ENTRIES]))
+    run.seek(0)
+    return run
+
+def read_run(run):
+    while True:
+        block = run.read(ENTRY.size * READ_ENTRIES)
+        if not block:
+            return
+        yield from ENTRY.iter_unpack(block)
+
+def last_of_each_key(entries):
+    """The last entry of every run of equal keys in sorted ``entries``"""
+    previous = None
+    for entry in entries:
+        if previous is not None and entry[0] != previous[0]:
+            yield previous
+        previous = entry
+    if previous is not None:
+        yield previous
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline UPC catalog from a Go-UPC dump")
+    parser.add_argument('path', help="catalog file (.jsonl or .csv)")
+    parser.add_argument('-o', '--output', default=CATALOG_PATH, help=f"catalog file to write (default {CATALOG_PATH})")
+    parser.add_argument('--run-size', type=int, default=1000000,
+                        help="index entries sorted in memory at a time (default 1,000,000)")
+    args = parser.parse_args()
+
+    started = time.time()
+    skipped = read = 0
+    runs = []
+    keys, offsets, lengths = array('Q'), array('Q'), array('I')
+    with tempfile.TemporaryFile() as heap:
+        position = 0
+        for record, _ in read_catalog(args.path):
+            if isinstance(record, Exception):
+                skipped += 1
+                continue
+            product_data = goupc_to_product(record)
+            gtin14, _ = normalize_gtin(product_data.get('upc'))
+            if not gtin14 or not (product_data.get('title') or '').strip():
+                skipped += 1
+                continue
+            product_data['upc'] = display_gtin(gtin14)
+            data = json.dumps(product_data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            heap.write(data)
+            keys.append(canonical_upc(gtin14))
+            offsets.append(position)
+            lengths.append(len(data))
+            position += len(data)
+            read += 1
+            if len(keys) >= args.run_size:
+                runs.append(write_run(keys, offsets, lengths))
+                keys, offsets, lengths = array('Q'), array('Q'), array('I')
+            if read % 1000000 == 0:
+                print(f"  {read:,} records read")
+        if keys:
+            runs.append(write_run(keys, offsets, lengths))
+        del keys, offsets, lengths
+
+        # heapq.merge keeps runs in order on equal keys, and each run is
+        # sorted stably, so the last of several records for a UPC ends up last
+        merged = heapq.merge(*(read_run(run) for run in runs), key=itemgetter(0))
+        count = 0
+        with tempfile.TemporaryFile() as keys_file, tempfile.TemporaryFile() as offsets_file, \
+                tempfile.TemporaryFile() as lengths_file:
+            sections = (array('Q'), array('Q'), array('I'))
+            for entry in last_of_each_key(merged):
+                for section, value in zip(sections, entry):
+                    section.append(value)
+                count += 1
+                if len(sections[0]) >= READ_ENTRIES:
+                    for section, f in zip(sections, (keys_file, offsets_file, lengths_file)):
+                        section.tofile(f)
+                    sections = (array('Q'), array('Q'), array('I'))
+            for section, f in zip(sections, (keys_file, offsets_file, lengths_file)):
+                section.tofile(f)
+            for run in runs:
+                run.close()
+            write_catalog(args.output, count, keys_file, offsets_file, lengths_file, heap)
+
+    print(f"Wrote {count:,} products to {args.output} ({read - count:,} duplicates, "
+          f"{skipped:,} skipped) in {time.time() - started:.1f}s")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""Local food categorisation that runs without calling OpenAI.
+
+Keyword rules suggest a category from the product name ("Whole Milk",
+"Spaghetti", "Dog Chow"), and a naive Bayes model trained on our own
+GPT-labelled products predicts one too. A category is used when the model
+agrees with the rules, or when either clears CATEGORY_CONFIDENCE on its own.
+Rule hits count as CATEGORY_RULE_CONFIDENCE (0.8 by default, below the
+threshold) until train_categorizer.py has measured their accuracy against
+GPT labels. Anything left is deferred to get_gpt_category in app.py.
+"""
+import json
+import math
+import os
+import re
+import threading
+
+# Predefined food categories
+FOOD_CATEGORIES = [
+    "Fruits & Vegetables",
+    "Meat & Seafood",
+    "Dairy & Eggs",
+    "Bread & Bakery",
+    "Pantry Staples",
+    "Snacks",
+    "Beverages",
+    "Frozen Foods",
+    "Canned Goods",
+    "Condiments & Sauces",
+    "Baking Supplies",
+    "Breakfast Foods",
+    "Pasta & Rice",
+    "Herbs & Spices",
+    "Ready-to-Eat Meals",
+    "Baby Food & Formula",
+    "Pet Food",
+    "Other"
+]
+
+# Multi-word keywords are checked before single words, so "peanut butter"
+# is Pantry Staples even though "butter" alone is Dairy. A name that matches
+# keywords of more than one category at the same level is left to the model
+# or GPT ("chicken noodle soup" is neither Meat nor Pasta), unless one of
+# them is in OVERRIDING_CATEGORIES: "frozen broccoli" is Frozen Foods
+OVERRIDING_CATEGORIES = ("Pet Food", "Baby Food & Formula", "Frozen Foods")
+
+KEYWORD_RULES = [
+    ("Pet Food", ["dog food", "cat food", "dog chow", "cat chow", "kibble", "pet food", "dog treat",
+                  "cat treat", "cat litter", "purina", "pedigree", "meow mix", "friskies", "fancy feast"]),
+    ("Baby Food & Formula", ["infant formula", "baby formula", "baby food", "toddler", "similac", "enfamil",
+                             "gerber"]),
+    ("Frozen Foods", ["frozen", "ice cream", "popsicle", "gelato", "sorbet"]),
+    ("Canned Goods", ["canned", "in a can", "soup", "cream of mushroom", "cream of chicken"]),
+    ("Herbs & Spices", ["oregano", "basil leaves", "paprika", "cumin", "cinnamon", "black pepper", "peppercorn",
+                        "chili powder", "garlic powder", "onion powder", "seasoning", "thyme", "rosemary",
+                        "turmeric", "nutmeg", "spice"]),
+    ("Baking Supplies", ["flour", "baking soda", "baking powder", "yeast", "cake mix", "brownie mix",
+                         "chocolate chips", "vanilla extract", "frosting", "cornstarch", "brown sugar",
+                         "powdered sugar", "granulated sugar"]),
+    ("Breakfast Foods", ["cereal", "oatmeal", "granola", "pancake", "waffle", "syrup", "cheerios",
+                         "corn flakes", "pop-tarts", "pop tarts", "cinnamon toast crunch", "toast crunch"]),
+    ("Pasta & Rice", ["spaghetti", "penne", "pasta", "macaroni", "linguine", "fettuccine", "rigatoni",
+                      "lasagna", "noodle", "ramen", "rice", "couscous", "quinoa", "orzo"]),
+    ("Condiments & Sauces", ["ketchup", "mustard", "mayonnaise", "mayo", "salsa", "hot sauce", "soy sauce",
+                             "barbecue sauce", "bbq sauce", "dressing", "pasta sauce", "marinara", "relish",
+                             "vinegar", "sriracha", "sauce"]),
+    ("Dairy & Eggs", ["milk", "cheese", "yogurt", "yoghurt", "butter", "cream", "eggs", "egg", "cottage",
+                      "sour cream", "kefir"]),
+    ("Meat & Seafood", ["chicken", "beef", "pork", "turkey", "bacon", "sausage", "ham", "salmon", "tuna",
+                        "shrimp", "fish", "steak", "ground meat", "jerky", "lamb"]),
+    ("Bread & Bakery", ["bread", "bagel", "tortilla", "bun", "roll", "croissant", "muffin", "baguette",
+                        "pita", "english muffin"]),
+    ("Beverages", ["water", "soda", "juice", "coffee", "tea", "cola", "lemonade", "sparkling", "energy drink",
+                   "sports drink", "kombucha", "beer", "wine", "gatorade"]),
+    ("Snacks", ["chips", "crackers", "cookies", "cookie", "pretzel", "popcorn", "candy", "chocolate bar",
+                "granola bar", "trail mix", "nuts", "almonds", "peanuts", "gummies", "potato chips",
+                "tortilla chips", "fruit roll-up*", "fruit snack*"]),
+    ("Fruits & Vegetables", ["apple", "banana", "orange", "lettuce", "spinach", "tomato", "potato", "onion",
+                             "carrot", "broccoli", "berries", "strawberr*", "blueberr*", "raspberr*", "grape",
+                             "avocado", "lemon", "lime", "cucumber", "pepper", "celery", "kale", "produce"]),
+    ("Ready-to-Eat Meals", ["meal kit", "entree", "sandwich", "burrito", "lunchable", "microwave", "ready meal",
+                            "heat and eat"]),
+    ("Pantry Staples", ["olive oil", "vegetable oil", "canola oil", "sugar", "salt", "beans", "lentils",
+                        "peanut butter", "honey", "broth", "stock", "oil"]),
+]
+
+def compile_keyword_rules(rules):
+    compiled = []
+    for category, keywords in rules:
+        # Whole-word match allowing a plural "s"; a trailing "*" matches any
+        # ending ("strawberr*" covers strawberry and strawberries)
+        pattern = "|".join(
+            re.escape(k[:-1]) + r"\w*" if k.endswith("*") else re.escape(k) + r"s?\b"
+            for k in keywords
+        )
+        compiled.append((category, re.compile(r"\b(?:" + pattern + ")")))
+    return compiled
+
+def _split_rules(rules):
+    """(multi-word rules, single-word rules), each compiled per category"""
+    multi = [(category, [k for k in keywords if len(k.split()) > 1]) for category, keywords in rules]
+    single = [(category, [k for k in keywords if len(k.split()) == 1]) for category, keywords in rules]
+    return tuple(
+        compile_keyword_rules([(category, keywords) for category, keywords in level if keywords])
+        for level in (multi, single)
+    )
+
+_RULE_LEVELS = _split_rules(KEYWORD_RULES)
+
+def product_text(product_data):
+    """Lower-cased name, brand and description in the Go-UPC field layout"""
+    return " ".join(
+        str(product_data.get(field) or "") for field in ("title", "brand", "description")
+    ).lower()
+
+def _text_category(text):
+    """(category, matched): the one category the keywords in ``text`` point to.
+
+    matched is True when any keyword matched, so an ambiguous text gives
+    (None, True).
+    """
+    for rules in _RULE_LEVELS:
+        categories = {category for category, pattern in rules if pattern.search(text)}
+        overriding = categories.intersection(OVERRIDING_CATEGORIES)
+        if len(overriding) == 1:
+            return overriding.pop(), True
+        if len(categories) == 1:
+            return categories.pop(), True
+        if categories:
+            return None, True
+    return None, False
+
+def rule_category(product_data):
+    """Category from the keyword rules, or None when none or several match.
+
+    The product name is checked on its own first so that a description which
+    mentions other foods ("great with milk") does not override it.
+    """
+    name = str(product_data.get("title") or "").lower()
+    for text in (name, product_text(product_data)):
+        if not text.strip():
+            continue
+        category, matched = _text_category(text)
+        if matched:
+            return category
+    return None
+
+# Token features: lower-case words from name and description, plus the brand
+# as a single "brand:" token since brands are strong category signals
+_TOKEN_RE = re.compile(r"[a-z][a-z']+")
+_STOPWORDS = frozenset("and the with for of in a an to oz lb ct fl pack count size new".split())
+
+def product_features(product_data):
+    text = " ".join(
+        str(product_data.get(field) or "") for field in ("title", "description")
+    ).lower()
+    tokens = [t for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS]
+    brand = str(product_data.get("brand") or "").strip().lower()
+    if brand:
+        tokens.append("brand:" + brand)
+    return tokens
+
+class NaiveBayesCategorizer:
+    """Multinomial naive Bayes over product_features, trained on our own
+    GPT-labelled products (see train_categorizer.py)."""
+
+    def __init__(self, categories, log_priors, token_log_probs):
+        self.categories = categories
+        self.log_priors = log_priors
+        self.token_log_probs = token_log_probs
+
+    @classmethod
+    def fit(cls, samples, min_count=2, max_vocab=200000):
+        """Train from (product_data, category) pairs"""
+        categories = list(FOOD_CATEGORIES)
+        index = {c: i for i, c in enumerate(categories)}
+        doc_counts = [0] * len(categories)
+        token_counts = {}
+        for product_data, category in samples:
+            i = index[category]
+            doc_counts[i] += 1
+            for token in product_features(product_data):
+                counts = token_counts.get(token)
+                if counts is None:
+                    counts = token_counts[token] = [0] * len(categories)
+                counts[i] += 1
+
+        vocab = sorted(
+            (t for t, counts in token_counts.items() if sum(counts) >= min_count),
+            key=lambda t: -sum(token_counts[t])
+        )[:max_vocab]
+        totals = [0] * len(categories)
+        for token in vocab:
+            for i, n in enumerate(token_counts[token]):
+                totals[i] += n
+
+        # Laplace smoothing
+        denominators = [total + len(vocab) for total in totals]
+        token_log_probs = {
+            token: [math.log((n + 1) / d) for n, d in zip(token_counts[token], denominators)]
+            for token in vocab
+        }
+        n_docs = sum(doc_counts)
+        log_priors = [math.log((n + 1) / (n_docs + len(categories))) for n in doc_counts]
+        return cls(categories, log_priors, token_log_probs)
+
+    def predict(self, product_data):
+        """(category, confidence) where confidence is the posterior probability"""
+        scores = list(self.log_priors)
+        seen = False
+        for token in product_features(product_data):
+            log_probs = self.token_log_probs.get(token)
+            if log_probs is not None:
+                seen = True
+                scores = [s + p for s, p in zip(scores, log_probs)]
+        if not seen:
+            return None, 0.0
+        best = max(range(len(scores)), key=scores.__getitem__)
+        top = scores[best]
+        confidence = 1.0 / sum(math.exp(s - top) for s in scores)
+        return self.categories[best], confidence
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "categories": self.categories,
+                "log_priors": self.log_priors,
+                "token_log_probs": self.token_log_probs,
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["categories"], data["log_priors"], data["token_log_probs"])
+
+MODEL_PATH = os.getenv('CATEGORY_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_model.json'))
+CONFIDENCE_THRESHOLD = float(os.getenv('CATEGORY_CONFIDENCE', '0.9'))
+# Confidence of a rule hit the model does not confirm; raise it to the
+# rules accuracy train_categorizer.py reports to let rules answer alone
+RULE_CONFIDENCE = float(os.getenv('CATEGORY_RULE_CONFIDENCE', '0.8'))
+
+_model = None
+_model_loaded = False
+_lock = threading.Lock()
+_stats = {'rules': 0, 'model': 0, 'deferred': 0}
+
+def get_model():
+    """The trained model, loaded on first use; None if it has not been trained"""
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _lock:
+            if not _model_loaded:
+                if os.path.exists(MODEL_PATH):
+                    try:
+                        _model = NaiveBayesCategorizer.load(MODEL_PATH)
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"Could not load category model {MODEL_PATH}: {e}")
+                _model_loaded = True
+    return _model
+
+def classify(product_data, threshold=None, model=None, rule_confidence=None):
+    """(category, confidence, source) from the rules and the model.
+
+    source is 'rules' when the rules answered (alone or confirmed by the
+    model) and 'model' when the model answered alone; category is None when
+    neither is confident enough, which is the caller's cue to ask GPT.
+    ``model`` defaults to the trained model.
+    """
+    threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+    rule_confidence = RULE_CONFIDENCE if rule_confidence is None else rule_confidence
+    if model is None:
+        model = get_model()
+    rule = rule_category(product_data)
+    predicted, confidence = model.predict(product_data) if model else (None, 0.0)
+
+    if rule and rule == predicted:
+        return rule, max(rule_confidence, confidence), 'rules'
+    if rule and rule_confidence >= threshold and (predicted is None or confidence < threshold):
+        return rule, rule_confidence, 'rules'
+    if predicted and confidence >= threshold and rule is None:
+        return predicted, confidence, 'model'
+    # No answer, or the rules and a confident model disagree
+    return None, max(confidence, rule_confidence if rule else 0.0), None
+
+def local_category(product_data):
+    """Category if the local classifier is confident, else None. Counts each outcome."""
+    category, _, source = classify(product_data)
+    with _lock:
+        _stats[source or 'deferred'] += 1
+    return category
+
+def categorizer_stats():
+    with _lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    stats['total'] = total
+    stats['deferral_rate'] = round(stats['deferred'] / total, 4) if total else None
+    stats['model_loaded'] = _model is not None
+    stats['confidence_threshold'] = CONFIDENCE_THRESHOLD
+    return stats
@@ -0,0 +1,130 @@
+"""Fail when the backend's cold start grows past a budget.
+
+    python check_cold_start.py [--budget-ms 600] [--runs 5] [--forbid openai,requests] [--top 15]
+
+Each run is a fresh interpreter that imports app and serves one request
+(GET /api/metrics with a throwaway METRICS_TOKEN, which needs no database)
+through the test client. The median of the runs is compared against the
+budget. Timings vary with the machine, so the check also fails when a
+module that should only load on first use is imported at startup; that
+part does not depend on timing.
+When a check fails, the slowest imports from ``-X importtime`` are listed.
+Exits 1 on failure, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROBE = """
+import json, os, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/metrics', headers={
+    'Authorization': f"Bearer {os.environ['METRICS_TOKEN']}"})
+served = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'phases_ms': app.startup.report()['phases_ms'],
+    'modules': sorted(sys.modules),
+}))
+"""
+
+
+def probe_env():
+    env = dict(os.environ)
+    # Startup must not depend on secrets or a reachable database
+    env.setdefault('JWT_SECRET', 'cold-start-check')
+    env.setdefault('METRICS_TOKEN', 'cold-start-check')
+    return env
+
+
+def run_probe(env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        sys.exit(f"Probe failed:\n{result.stderr[-4000:]}")
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    if probe['status'] != 200:
+        sys.exit(f"Probe request answered {probe['status']}")
+    probe['wall_ms'] = wall_ms
+    probe['importtime'] = result.stderr
+    return probe
+
+
+def slowest_imports(importtime, top):
+    """(cumulative ms, module) of the slowest top-level imports in ``-X importtime`` output"""
+    rows = []
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        try:
+            micros = int(cumulative)
+        except ValueError:
+            continue
+        # Top-level imports are indented by two spaces at most
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((micros / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the backend's cold start against a budget")
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('COLD_START_BUDGET_MS', '600')),
+                        help="median import plus first request, in ms (default 600)")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--forbid', default='openai,requests',
+                        help="modules that must not be imported at startup (comma-separated)")
+    parser.add_argument('--top', type=int, default=15, help="slowest imports to list on failure")
+    parser.add_argument('--verbose', action='store_true', help="list the slowest imports even on success")
+    args = parser.parse_args()
+
+    env = probe_env()
+    probes = [run_probe(env) for _ in range(max(1, args.runs))]
+
+    import_ms = statistics.median(p['import_ms'] for p in probes)
+    request_ms = statistics.median(p['first_request_ms'] for p in probes)
+    wall_ms = statistics.median(p['wall_ms'] for p in probes)
+    total_ms = import_ms + request_ms
+    phases = {name: statistics.median(p['phases_ms'][name] for p in probes) for name in probes[0]['phases_ms']}
+
+    print(f"Cold start over {len(probes)} run(s), median:")
+    print(f"  import app        {import_ms:8.1f} ms")
+    for name, ms in phases.items():
+        print(f"    {name:<15} {ms:8.1f} ms")
+    print(f"  first request     {request_ms:8.1f} ms")
+    print(f"  total             {total_ms:8.1f} ms  (budget {args.budget_ms:.0f} ms)")
+    print(f"  process wall time {wall_ms:8.1f} ms")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"cold start {total_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    forbidden = [m.strip() for m in args.forbid.split(',') if m.strip()]
+    loaded = set(probes[0]['modules'])
+    for module in forbidden:
+        if module in loaded:
+            failures.append(f"{module} is imported at startup; it should load on first use")
+
+    if failures or args.verbose:
+        print("Slowest imports:")
+        for ms, name in slowest_imports(probes[-1]['importtime'], args.top):
+            print(f"  {ms:8.1f} ms  {name}")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
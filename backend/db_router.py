@@ -0,0 +1,130 @@
+"""Routing of read-only queries to Postgres replicas."""
+import itertools
+import threading
+import time
+
+import psycopg2
+
+# Seconds the replica is behind; 0 when it has replayed everything it received
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class Replica:
+    __slots__ = ('name', 'pool', 'lag', 'checked_at', 'healthy')
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.lag = None
+        self.checked_at = 0.0
+        self.healthy = True
+
+
+class ReplicaRouter:
+    """Hands out replica connections for reads, round robin.
+
+    A replica is taken out of rotation while its replication lag is over
+    ``max_lag`` seconds, or for ``check_interval`` seconds after it fails.
+    Lag is measured on the connection being handed out, at most once per
+    ``check_interval``. A user who wrote in the last ``sticky_seconds`` reads
+    from the primary, so they always see their own writes.
+    """
+
+    def __init__(self, pools, max_lag=5.0, check_interval=5.0, sticky_seconds=5.0):
+        self.replicas = [Replica(name, pool) for name, pool in pools]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self._next = itertools.cycle(range(len(self.replicas)))
+        self._lock = threading.Lock()
+        self._recent_writes = {}
+        self._counts = {'primary': 0}
+        self._primary_reasons = {'sticky': 0, 'no_replica': 0}
+        for replica in self.replicas:
+            self._counts[replica.name] = 0
+
+    def note_write(self, user_id):
+        if user_id is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[user_id] = now
+            if len(self._recent_writes) > 10000:
+                cutoff = now - self.sticky_seconds
+                self._recent_writes = {u: t for u, t in self._recent_writes.items() if t > cutoff}
+
+    def is_sticky(self, user_id):
+        if user_id is None:
+            return False
+        with self._lock:
+            wrote_at = self._recent_writes.get(user_id)
+        return wrote_at is not None and time.monotonic() - wrote_at < self.sticky_seconds
+
+    def count_primary(self, reason=None):
+        with self._lock:
+            self._counts['primary'] += 1
+            if reason:
+                self._primary_reasons[reason] += 1
+
+    def _check(self, replica, conn):
+        """Measure lag on ``conn`` if due; False if the replica should not be used"""
+        now = time.monotonic()
+        if now - replica.checked_at < self.check_interval:
+            return replica.healthy
+        replica.checked_at = now
+        cur = conn.cursor()
+        cur.execute(LAG_SQL)
+        replica.lag = float(cur.fetchone()[0])
+        cur.close()
+        conn.rollback()
+        if replica.healthy and replica.lag > self.max_lag:
+            print(f"Replica {replica.name} is {replica.lag:.1f}s behind; out of rotation")
+        elif not replica.healthy and replica.lag <= self.max_lag:
+            print(f"Replica {replica.name} caught up; back in rotation")
+        replica.healthy = replica.lag <= self.max_lag
+        return replica.healthy
+
+    def acquire(self, user_id=None):
+        """A replica connection for ``user_id``'s read, or None to use the primary"""
+        if self.is_sticky(user_id):
+            self.count_primary('sticky')
+            return None
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[next(self._next)]
+            if not replica.healthy and time.monotonic() - replica.checked_at < self.check_interval:
+                continue
+            conn = None
+            try:
+                conn = replica.pool.acquire()
+                if self._check(replica, conn):
+                    with self._lock:
+                        self._counts[replica.name] += 1
+                    return conn
+            except psycopg2.Error as e:
+                print(f"Replica {replica.name} unavailable: {e}")
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+            if conn is not None:
+                conn.close()
+        self.count_primary('no_replica')
+        return None
+
+    def close_all(self):
+        for replica in self.replicas:
+            replica.pool.close_all()
+
+    def stats(self):
+        with self._lock:
+            stats = {'reads': dict(self._counts), 'primary_reasons': dict(self._primary_reasons)}
+        stats['replicas'] = [
+            {'name': r.name, 'healthy': r.healthy,
+             'lag_seconds': round(r.lag, 3) if r.lag is not None else None}
+            for r in self.replicas
+        ]
+        return stats
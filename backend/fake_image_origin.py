@@ -0,0 +1,106 @@
+"""Local stand-in for the remote image host, for trying the image proxy offline.
+
+    python fake_image_origin.py [--port 8765] [--size 800] [--latency-ms 200] [--fail-every 0]
+
+Every path ending in .png answers with a generated PNG of --size pixels
+square, coloured from the path, so each URL is a different image and the
+same URL is always the same image. GET /stats returns how often each path
+was fetched, which shows whether the proxy fetched an image once or on every
+request. Point the proxy at it with
+
+    IMAGE_PROXY_HOSTS=127.0.0.1
+    UPDATE products SET productImages = ARRAY['http://127.0.0.1:8765/<upc>.png'] WHERE productUPC = <upc>;
+"""
+import argparse
+import hashlib
+import json
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def png_bytes(size, rgb):
+    """A ``size`` x ``size`` PNG with a diagonal gradient over ``rgb``"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+    r, g, b = rgb
+    raw = bytearray()
+    for y in range(size):
+        raw.append(0)  # no filter
+        for x in range(size):
+            shade = (x + y) * 128 // (2 * size)
+            raw += bytes(((r + shade) % 256, (g + shade) % 256, (b + shade) % 256))
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(bytes(raw), 6)) + chunk(b'IEND', b'')
+
+
+def make_handler(args):
+    counts = {}
+    lock = threading.Lock()
+    images = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/stats':
+                with lock:
+                    body = json.dumps({'requests': dict(counts), 'total': sum(counts.values())}, indent=2)
+                return self._send(200, body.encode('utf-8'), 'application/json')
+            if not path.endswith('.png'):
+                return self._send(404, b'not found', 'text/plain')
+
+            with lock:
+                counts[path] = counts.get(path, 0) + 1
+                count = sum(counts.values())
+            if args.latency_ms:
+                time.sleep(args.latency_ms / 1000)
+            if args.fail_every and count % args.fail_every == 0:
+                return self._send(503, b'try again', 'text/plain')
+
+            with lock:
+                body = images.get(path)
+            if body is None:
+                body = png_bytes(args.size, hashlib.sha256(path.encode('utf-8')).digest()[:3])
+                with lock:
+                    images[path] = body
+            self._send(200, body, 'image/png')
+
+        def log_message(self, format, *log_args):
+            if not args.quiet:
+                super().log_message(format, *log_args)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve generated product images for the image proxy")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--size', type=int, default=800, help="image width and height in pixels (default 800)")
+    parser.add_argument('--latency-ms', type=int, default=0, help="delay before every image response")
+    parser.add_argument('--fail-every', type=int, default=0, help="answer every Nth image request with 503")
+    parser.add_argument('--quiet', action='store_true', help="do not log requests")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args))
+    print(f"Serving generated images on http://{args.host}:{args.port}/<name>.png (stats at /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Barcode normalisation: UPC-E, UPC-A, EAN-8, EAN-13 and GTIN-14.
+
+Every barcode of a product maps to one GTIN-14. Because productUPC is a
+BIGINT, the GTIN-14 of a UPC-A, its EAN-13 form (leading 0) and its GTIN-14
+form (leading 00) all have the same key. UPC-E does not, so it is expanded
+to UPC-A first.
+"""
+import re
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def check_digit(body):
+    """GS1 mod-10 check digit for the digits of ``body`` (without the check digit)"""
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return str((10 - total % 10) % 10)
+
+
+def has_valid_check_digit(code):
+    return len(code) > 1 and check_digit(code[:-1]) == code[-1]
+
+
+def expand_upce(upce):
+    """Expand an 8-digit UPC-E (number system, six digits, check) to UPC-A"""
+    ns, d, check = upce[0], upce[1:7], upce[7]
+    last = d[5]
+    if last in "012":
+        body = d[0:2] + last + "0000" + d[2:5]
+    elif last == "3":
+        body = d[0:3] + "00000" + d[3:5]
+    elif last == "4":
+        body = d[0:4] + "00000" + d[4]
+    else:
+        body = d[0:5] + "0000" + last
+    return ns + body + check
+
+
+def normalize_gtin(code):
+    """Return (gtin14, None) for a valid barcode, or (None, error message).
+
+    Accepts UPC-E (6 digits without number system and check digit, or 8
+    digits starting with 0 or 1), EAN-8, UPC-A, EAN-13 and GTIN-14, and
+    UPC-A/UPC-E codes whose leading zeros were lost by storing them as numbers.
+    """
+    digits = _NON_DIGITS.sub("", str(code or ""))
+    if not digits:
+        return None, "Invalid UPC format. Must contain digits."
+
+    n = len(digits)
+    if n == 6:
+        # Zero-suppressed body only: number system 0, check digit computed
+        upca = expand_upce("0" + digits + "0")[:11]
+        digits = upca + check_digit(upca)
+        n = 12
+    elif n == 7:
+        digits = digits.zfill(8)
+        n = 8
+
+    if n == 8:
+        if digits[0] in "01":
+            upca = expand_upce(digits)
+            if has_valid_check_digit(upca):
+                return upca.zfill(14), None
+        if has_valid_check_digit(digits):
+            return digits.zfill(14), None  # EAN-8
+        return None, "Invalid UPC check digit."
+
+    if 9 <= n <= 11:
+        digits = digits.zfill(12)
+    elif n not in (12, 13, 14):
+        return None, "Invalid UPC length. Must be 8, 12, 13 or 14 digits."
+
+    if not has_valid_check_digit(digits):
+        return None, "Invalid UPC check digit."
+    return digits.zfill(14), None
+
+
+def display_gtin(gtin14):
+    """Shortest standard form of a GTIN-14: UPC-A, EAN-13 or GTIN-14"""
+    if gtin14.startswith("00"):
+        return gtin14[2:]
+    if gtin14.startswith("0"):
+        return gtin14[1:]
+    return gtin14
+
+
+def canonical_upc(code):
+    """productUPC key for ``code``, or None if it has no digits or does not fit a BIGINT.
+
+    Valid barcodes map to their GTIN-14 value. Codes that fail validation,
+    such as the made-up UPCs of manual entries, keep their own digits so
+    existing rows still resolve.
+    """
+    gtin14, _ = normalize_gtin(code)
+    if gtin14:
+        return int(gtin14)
+    digits = _NON_DIGITS.sub("", str(code or "")).lstrip("0")
+    return int(digits) if digits and len(digits) <= 18 else None
+
+
+def upc_keys(code):
+    """productUPC keys to try, in order, when looking up ``code`` leniently.
+
+    A code's own digits come first, so a made-up 6- or 8-digit UPC of a manual
+    product still finds that product. The canonical key follows, so the UPC-E
+    form of a scanned product finds the product stored under its UPC-A key.
+    """
+    digits = _NON_DIGITS.sub("", str(code or "")).lstrip("0")
+    raw = int(digits) if digits and len(digits) <= 18 else None
+    return tuple(key for key in dict.fromkeys((raw, canonical_upc(code))) if key is not None)
@@ -0,0 +1,86 @@
+"""Gunicorn settings for production.
+
+Picked up automatically by `gunicorn app:app` when run from this directory.
+Everything can be overridden through environment variables on Railway:
+
+    GUNICORN_WORKER_CLASS  gevent (default) or gthread
+    WEB_CONCURRENCY        number of worker processes
+    GUNICORN_THREADS       threads per gthread worker
+    GUNICORN_CONNECTIONS   concurrent greenlets per gevent worker
+    GUNICORN_TIMEOUT       seconds before a silent worker is killed
+    GUNICORN_GRACEFUL      seconds a worker gets to drain on deploy/restart
+"""
+import importlib.util
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Import app.py (dotenv, OpenAI client, all libraries) once in the master so
+# forked workers start with everything already loaded
+preload_app = True
+
+cpu_count = multiprocessing.cpu_count()
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+if worker_class == 'gevent' and importlib.util.find_spec('gevent') is None:
+    print("gevent is not installed; falling back to gthread workers")
+    worker_class = 'gthread'
+
+if worker_class == 'gevent':
+    # Patch before the master preloads app.py, so the locks, events and
+    # sockets it and post_fork create are cooperative in every worker
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        print("psycogreen is not installed; psycopg2 calls will block the gevent worker")
+
+    # Requests spend most of their time waiting on OpenAI and Go-UPC, so one
+    # process per core with many greenlets each
+    workers = int(os.getenv('WEB_CONCURRENCY', cpu_count + 1))
+    worker_connections = int(os.getenv('GUNICORN_CONNECTIONS', '1000'))
+    db_pool_size = min(worker_connections, int(os.getenv('DB_POOL_SIZE', '20')))
+    # Each open /api/pantry/events stream is just an idle greenlet
+    feed_streams = int(os.getenv('PANTRY_FEED_MAX_STREAMS', worker_connections * 3 // 4))
+else:
+    worker_class = 'gthread'
+    workers = int(os.getenv('WEB_CONCURRENCY', cpu_count * 2 + 1))
+    threads = int(os.getenv('GUNICORN_THREADS', '8'))
+    db_pool_size = int(os.getenv('DB_POOL_SIZE', threads))
+    # Each open /api/pantry/events stream holds a thread; keep half for requests
+    feed_streams = int(os.getenv('PANTRY_FEED_MAX_STREAMS', max(1, threads // 2)))
+
+# GPT calls can take well over gunicorn's default 30 s
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL', '30'))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Give each worker its own DB pool and API clients"""
+    from app import init_worker
+    init_worker(pool_size=db_pool_size, feed_streams=feed_streams)
+
+
+def post_worker_init(worker):
+    """Warm connections after init but before the worker starts accepting"""
+    from app import warm_up
+    try:
+        warm_up()
+    except Exception as e:
+        worker.log.warning(f"Warm-up failed, serving cold: {e}")
+
+
+def worker_int(worker):
+    worker.log.info(f"Worker {worker.pid} interrupted, draining")
+
+
+def worker_exit(server, worker):
+    """Close pooled connections once in-flight requests have drained"""
+    from app import shutdown_worker
+    shutdown_worker()
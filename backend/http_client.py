@@ -0,0 +1,177 @@
+"""Keep-alive HTTP client for upstream APIs, with retries and hedging.
+
+requests is imported when the first session is built rather than with this
+module, so importing the app does not pay for it.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+
+requests = None
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class UpstreamError(Exception):
+    """Raised by HttpClient.get when every attempt failed without a response"""
+
+
+def retry_after_seconds(response):
+    """Seconds asked for by a Retry-After header (delta or HTTP date), or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """Pooled ``requests.Session`` with timeouts, backoff and optional hedging.
+
+    Connection errors, timeouts and RETRY_STATUSES are retried up to
+    ``max_attempts`` times with full-jitter exponential backoff, waiting at
+    least as long as Retry-After asks, within ``deadline`` seconds overall.
+    With ``hedge_after`` set, an attempt still running after that many
+    seconds gets a duplicate request, and whichever answers first is used.
+    The session and hedging threads are created on first use in each
+    process, so a client built before gunicorn forks is safe.
+    """
+
+    def __init__(self, pool_size=8, connect_timeout=3.05, read_timeout=10.0, max_attempts=3,
+                 backoff_base=0.25, backoff_cap=4.0, deadline=20.0, hedge_after=None, name='http'):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.deadline = deadline
+        self.hedge_after = hedge_after or None
+        self.name = name
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self._executor = None
+        self._counts = {'requests': 0, 'attempts': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0}
+        self._outcomes = {}
+        # Latencies of recent attempts, for percentiles
+        self._latencies = deque(maxlen=1024)
+
+    def _ensure_session(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                global requests
+                if requests is None:
+                    import requests
+                from requests.adapters import HTTPAdapter
+                # Forked: the parent's sockets and threads are not ours
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                self._session.mount('https://', adapter)
+                self._session.mount('http://', adapter)
+                self._executor = ThreadPoolExecutor(self.pool_size, thread_name_prefix=f'{self.name}-hedge') if self.hedge_after else None
+                self._pid = os.getpid()
+            return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session and self._pid == os.getpid():
+                self._session.close()
+                if self._executor:
+                    self._executor.shutdown(wait=False)
+            self._session = self._executor = self._pid = None
+
+    def _attempt(self, session, url, headers):
+        started = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=self.timeout)
+            outcome = str(response.status_code)
+            return response
+        except requests.exceptions.Timeout:
+            outcome = 'timeout'
+            raise
+        except requests.exceptions.RequestException:
+            outcome = 'error'
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._counts['attempts'] += 1
+                self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+                self._latencies.append(elapsed)
+
+    def _hedged_attempt(self, session, url, headers):
+        first = self._executor.submit(self._attempt, session, url, headers)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+        with self._lock:
+            self._counts['hedges'] += 1
+        second = self._executor.submit(self._attempt, session, url, headers)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            self._counts['hedge_wins'] += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def get(self, url, headers=None):
+        """GET ``url``; returns the last response, or raises UpstreamError from the last RequestException"""
+        session = self._ensure_session()
+        give_up_at = time.monotonic() + self.deadline
+        with self._lock:
+            self._counts['requests'] += 1
+        for attempt in range(self.max_attempts):
+            response, error = None, None
+            try:
+                if self._executor:
+                    response = self._hedged_attempt(session, url, headers)
+                else:
+                    response = self._attempt(session, url, headers)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+            except requests.exceptions.RequestException as e:
+                error = e
+
+            if attempt + 1 == self.max_attempts:
+                break
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if response is not None:
+                delay = max(delay, retry_after_seconds(response) or 0)
+            if time.monotonic() + delay >= give_up_at:
+                break
+            with self._lock:
+                self._counts['retries'] += 1
+            time.sleep(delay)
+
+        if error is not None:
+            raise UpstreamError(str(error)) from error
+        return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats['outcomes'] = dict(self._outcomes)
+            latencies = sorted(self._latencies)
+        if latencies:
+            def pct(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+            stats['attempt_ms'] = {'p50': pct(0.5), 'p95': pct(0.95), 'p99': pct(0.99), 'max': round(latencies[-1] * 1000, 1)}
+        else:
+            stats['attempt_ms'] = None
+        return stats
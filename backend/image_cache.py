@@ -0,0 +1,186 @@
+"""Content-addressed disk cache for product images and their thumbnails.
+
+Image bytes are stored once under ``blobs/<2 hex>/<sha256>``, so the same
+picture behind several URLs takes disk space once. Small ref files under
+``refs/`` map a cache key (a URL, or a URL plus a thumbnail width) to a blob
+and its content type. The total blob size is kept under ``max_bytes`` by
+evicting the least recently used blobs. Recency is the blob's mtime, which
+every hit refreshes, so it survives restarts and is shared by all workers on
+the host. Each worker keeps its own running total, so the limit is
+approximate when several workers fill the cache at once.
+
+Thumbnails need Pillow; without it ``make_thumbnail`` returns None and
+callers serve the original.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # pragma: no cover - Pillow is optional
+    PILImage = None
+
+
+class CachedImage:
+    __slots__ = ('digest', 'path', 'content_type', 'size')
+
+    def __init__(self, digest, path, content_type, size):
+        self.digest = digest
+        self.path = path
+        self.content_type = content_type
+        self.size = size
+
+
+def make_thumbnail(data, width, quality=82):
+    """``(bytes, content type)`` of ``data`` scaled down to ``width`` pixels wide, or None.
+
+    Images already narrower than ``width`` are re-encoded at their own size.
+    Transparent images become PNG, everything else JPEG. Returns None when
+    Pillow is missing or cannot read the image.
+    """
+    if PILImage is None:
+        return None
+    try:
+        with PILImage.open(io.BytesIO(data)) as image:
+            image.thumbnail((width, width * 4))
+            out = io.BytesIO()
+            has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+            if has_alpha:
+                image.save(out, 'PNG', optimize=True)
+                return out.getvalue(), 'image/png'
+            image.convert('RGB').save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+            return out.getvalue(), 'image/jpeg'
+    except (OSError, ValueError, PILImage.DecompressionBombError):
+        return None
+
+
+class ImageCache:
+    """Blobs on disk keyed by content hash, found through per-key refs"""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # digest -> size, least recently used first; loaded on first use
+        self._blobs = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, 'blobs', digest[:2], digest)
+
+    def _ref_path(self, key):
+        return os.path.join(self.root, 'refs', hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _load(self):
+        """Index the blobs already on disk, oldest first"""
+        blobs = []
+        blob_root = os.path.join(self.root, 'blobs')
+        os.makedirs(blob_root, exist_ok=True)
+        os.makedirs(os.path.join(self.root, 'refs'), exist_ok=True)
+        for shard in os.scandir(blob_root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, entry.name, stat.st_size))
+        blobs.sort()
+        self._blobs = OrderedDict((digest, size) for _, digest, size in blobs)
+        self._bytes = sum(self._blobs.values())
+
+    def _ensure_loaded(self):
+        if self._blobs is None:
+            self._load()
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key, record=True):
+        """The cached image for ``key``, or None; ``record=False`` leaves the hit ratio alone"""
+        ref_path = self._ref_path(key)
+        try:
+            with open(ref_path, 'rb') as f:
+                ref = json.loads(f.read())
+            path = self._blob_path(ref['digest'])
+            size = os.stat(path).st_size
+            # Mark as recently used for every worker, and across restarts
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            if record:
+                with self._lock:
+                    self.misses += 1
+            return None
+        with self._lock:
+            self._ensure_loaded()
+            if record:
+                self.hits += 1
+            if ref['digest'] in self._blobs:
+                self._blobs.move_to_end(ref['digest'])
+        return CachedImage(ref['digest'], path, ref['type'], size)
+
+    def put(self, key, data, content_type):
+        """Store ``data`` for ``key`` and return it as a CachedImage"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        with self._lock:
+            self._ensure_loaded()
+            known = digest in self._blobs
+        if not known:
+            self._write_atomic(path, data)
+        self._write_atomic(self._ref_path(key), json.dumps({'digest': digest, 'type': content_type}).encode('utf-8'))
+
+        evict = []
+        with self._lock:
+            self.stores += 1
+            if digest in self._blobs:
+                self._blobs.move_to_end(digest)
+            else:
+                self._blobs[digest] = len(data)
+                self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._blobs) > 1:
+                old_digest, old_size = self._blobs.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+                evict.append(old_digest)
+        # Refs to evicted blobs are left behind and read as misses
+        for old_digest in evict:
+            try:
+                os.unlink(self._blob_path(old_digest))
+            except FileNotFoundError:
+                pass
+        return CachedImage(digest, path, content_type, len(data))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'root': self.root,
+                'blobs': len(self._blobs) if self._blobs is not None else None,
+                'bytes': self._bytes if self._blobs is not None else None,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'thumbnails': PILImage is not None,
+            }
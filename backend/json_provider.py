@@ -0,0 +1,144 @@
+"""Fast JSON encoding for Flask responses.
+
+Installs as ``app.json`` and uses orjson when it is available, falling back to
+Flask's stdlib encoder otherwise. Dates keep Flask's HTTP-date format by
+default so existing clients parse them unchanged; set ``JSON_DATE_FORMAT=iso``
+to let orjson write ISO-8601 dates natively, which is faster still.
+"""
+import dataclasses
+import decimal
+import json
+import os
+import uuid
+from datetime import date
+from functools import lru_cache
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+class Rows:
+    """Query result kept as plain tuples plus one list of column names.
+
+    Fetching with a plain cursor and wrapping the result here skips building a
+    RealDictRow per row. It encodes as a list of objects like the dict rows it
+    replaces, or as ``{"columns": [...], "rows": [[...], ...]}`` when
+    ``columnar`` is set.
+    """
+    __slots__ = ('columns', 'rows', 'columnar')
+
+    def __init__(self, columns, rows, columnar=False):
+        self.columns = columns
+        self.rows = rows
+        self.columnar = columnar
+
+    @classmethod
+    def from_cursor(cls, cur, columnar=False):
+        return cls([col.name for col in cur.description], cur.fetchall(), columnar)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def as_json(self):
+        if self.columnar:
+            return {'columns': self.columns, 'rows': self.rows}
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+
+def split_rows(rows, key, fields, drop=()):
+    """Move ``fields`` out of ``rows`` into one dict per distinct ``key``.
+
+    Returns ``(records, lots)``: ``records`` maps each key value to its
+    ``fields`` once, and ``lots`` holds the remaining columns (still including
+    ``key``, without ``drop``) as a Rows with the same layout as ``rows``.
+    """
+    columns = rows.columns
+    key_index = columns.index(key)
+    field_indexes = [columns.index(field) for field in fields]
+    skipped = set(fields).union(drop)
+    lot_columns = [col for col in columns if col not in skipped]
+    lot_indexes = [columns.index(col) for col in lot_columns]
+
+    records = {}
+    lots = []
+    for row in rows.rows:
+        row_key = row[key_index]
+        if row_key not in records:
+            records[row_key] = {field: row[i] for field, i in zip(fields, field_indexes)}
+        lots.append(tuple([row[i] for i in lot_indexes]))
+    return records, Rows(lot_columns, lots, rows.columnar)
+
+
+# Pantry rows share a handful of distinct dates, so formatting is cached
+_http_date = lru_cache(maxsize=4096)(http_date)
+
+
+def _default(o, iso_dates=False):
+    """Types neither encoder handles natively, matching Flask's output"""
+    if isinstance(o, Rows):
+        return o.as_json()
+    if isinstance(o, date):
+        return o.isoformat() if iso_dates else _http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if isinstance(o, tuple):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _iso_default(o):
+    return _default(o, iso_dates=True)
+
+
+def dumps_bytes(obj, iso_dates=False, sort_keys=False, indent=False):
+    """Encode ``obj`` straight to UTF-8 bytes"""
+    if orjson is None:
+        return json.dumps(
+            obj,
+            default=_iso_default if iso_dates else _default,
+            ensure_ascii=False,
+            sort_keys=sort_keys,
+            indent=2 if indent else None,
+            separators=None if indent else (',', ':'),
+        ).encode('utf-8')
+
+    option = orjson.OPT_NON_STR_KEYS
+    if not iso_dates:
+        # Route dates through _default so they match Flask's HTTP-date format
+        option |= orjson.OPT_PASSTHROUGH_DATETIME
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=_iso_default if iso_dates else _default, option=option)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+    sort_keys = False
+    iso_dates = os.getenv('JSON_DATE_FORMAT', 'http').lower() == 'iso'
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj, self.iso_dates, kwargs.get('sort_keys', self.sort_keys),
+                           bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = dumps_bytes(obj, self.iso_dates, self.sort_keys, indent) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
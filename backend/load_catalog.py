@@ -0,0 +1,181 @@
+"""Bulk-load a Go-UPC product catalog dump into the products table.
+
+    python load_catalog.py catalog.jsonl [--categorize] [--batch-size 5000]
+
+Accepts JSONL (Go-UPC responses, one per line) or CSV (code, name, brand,
+description, imageUrl, category, plus one column per spec). The file is
+streamed, COPYed into a staging table batch by batch and upserted into
+products. After every committed batch the byte offset is written to a
+checkpoint file, so an interrupted load picks up where it stopped when run
+again with the same arguments.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from app import get_db_connection, notify_product_changed
+from categorizer import rule_category
+from gtin import canonical_upc
+from product_catalog import PRODUCT_COLUMNS as COLUMNS
+from product_catalog import copy_buffer, goupc_to_product, pg_array, read_catalog
+
+def product_row(product_data, categorize):
+    """Products table row for a mapped product, or None if it cannot be stored"""
+    upc = canonical_upc(product_data.get('upc'))
+    if not upc:
+        return None
+    title = (product_data.get('title') or '').strip()
+    if not title:
+        return None
+
+    category = rule_category(product_data) if categorize else None
+
+    def text(field, limit=255):
+        return (product_data.get(field) or '')[:limit]
+
+    return (
+        upc,
+        title[:255],
+        text('description', 515),
+        text('brand'),
+        category,
+        float(product_data.get('lowest_recorded_price') or 0.0),
+        float(product_data.get('highest_recorded_price') or 0.0),
+        text('currency', 10) or 'USD',
+        pg_array(product_data.get('images') or []),
+        text('model'),
+        text('color'),
+        text('size'),
+        text('dimension'),
+        text('weight'),
+    )
+
+def upsert_sql(insert_only):
+    columns = ', '.join(COLUMNS)
+    # The dump counts as a fresh fetch, so lookup_upc does not queue a
+    # background refresh for every loaded product. Without --categorize the
+    # enrichment stamp stays NULL, and lookup_upc categorises the product
+    # locally on its first scan
+    sql = f"""
+        INSERT INTO products ({columns}, productFetchedAt, productEnrichedAt, productCategorySource)
+        SELECT DISTINCT ON (productUPC) {columns}, now(),
+               CASE WHEN productCategory IS NOT NULL THEN now() END,
+               CASE WHEN productCategory IS NOT NULL THEN 'rules' END
+        FROM catalog_staging
+        ORDER BY productUPC
+    """
+    if insert_only:
+        return sql + " ON CONFLICT (productUPC) DO NOTHING"
+    updates = ',\n            '.join(
+        f"{col} = EXCLUDED.{col}" for col in COLUMNS
+        if col not in ('productUPC', 'productCategory')
+    )
+    # Keep a category GPT already assigned unless the load supplies one
+    return sql + f"""
+        ON CONFLICT (productUPC) DO UPDATE SET
+            {updates},
+            productFetchedAt = EXCLUDED.productFetchedAt,
+            productCategory = COALESCE(EXCLUDED.productCategory, products.productCategory),
+            productCategorySource = CASE WHEN EXCLUDED.productCategory IS NOT NULL
+                                         THEN EXCLUDED.productCategorySource
+                                         ELSE products.productCategorySource END,
+            productEnrichedAt = COALESCE(EXCLUDED.productEnrichedAt, products.productEnrichedAt)
+    """
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+def read_checkpoint(checkpoint_path, signature):
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    if {k: checkpoint.get(k) for k in signature} != signature:
+        sys.exit(f"{checkpoint_path} belongs to a different or modified file; rerun with --restart")
+    return checkpoint
+
+def write_checkpoint(checkpoint_path, checkpoint):
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a Go-UPC catalog dump into products")
+    parser.add_argument('path', help="catalog file (.jsonl or .csv)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="rows per COPY/commit (default 5000)")
+    parser.add_argument('--checkpoint', help="checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument('--restart', action='store_true', help="ignore any checkpoint and start from the top")
+    parser.add_argument('--categorize', action='store_true', help="assign categories with the local keyword rules")
+    parser.add_argument('--insert-only', action='store_true', help="leave products already in the table untouched")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or args.path + '.checkpoint'
+    signature = file_signature(args.path)
+    checkpoint = None if args.restart else read_checkpoint(checkpoint_path, signature)
+    if checkpoint is None:
+        checkpoint = dict(signature, offset=0, loaded=0, skipped=0, done=False)
+    elif checkpoint['done']:
+        print(f"{args.path} already loaded ({checkpoint['loaded']} rows); use --restart to load it again")
+        return
+    else:
+        print(f"Resuming at byte {checkpoint['offset']} ({checkpoint['loaded']} rows loaded so far)")
+
+    conn = get_db_connection()
+    if not conn:
+        sys.exit("Database connection failed")
+    cur = conn.cursor()
+    cur.execute("CREATE TEMP TABLE catalog_staging (LIKE products) ON COMMIT DELETE ROWS")
+    copy_sql = f"COPY catalog_staging ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    insert_sql = upsert_sql(args.insert_only)
+
+    started = time.time()
+    loaded_at_start = checkpoint['loaded']
+
+    def flush(batch, offset):
+        if batch:
+            cur.copy_expert(copy_sql, copy_buffer(batch))
+            cur.execute(insert_sql)
+            # Running workers drop their cached products
+            notify_product_changed(cur, '*')
+        conn.commit()
+        checkpoint['offset'] = offset
+        checkpoint['loaded'] += len(batch)
+        write_checkpoint(checkpoint_path, checkpoint)
+        elapsed = time.time() - started
+        rate = (checkpoint['loaded'] - loaded_at_start) / elapsed if elapsed else 0
+        print(f"  {checkpoint['loaded']} rows loaded, {checkpoint['skipped']} skipped, {rate:,.0f} rows/s")
+
+    batch = []
+    offset = checkpoint['offset']
+    try:
+        for record, offset in read_catalog(args.path, checkpoint['offset']):
+            if isinstance(record, Exception):
+                checkpoint['skipped'] += 1
+                continue
+            row = product_row(goupc_to_product(record), args.categorize)
+            if row is None:
+                checkpoint['skipped'] += 1
+                continue
+            batch.append(row)
+            if len(batch) >= args.batch_size:
+                flush(batch, offset)
+                batch = []
+        flush(batch, offset)
+        checkpoint['done'] = True
+        write_checkpoint(checkpoint_path, checkpoint)
+    except KeyboardInterrupt:
+        conn.rollback()
+        print(f"Interrupted; rerun to resume from byte {checkpoint['offset']}")
+        sys.exit(130)
+    finally:
+        cur.close()
+        conn.close()
+
+    print(f"Done: {checkpoint['loaded']} rows loaded, {checkpoint['skipped']} skipped in {time.time() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
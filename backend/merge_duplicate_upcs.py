@@ -0,0 +1,119 @@
+"""Merge products stored under a non-canonical UPC into their canonical row.
+
+    python merge_duplicate_upcs.py [--dry-run]
+
+Before barcodes were normalised (gtin.py), a UPC-E scan and the UPC-A form of
+the same product were stored as two products. This moves every such product
+to its canonical key: pantry items and learned shelf life are repointed, the
+canonical row is kept when both exist, and the duplicate is deleted. Only
+seven- and eight-digit keys that are valid UPC-E codes are moved; shorter
+made-up codes of manual products stay where they are. Runs in one
+transaction and is safe to rerun.
+"""
+import argparse
+import sys
+
+from psycopg2.extras import execute_values
+
+from app import get_db_connection, notify_product_changed
+from gtin import expand_upce, has_valid_check_digit
+from product_catalog import PRODUCT_COLUMNS
+
+# UPC-A, EAN-13 and GTIN-14 forms already share a BIGINT key. Only a UPC-E
+# scan stored as a number can have a different canonical key: eight digits
+# for number system 1, seven once number system 0 lost its leading zero.
+# Shorter keys are left alone; they are made-up codes of manual products,
+# which normalize_gtin would read as UPC-E bodies of unrelated products.
+UPCE_KEYS = (10 ** 6, 10 ** 8)
+
+def upce_canonical(upc):
+    """Canonical key of a stored UPC-E key whose check digit validates, else None"""
+    if not UPCE_KEYS[0] <= upc < UPCE_KEYS[1]:
+        return None
+    digits = str(upc).zfill(8)
+    if digits[0] not in '01':
+        return None
+    upca = expand_upce(digits)
+    if not has_valid_check_digit(upca):
+        return None
+    return int(upca)
+
+def find_merges(cur):
+    cur.execute("SELECT productUPC FROM products WHERE productUPC >= %s AND productUPC < %s", UPCE_KEYS)
+    merges = []
+    for (upc,) in cur.fetchall():
+        canonical = upce_canonical(upc)
+        if canonical and canonical != upc:
+            merges.append((upc, canonical))
+    return merges
+
+def apply_merges(cur, merges):
+    cur.execute("CREATE TEMP TABLE upc_merge (old_upc BIGINT PRIMARY KEY, new_upc BIGINT NOT NULL) ON COMMIT DROP")
+    execute_values(cur, "INSERT INTO upc_merge (old_upc, new_upc) VALUES %s", merges)
+
+    columns = PRODUCT_COLUMNS + ['productCategorySource']
+    other_columns = ', '.join(f"p.{col}" for col in columns[1:])
+    cur.execute(f"""
+        INSERT INTO products ({', '.join(columns)})
+        SELECT m.new_upc, {other_columns}
+        FROM upc_merge m
+        JOIN products p ON p.productUPC = m.old_upc
+        ON CONFLICT (productUPC) DO NOTHING
+    """)
+    created = cur.rowcount
+
+    cur.execute("""
+        UPDATE usersProducts up
+        SET productUPC = m.new_upc
+        FROM upc_merge m
+        WHERE up.productUPC = m.old_upc
+    """)
+    repointed = cur.rowcount
+
+    cur.execute("""
+        INSERT INTO productShelfLife (productUPC, observations, totalDays)
+        SELECT m.new_upc, sum(s.observations), sum(s.totalDays)
+        FROM productShelfLife s
+        JOIN upc_merge m ON s.productUPC = m.old_upc
+        GROUP BY m.new_upc
+        ON CONFLICT (productUPC) DO UPDATE SET
+            observations = productShelfLife.observations + EXCLUDED.observations,
+            totalDays = productShelfLife.totalDays + EXCLUDED.totalDays
+    """)
+    cur.execute("DELETE FROM productShelfLife WHERE productUPC IN (SELECT old_upc FROM upc_merge)")
+
+    cur.execute("DELETE FROM products WHERE productUPC IN (SELECT old_upc FROM upc_merge)")
+    removed = cur.rowcount
+    return created, repointed, removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate products into their canonical UPC")
+    parser.add_argument('--dry-run', action='store_true', help="report what would change without writing")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        sys.exit("Database connection failed")
+    cur = conn.cursor()
+    try:
+        merges = find_merges(cur)
+        print(f"{len(merges)} products stored under a non-canonical UPC")
+        if args.dry_run or not merges:
+            for old, new in merges[:20]:
+                print(f"  {old} -> {new}")
+            return
+
+        created, repointed, removed = apply_merges(cur, merges)
+        notify_product_changed(cur, '*')
+        conn.commit()
+        print(f"Moved {created} products to a new canonical key, merged {len(merges) - created} "
+              f"into an existing one, repointed {repointed} pantry items, removed {removed} duplicates")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Read-only UPC catalog file, memory-mapped and searched in place.
+
+Layout (little-endian):
+
+    header   8-byte magic, uint64 record count n
+    keys     n uint64 productUPC keys (canonical_upc), ascending
+    offsets  n uint64 start of each record in the heap
+    lengths  n uint32 byte length of each record
+    heap     UTF-8 JSON product records (goupc_to_product format), in key order
+
+A lookup is a bisect over the keys array viewed straight from the mapping,
+then one JSON decode of the matching record. The file is mapped read-only,
+so every worker shares the same pages from the OS page cache. Build it with
+build_offline_catalog.py.
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from gtin import canonical_upc
+
+MAGIC = b'UPCCAT1\x00'
+HEADER = struct.Struct('<8sQ')
+
+CATALOG_PATH = os.getenv('OFFLINE_CATALOG_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'upc_catalog.bin'))
+
+
+class OfflineCatalog:
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise ValueError("offline catalog files are little-endian")
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not an offline UPC catalog")
+        self.count = count
+        view = memoryview(self._mm)
+        keys_at = HEADER.size
+        offsets_at = keys_at + 8 * count
+        lengths_at = offsets_at + 8 * count
+        self._heap_at = lengths_at + 4 * count
+        self._keys = view[keys_at:offsets_at].cast('Q')
+        self._offsets = view[offsets_at:lengths_at].cast('Q')
+        self._lengths = view[lengths_at:self._heap_at].cast('I')
+
+    def __len__(self):
+        return self.count
+
+    def get(self, upc):
+        """Product data for ``upc`` (any barcode form), or None"""
+        key = canonical_upc(upc)
+        if key is None:
+            return None
+        i = bisect.bisect_left(self._keys, key)
+        if i == self.count or self._keys[i] != key:
+            return None
+        start = self._heap_at + self._offsets[i]
+        return json.loads(self._mm[start:start + self._lengths[i]])
+
+    def close(self):
+        for view in (self._keys, self._offsets, self._lengths):
+            view.release()
+        self._mm.close()
+
+
+def read_sections(*files, items=65536):
+    """Read packed arrays in step: one block of up to ``items`` values per (typecode, file) pair"""
+    for _, f in files:
+        f.seek(0)
+    while True:
+        blocks = []
+        for typecode, f in files:
+            block = array(typecode)
+            block.frombytes(f.read(block.itemsize * items))
+            blocks.append(block)
+        if not blocks[0]:
+            return
+        yield blocks
+
+
+def write_catalog(path, count, keys_file, offsets_file, lengths_file, heap_file):
+    """Write a catalog of ``count`` records from binary files of its sections.
+
+    ``keys_file``, ``offsets_file`` and ``lengths_file`` hold the packed
+    arrays, already sorted by key; offsets point into ``heap_file``. Records
+    are copied out of ``heap_file`` in key order, so any it holds that no
+    entry points to (duplicates replaced by a later record) are left out.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, count))
+        for keys, in read_sections(('Q', keys_file)):
+            keys.tofile(out)
+        # Records are laid out in key order, so each starts where the one
+        # before it ends
+        position = 0
+        for lengths, in read_sections(('I', lengths_file)):
+            offsets = array('Q')
+            for length in lengths:
+                offsets.append(position)
+                position += length
+            offsets.tofile(out)
+        for lengths, in read_sections(('I', lengths_file)):
+            lengths.tofile(out)
+        for offsets, lengths in read_sections(('Q', offsets_file), ('I', lengths_file)):
+            for offset, length in zip(offsets, lengths):
+                heap_file.seek(offset)
+                out.write(heap_file.read(length))
+    os.replace(tmp_path, path)
+
+
+_catalog = None
+_catalog_loaded = False
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+def get_catalog():
+    """The catalog at OFFLINE_CATALOG_PATH, opened on first use; None if there is none"""
+    global _catalog, _catalog_loaded
+    if not _catalog_loaded:
+        with _lock:
+            if not _catalog_loaded:
+                if os.path.exists(CATALOG_PATH):
+                    try:
+                        _catalog = OfflineCatalog(CATALOG_PATH)
+                    except (OSError, ValueError) as e:
+                        print(f"Could not open offline catalog {CATALOG_PATH}: {e}")
+                _catalog_loaded = True
+    return _catalog
+
+def catalog_product(upc):
+    """Product data for ``upc`` from the offline catalog, or None. Counts hits and misses."""
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    product_data = catalog.get(upc)
+    with _lock:
+        _stats['hits' if product_data else 'misses'] += 1
+    return product_data
+
+def catalog_stats():
+    with _lock:
+        stats = dict(_stats)
+    stats['products'] = len(_catalog) if _catalog else 0
+    stats['path'] = CATALOG_PATH if _catalog else None
+    return stats
@@ -0,0 +1,80 @@
+"""Fan-out of pantry change signals to open event streams in this worker.
+
+The worker's one LISTEN connection (pg_listener.py) calls ``publish`` with
+the userID from each pantry_changed notification. Every subscription of
+that user is woken; a subscription is only a flag and an Event, so idle
+streams cost no thread of their own under gevent and several changes in a
+row collapse into one event.
+"""
+import threading
+
+
+class Subscription:
+    __slots__ = ('user_id', 'event')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.event = threading.Event()
+
+
+class FeedFull(Exception):
+    pass
+
+
+class ChangeFeed:
+    def __init__(self, max_subscribers):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._by_user = {}
+        self._count = 0
+        self.published = 0
+        self.delivered = 0
+        self.rejected = 0
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                self.rejected += 1
+                raise FeedFull("Too many open event streams")
+            subscription = Subscription(user_id)
+            self._by_user.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            return subscription
+
+    def is_full(self):
+        return self._count >= self.max_subscribers
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._by_user.get(subscription.user_id)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._by_user[subscription.user_id]
+
+    def publish(self, user_id):
+        with self._lock:
+            subscriptions = list(self._by_user.get(user_id, ()))
+            self.published += 1
+            self.delivered += len(subscriptions)
+        for subscription in subscriptions:
+            subscription.event.set()
+
+    def publish_all(self):
+        """Wake everyone, e.g. after notifications may have been missed"""
+        with self._lock:
+            subscriptions = [s for subs in self._by_user.values() for s in subs]
+        for subscription in subscriptions:
+            subscription.event.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': self._count,
+                'users': len(self._by_user),
+                'max_subscribers': self.max_subscribers,
+                'published': self.published,
+                'delivered': self.delivered,
+                'rejected': self.rejected,
+            }
@@ -0,0 +1,122 @@
+"""Per-user cache of encoded GET /api/pantry responses.
+
+Each entry is the exact response body, ready to send, plus the UPCs it
+mentions so a product change can drop the snapshots showing that product.
+Entries are evicted least recently used beyond ``max_bytes`` and expire
+after ``ttl`` seconds as a backstop for any missed invalidation.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class Snapshot:
+    __slots__ = ('body', 'etag', 'upcs', 'stored_at')
+
+    def __init__(self, body, upcs):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.upcs = upcs
+        self.stored_at = time.monotonic()
+
+
+class SnapshotCache:
+    """Snapshots keyed by (user_id, variant)"""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_upc = {}
+        self._variants = set()
+        self._bytes = 0
+        # user_id -> when their pantry last changed, so a snapshot built from a
+        # read that started before the change is not stored after it
+        self._changed_at = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def clock():
+        return time.monotonic()
+
+    def get(self, key):
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is None or time.monotonic() - snapshot.stored_at > self.ttl:
+                if snapshot is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return snapshot
+
+    def put(self, key, body, upcs, started_at):
+        """Store ``body`` for ``key`` unless the user's pantry changed after ``started_at``"""
+        if len(body) > self.max_bytes:
+            return
+        snapshot = Snapshot(body, frozenset(upcs))
+        with self._lock:
+            if self._changed_at.get(key[0], float('-inf')) >= started_at:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = snapshot
+            self._variants.add(key[1])
+            self._bytes += len(body)
+            for upc in snapshot.upcs:
+                self._by_upc.setdefault(upc, set()).add(key)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        snapshot = self._entries.pop(key)
+        self._bytes -= len(snapshot.body)
+        for upc in snapshot.upcs:
+            keys = self._by_upc.get(upc)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_upc[upc]
+
+    def invalidate_user(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            self._changed_at[user_id] = now
+            if len(self._changed_at) > 10000:
+                cutoff = now - 60
+                self._changed_at = {u: t for u, t in self._changed_at.items() if t > cutoff}
+            for variant in self._variants:
+                if (user_id, variant) in self._entries:
+                    self._remove((user_id, variant))
+                    self.invalidations += 1
+
+    def invalidate_upc(self, upc):
+        with self._lock:
+            for key in list(self._by_upc.get(upc, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_upc.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,184 @@
+"""Move usersProducts to the hash-partitioned layout of migration 006, online.
+
+    python partition_pantry.py backfill [--batch-size 10000] [--start-after ID]
+    python partition_pantry.py verify
+    python partition_pantry.py swap
+    python partition_pantry.py archive [--expired-days 30] [--batch-size 10000]
+
+Run the migration first; its trigger mirrors every write to usersProducts
+into usersProducts_partitioned from then on. ``backfill`` copies the rows
+that existed before, in pantryID order, one committed batch at a time. It
+locks each batch's source rows while copying them, so a concurrent update
+or delete cannot be overwritten by a stale copy. It can be rerun or resumed
+at any point. ``swap`` checks that both tables hold the same rows and
+exchanges them under a brief exclusive lock, moving the pantry_changed
+trigger to the new table in the same transaction; the old table is kept as
+usersProducts_unpartitioned until you drop it. ``archive`` moves lots that
+are used up or expired more than --expired-days ago into the archive
+partition; run it periodically once the table is partitioned.
+"""
+import argparse
+import sys
+import time
+
+import psycopg2
+
+from app import get_db_connection
+
+COLUMNS = 'pantryID, userID, productUPC, quantity, quantityType, date_purchased, expiration_date'
+
+def table_exists(cur, name):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+    return cur.fetchone()[0]
+
+def is_partitioned(cur):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('usersProducts')")
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+def backfill(conn, cur, batch_size, start_after):
+    if not table_exists(cur, 'usersProducts_partitioned'):
+        sys.exit("usersProducts_partitioned does not exist; run migrations/006_partition_users_products.sql first")
+    started = time.time()
+    last_id, copied = start_after, 0
+    while True:
+        cur.execute(f"""
+            WITH batch AS (
+                SELECT {COLUMNS}
+                FROM usersProducts
+                WHERE pantryID > %s
+                ORDER BY pantryID
+                LIMIT %s
+                FOR SHARE
+            ), copied AS (
+                INSERT INTO usersProducts_partitioned ({COLUMNS})
+                SELECT {COLUMNS} FROM batch
+                ON CONFLICT DO NOTHING
+                RETURNING 1
+            )
+            SELECT max(pantryID), count(*), (SELECT count(*) FROM copied) FROM batch
+        """, (last_id, batch_size))
+        batch_last, batch_rows, batch_copied = cur.fetchone()
+        conn.commit()
+        if not batch_rows:
+            break
+        last_id = batch_last
+        copied += batch_copied
+        print(f"  through pantryID {last_id}: {copied} rows copied, {copied / (time.time() - started):,.0f} rows/s")
+    print(f"Backfill done: {copied} rows copied in {time.time() - started:.1f}s")
+
+def differences(cur):
+    """Rows that differ between the old table and the partitioned copy"""
+    cur.execute(f"""
+        SELECT count(*)
+        FROM (SELECT {COLUMNS} FROM usersProducts) o
+        FULL JOIN (SELECT {COLUMNS} FROM usersProducts_partitioned) n USING (pantryID)
+        WHERE o.userID IS NULL OR n.userID IS NULL
+           OR (o.userID, o.productUPC, o.quantity, o.quantityType, o.date_purchased, o.expiration_date)
+              IS DISTINCT FROM
+              (n.userID, n.productUPC, n.quantity, n.quantityType, n.date_purchased, n.expiration_date)
+    """)
+    return cur.fetchone()[0]
+
+def verify(conn, cur):
+    if not table_exists(cur, 'usersProducts_partitioned'):
+        sys.exit("usersProducts_partitioned does not exist; nothing to verify")
+    diff = differences(cur)
+    conn.commit()
+    print(f"{diff} rows differ" if diff else "Tables match")
+    return diff == 0
+
+def swap(conn, cur):
+    if is_partitioned(cur):
+        sys.exit("usersProducts is already partitioned")
+    if not verify(conn, cur):
+        sys.exit("Not swapping; run backfill again")
+    try:
+        cur.execute("SET LOCAL lock_timeout = '5s'")
+        cur.execute("LOCK TABLE usersProducts IN ACCESS EXCLUSIVE MODE")
+        cur.execute("DROP TRIGGER usersProducts_sync_partitioned ON usersProducts")
+        cur.execute("ALTER TABLE usersProducts RENAME TO usersProducts_unpartitioned")
+        cur.execute("ALTER TABLE usersProducts_partitioned RENAME TO usersProducts")
+        # Move the pantry_changed trigger (migration 005) across, so each
+        # change is announced once
+        cur.execute("DROP TRIGGER IF EXISTS usersProducts_notify ON usersProducts_unpartitioned")
+        # Added by earlier versions of migration 006
+        cur.execute("DROP TRIGGER IF EXISTS usersProducts_partitioned_notify ON usersProducts")
+        cur.execute("""
+            CREATE TRIGGER usersProducts_notify
+                AFTER INSERT OR UPDATE OR DELETE ON usersProducts
+                FOR EACH ROW EXECUTE FUNCTION notify_pantry_changed()
+        """)
+        # Dropping the old table must not take the pantryID sequence with it
+        cur.execute("ALTER SEQUENCE usersproducts_pantryid_seq OWNED BY usersProducts.pantryID")
+        conn.commit()
+    except psycopg2.errors.LockNotAvailable:
+        conn.rollback()
+        sys.exit("Could not lock usersProducts within 5s; try again when it is quieter")
+    print("usersProducts is now partitioned. Once you are happy, run:\n"
+          "  DROP TABLE usersProducts_unpartitioned;\n"
+          "  DROP FUNCTION sync_users_products_partitioned();")
+
+def archive(conn, cur, expired_days, batch_size):
+    if not is_partitioned(cur):
+        sys.exit("usersProducts is not partitioned yet; run backfill and swap first")
+    # Walk the live partitions in pantryID order so each batch is an index scan
+    last_id, moved = 0, 0
+    while True:
+        cur.execute("""
+            WITH batch AS (
+                SELECT pantryID, userID, quantity, expiration_date
+                FROM usersProducts
+                WHERE pantryID > %s AND NOT archived
+                ORDER BY pantryID
+                LIMIT %s
+            ), moved AS (
+                UPDATE usersProducts up
+                SET archived = true
+                FROM batch
+                WHERE up.pantryID = batch.pantryID AND up.userID = batch.userID AND NOT up.archived
+                  AND (batch.quantity <= 0 OR batch.expiration_date < current_date - %s)
+                RETURNING 1
+            )
+            SELECT max(pantryID), (SELECT count(*) FROM moved) FROM batch
+        """, (last_id, batch_size, expired_days))
+        batch_last, batch_moved = cur.fetchone()
+        conn.commit()
+        if batch_last is None:
+            break
+        last_id = batch_last
+        moved += batch_moved
+        print(f"  through pantryID {last_id}: {moved} lots archived")
+    print(f"Archived {moved} lots")
+
+def main():
+    parser = argparse.ArgumentParser(description="Move usersProducts to hash partitions online")
+    parser.add_argument('command', choices=['backfill', 'verify', 'swap', 'archive'])
+    parser.add_argument('--batch-size', type=int, default=10000, help="rows per transaction (default 10000)")
+    parser.add_argument('--start-after', type=int, default=0, help="backfill: resume after this pantryID")
+    parser.add_argument('--expired-days', type=int, default=30,
+                        help="archive: lots expired more than this many days ago (default 30)")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if not conn:
+        sys.exit("Database connection failed")
+    cur = conn.cursor()
+    try:
+        if args.command == 'backfill':
+            backfill(conn, cur, args.batch_size, args.start_after)
+        elif args.command == 'verify':
+            sys.exit(0 if verify(conn, cur) else 1)
+        elif args.command == 'swap':
+            swap(conn, cur)
+        else:
+            archive(conn, cur, args.expired_days, args.batch_size)
+    except KeyboardInterrupt:
+        conn.rollback()
+        sys.exit(130)
+    finally:
+        cur.close()
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""bcrypt hashing off the request path, with its own concurrency cap.
+
+Hashes run on a small dedicated thread pool (native threads under gevent
+too, since bcrypt releases the GIL but would block the hub) so a burst of
+logins cannot take every CPU from the other routes. At most
+``max_workers + max_queue`` hashes are outstanding; beyond that callers get
+HashingBusy and should answer 503.
+
+The cost factor is BCRYPT_ROUNDS if set, otherwise the highest one whose
+hash takes no longer than BCRYPT_TARGET_MS on this machine, measured once
+per process and never below BCRYPT_MIN_ROUNDS.
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import bcrypt
+
+_ROUNDS_RE = re.compile(rb'^\$2[abxy]?\$(\d\d)\$')
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def hash_rounds(hashed):
+    """Cost factor of a stored bcrypt hash, or None if it is not one"""
+    match = _ROUNDS_RE.match(hashed)
+    return int(match.group(1)) if match else None
+
+
+def _executor_class():
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor
+            return ThreadPoolExecutor
+    except ImportError:
+        pass
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor
+
+
+class PasswordHasher:
+    def __init__(self, max_workers=2, max_queue=32, rounds=None, target_ms=250, min_rounds=10, max_rounds=15):
+        self.max_workers = max_workers
+        self.max_outstanding = max_workers + max_queue
+        self.fixed_rounds = rounds
+        self.target_ms = target_ms
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self._rounds = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._outstanding = 0
+        self._counts = {'hashes': 0, 'checks': 0, 'rejected': 0, 'rehashes': 0}
+        self._queue_times = deque(maxlen=1024)
+        self._hash_times = deque(maxlen=1024)
+
+    @property
+    def rounds(self):
+        if self._rounds is None:
+            with self._lock:
+                if self._rounds is None:
+                    self._rounds = self.fixed_rounds or self._calibrate()
+        return self._rounds
+
+    def _calibrate(self):
+        """Highest cost whose hash fits the target; each extra round doubles the time"""
+        started = time.perf_counter()
+        bcrypt.hashpw(b'calibration', bcrypt.gensalt(self.min_rounds))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        rounds = self.min_rounds
+        while rounds < self.max_rounds and elapsed_ms * 2 <= self.target_ms:
+            rounds += 1
+            elapsed_ms *= 2
+        print(f"bcrypt cost {rounds} (~{elapsed_ms:.0f} ms per hash, target {self.target_ms} ms)")
+        return rounds
+
+    def _run(self, fn, *args):
+        """Run ``fn`` on the hashing pool and wait for it"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the parent's threads did not come with us
+                self._executor = _executor_class()(max_workers=self.max_workers)
+                self._pid = os.getpid()
+                self._outstanding = 0
+            if self._outstanding >= self.max_outstanding:
+                self._counts['rejected'] += 1
+                raise HashingBusy("Too many password hashes in progress")
+            self._outstanding += 1
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._queue_times.append(started - submitted)
+                    self._hash_times.append(time.perf_counter() - started)
+
+        try:
+            return self._executor.submit(timed).result()
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+
+    def hash(self, password):
+        """bcrypt hash of ``password`` as a str"""
+        rounds = self.rounds
+        with self._lock:
+            self._counts['hashes'] += 1
+        return self._run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8'))
+
+    def check(self, password, hashed):
+        with self._lock:
+            self._counts['checks'] += 1
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        """Whether a stored hash is weaker than the current cost"""
+        stored = hash_rounds(hashed.encode('utf-8'))
+        return stored is None or stored < self.rounds
+
+    def note_rehash(self):
+        with self._lock:
+            self._counts['rehashes'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats['outstanding'] = self._outstanding
+            stats['rounds'] = self._rounds
+            timings = {'queue_ms': sorted(self._queue_times), 'hash_ms': sorted(self._hash_times)}
+        for name, values in timings.items():
+            if values:
+                stats[name] = {
+                    'p50': round(values[len(values) // 2] * 1000, 1),
+                    'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+                    'max': round(values[-1] * 1000, 1),
+                }
+            else:
+                stats[name] = None
+        return stats
@@ -0,0 +1,99 @@
+"""One LISTEN connection per worker, fanning notifications out to callbacks."""
+import os
+import select
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PgListener:
+    """Background thread holding a dedicated autocommit connection.
+
+    ``subscribe(channel, callback)`` registers ``callback(payload)`` for a
+    channel. If the connection drops, every callback is called with None once
+    it is back, since notifications sent in between were missed.
+    """
+
+    def __init__(self, connect_params):
+        self.connect_params = connect_params
+        self._callbacks = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.received = 0
+        self.reconnects = 0
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._callbacks.setdefault(channel, []).append(callback)
+
+    def start(self):
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='pg-listener', daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_params)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        cur = conn.cursor()
+        with self._lock:
+            channels = list(self._callbacks)
+        for channel in channels:
+            cur.execute(f'LISTEN "{channel}"')
+        cur.close()
+        return conn
+
+    def _dispatch(self, channel, payload):
+        with self._lock:
+            callbacks = list(self._callbacks.get(channel, ()))
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"pg-listener: {channel} callback failed: {e}")
+
+    def _run(self):
+        delay = 1
+        first = True
+        while True:
+            try:
+                conn = self._connect()
+            except psycopg2.Error as e:
+                print(f"pg-listener: connect failed, retrying in {delay}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+                continue
+            delay = 1
+            if not first:
+                self.reconnects += 1
+                with self._lock:
+                    channels = list(self._callbacks)
+                for channel in channels:
+                    self._dispatch(channel, None)
+            first = False
+            try:
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.received += 1
+                        self._dispatch(notify.channel, notify.payload)
+            except (psycopg2.Error, OSError) as e:
+                print(f"pg-listener: connection lost: {e}")
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+
+    def stats(self):
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'received': self.received,
+            'reconnects': self.reconnects,
+        }
@@ -0,0 +1,119 @@
+"""Per-worker read-through cache of product rows.
+
+Records are __slots__ objects with image URLs interned, held in LRU order
+under a byte budget. Other workers' writes arrive as NOTIFY product_changed
+(see pg_listener.py) and invalidate the matching entry.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+# Lower-case column names, as RealDictCursor returns them
+PRODUCT_FIELDS = (
+    'productupc', 'productname', 'productdescription', 'productbrand',
+    'productmodel', 'productcolor', 'productsize', 'productdimension',
+    'productweight', 'productcategory', 'productlowestprice',
+    'producthighestprice', 'productcurrency', 'productimages',
+    'productfetchedat', 'productenrichedat',
+)
+
+
+class ProductRecord:
+    __slots__ = PRODUCT_FIELDS
+
+    def __init__(self, row):
+        for field in PRODUCT_FIELDS:
+            setattr(self, field, row.get(field))
+        images = self.productimages
+        # Many lots share the same few image URLs; keep one copy of each
+        self.productimages = tuple(sys.intern(url) for url in images) if images else ()
+
+    def as_row(self):
+        """The row as the dict find_product_in_db has always returned"""
+        row = {field: getattr(self, field) for field in PRODUCT_FIELDS}
+        row['productimages'] = list(self.productimages)
+        return row
+
+    def size(self):
+        """Approximate bytes held by this record (interned URLs counted in full)"""
+        total = sys.getsizeof(self)
+        for field in PRODUCT_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                total += sys.getsizeof(value)
+        total += sum(sys.getsizeof(url) for url in self.productimages)
+        return total
+
+
+class ProductCache:
+    """LRU of ProductRecords keyed by canonical UPC, bounded by bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._records = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped on every invalidation; see put()
+        self.generation = 0
+
+    def get(self, upc):
+        with self._lock:
+            entry = self._records.get(upc)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._records.move_to_end(upc)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, upc, row, generation=None):
+        """Cache ``row``; skipped if anything was invalidated since ``generation`` was read"""
+        if self.max_bytes <= 0:
+            return
+        record = ProductRecord(row)
+        size = record.size()
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            old = self._records.pop(upc, None)
+            if old:
+                self._bytes -= old[1]
+            self._records[upc] = (record, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._records:
+                _, (_, evicted_size) = self._records.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, upc):
+        with self._lock:
+            self.generation += 1
+            entry = self._records.pop(upc, None)
+            if entry:
+                self._bytes -= entry[1]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._records)
+            self._records.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._records),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,136 @@
+"""Go-UPC product records: field mapping and streaming catalog dumps.
+
+Shared by lookup_upc in app.py and the offline catalog tools, so a product
+loaded from a dump is stored exactly as it would be after a live Go-UPC hit.
+"""
+import csv
+import io
+import json
+
+# products columns written from a Go-UPC record, in save_product_to_db order
+PRODUCT_COLUMNS = [
+    'productUPC', 'productName', 'productDescription', 'productBrand',
+    'productCategory', 'productLowestPrice', 'productHighestPrice',
+    'productCurrency', 'productImages', 'productModel', 'productColor',
+    'productSize', 'productDimension', 'productWeight'
+]
+
+# Columns in a CSV dump that are product fields rather than specs
+CSV_PRODUCT_FIELDS = ('name', 'brand', 'description', 'imageUrl', 'category', 'region')
+
+def goupc_to_product(api_data):
+    """Transform a Go-UPC response ({"code": ..., "product": {...}}) to our format"""
+    product = api_data.get('product') or {}
+    specs = product.get('specs') or []
+    return {
+        'upc': api_data.get('code'),
+        'title': product.get('name'),
+        'brand': product.get('brand'),
+        'category': product.get('category'),
+        'description': product.get('description'),
+        'images': [product.get('imageUrl')] if product.get('imageUrl') else [],
+        'model': '',  # Not provided by Go-UPC
+        'color': next((spec[1] for spec in specs if spec[0] == 'Color'), ''),
+        'size': next((spec[1] for spec in specs if spec[0] == 'Size'), ''),
+        'dimension': next((f"{spec[1]}" for spec in specs if any(dim in spec[0].lower() for dim in ['height', 'width', 'length'])), ''),
+        'weight': next((spec[1] for spec in specs if 'weight' in spec[0].lower()), ''),
+        'lowest_recorded_price': 0.0,  # Not provided by Go-UPC
+        'highest_recorded_price': 0.0,  # Not provided by Go-UPC
+        'currency': 'USD',  # Default currency
+    }
+
+# Product fields goupc_to_product reads as text
+TEXT_FIELDS = ('name', 'brand', 'category', 'description', 'imageUrl')
+
+def record_error(record):
+    """Why a parsed dump record cannot be mapped by goupc_to_product, or None"""
+    if not isinstance(record, dict):
+        return "record is not an object"
+    if not isinstance(record.get('code'), (str, int)) or isinstance(record.get('code'), bool):
+        return "code is missing or not a string"
+    product = record.get('product')
+    if not isinstance(product, dict):
+        return "product is not an object"
+    for field in TEXT_FIELDS:
+        if product.get(field) is not None and not isinstance(product[field], str):
+            return f"{field} is not a string"
+    specs = product.get('specs')
+    if specs is not None:
+        if not isinstance(specs, list):
+            return "specs is not a list"
+        for spec in specs:
+            if not (isinstance(spec, list) and len(spec) >= 2
+                    and isinstance(spec[0], str) and isinstance(spec[1], str)):
+                return "specs must be [name, value] string pairs"
+    return None
+
+def _csv_to_goupc(row):
+    """A flat CSV row (code, name, brand, ..., plus one column per spec) as a Go-UPC response"""
+    row = {k: v for k, v in row.items() if k is not None}
+    code = row.pop('code', None) or row.pop('upc', None)
+    product = {field: row.pop(field) for field in CSV_PRODUCT_FIELDS if field in row}
+    product['specs'] = [[name, value] for name, value in row.items() if value]
+    return {'code': code, 'product': product}
+
+def _lines_with_offsets(f, state):
+    """Decode lines from a binary file, recording the byte offset after each"""
+    for raw in iter(f.readline, b''):
+        state['offset'] += len(raw)
+        yield raw.decode('utf-8-sig')
+
+def read_catalog(path, offset=0):
+    """Yield (goupc_record, end_offset) from a JSONL or CSV catalog dump.
+
+    Reads one record at a time so memory stays flat, and reports the byte
+    offset just past each record so a load can resume from a checkpoint.
+    JSONL lines may be full Go-UPC responses or just the inner product with a
+    "code" field. Lines that fail to parse, and records goupc_to_product
+    cannot map (see record_error), are yielded as (exception, offset).
+    """
+    is_csv = path.lower().endswith('.csv')
+    with open(path, 'rb') as f:
+        state = {'offset': 0}
+        if is_csv:
+            header = next(csv.reader([f.readline().decode('utf-8-sig')]))
+            state['offset'] = f.tell()
+        if offset > state['offset']:
+            f.seek(offset)
+            state['offset'] = offset
+
+        lines = _lines_with_offsets(f, state)
+        if is_csv:
+            # csv.reader pulls further lines only for quoted multi-line fields,
+            # so the offset is always at the end of the record just read
+            for values in csv.reader(lines):
+                if values:
+                    yield _csv_to_goupc(dict(zip(header, values))), state['offset']
+            return
+
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield e, state['offset']
+                continue
+            if isinstance(record, dict) and 'product' not in record:
+                record = {'code': record.get('code') or record.get('upc'), 'product': record}
+            error = record_error(record)
+            if error:
+                yield ValueError(error), state['offset']
+                continue
+            yield record, state['offset']
+
+def pg_array(items):
+    """Postgres array literal for COPY, e.g. ['a', 'b"c'] -> {"a","b\\"c"}"""
+    return '{' + ','.join(
+        '"' + str(item).replace('\\', '\\\\').replace('"', '\\"') + '"' for item in items
+    ) + '}'
+
+def copy_buffer(rows):
+    """CSV buffer ready for COPY ... FROM STDIN WITH (FORMAT csv)"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    return buffer
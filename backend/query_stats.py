@@ -0,0 +1,105 @@
+"""Per-request SQL statement counts and time.
+
+Connections from get_db_connection() hand out counting cursors. While a
+request is being handled every execute and commit is added to
+``g.sql_stats``; app.py reports the totals in X-SQL-Statements and
+X-SQL-Time-Ms response headers. ``query_budget`` makes a route fail in
+tests when it runs more statements than it should.
+"""
+import os
+import time
+from functools import wraps
+
+import psycopg2.extensions
+from flask import current_app, g, has_app_context, request
+
+STRICT = os.getenv('SQL_BUDGET_STRICT', 'false').lower() == 'true'
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def begin_request():
+    g.sql_stats = {'statements': 0, 'commits': 0, 'seconds': 0.0}
+
+def current_stats():
+    return g.get('sql_stats') if has_app_context() else None
+
+def _record(kind, started):
+    stats = current_stats()
+    if stats is not None:
+        stats[kind] += 1
+        stats['seconds'] += time.perf_counter() - started
+
+
+class CountingCursorMixin:
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record('statements', started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record('statements', started)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _record('statements', started)
+
+
+_counting_classes = {}
+
+def counting_cursor(factory):
+    """Subclass of cursor class ``factory`` that counts its statements"""
+    cls = _counting_classes.get(factory)
+    if cls is None:
+        cls = type(f'Counting{factory.__name__}', (CountingCursorMixin, factory), {})
+        _counting_classes[factory] = cls
+    return cls
+
+
+class CountingConnection(psycopg2.extensions.connection):
+    """Connection whose cursors and commits are counted"""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = counting_cursor(factory)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _record('commits', started)
+
+
+def query_budget(max_statements):
+    """Cap the SQL statements a route may run, including token_required's user check.
+
+    Going over raises QueryBudgetExceeded when the app is testing or
+    SQL_BUDGET_STRICT is set, and is logged otherwise.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            response = f(*args, **kwargs)
+            stats = current_stats()
+            if stats and stats['statements'] > max_statements:
+                message = (f"{request.endpoint} ran {stats['statements']} SQL statements, "
+                           f"budget is {max_statements}")
+                if STRICT or current_app.testing:
+                    raise QueryBudgetExceeded(message)
+                print(f"Warning: {message}")
+            return response
+        return decorated
+    return decorator
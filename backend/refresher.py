@@ -0,0 +1,85 @@
+"""Bounded background queue for work no request should wait on."""
+import os
+import queue
+import threading
+import time
+
+
+class BackgroundRefresher:
+    """Deduplicating, rate-limited queue drained by daemon threads.
+
+    ``submit(key)`` never blocks: a key already queued is ignored and a full
+    queue drops the request (it will be submitted again on a later hit).
+    ``handler(key)`` runs at most ``rate_per_second`` times a second across
+    all threads. Threads start on first use in each process, so the refresher
+    is safe to create before gunicorn forks.
+    """
+
+    def __init__(self, handler, max_pending=1000, rate_per_second=1.0, threads=1, name='refresher'):
+        self.handler = handler
+        self.max_pending = max_pending
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0
+        self.thread_count = threads
+        self.name = name
+        self._pid = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.Queue(self.max_pending)
+        self._pending = set()
+        self._next_start = 0.0
+        self._counts = {'submitted': 0, 'dropped': 0, 'done': 0, 'failed': 0}
+        self._pid = os.getpid()
+        self._threads = []
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            self._reset()  # forked: the parent's threads did not come with us
+        if not self._threads:
+            for i in range(self.thread_count):
+                thread = threading.Thread(target=self._run, name=f'{self.name}-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, key):
+        with self._lock:
+            self._ensure_started()
+            if key in self._pending:
+                return False
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                self._counts['dropped'] += 1
+                return False
+            self._pending.add(key)
+            self._counts['submitted'] += 1
+            return True
+
+    def _wait_for_slot(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            self._wait_for_slot()
+            try:
+                self.handler(key)
+                outcome = 'done'
+            except Exception as e:
+                print(f"{self.name}: error handling {key}: {e}")
+                outcome = 'failed'
+            with self._lock:
+                self._pending.discard(key)
+                self._counts[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats['pending'] = len(self._pending)
+        return stats
@@ -0,0 +1,76 @@
+"""Deterministic shelf-life estimates.
+
+The rule table that get_days_to_expire used to hand GPT as guidelines, made
+explicit. A shelf-stable category wins over perishable words in the name
+(a milk chocolate bar is a Snack, chicken noodle soup is Canned Goods)
+unless the name says the product is kept cold. Otherwise product keywords
+come first, then the product's category. Products no
+rule covers return None and are left to GPT. Days learned from the expiration
+dates users enter take precedence over both (see get_learned_shelf_life in
+app.py).
+"""
+from categorizer import compile_keyword_rules
+
+NON_PERISHABLE = "n/a"
+
+# Checked in order against the product name, first match wins
+KEYWORD_DAYS = [
+    (NON_PERISHABLE, ["canned", "dried", "dehydrated", "jerky", "shelf stable", "shelf-stable", "uht",
+                      "powdered", "evaporated", "condensed", "peanut butter", "almond butter", "nut butter",
+                      "broth", "soup", "crackers", "chocolate bar"]),
+    (180, ["frozen", "ice cream"]),
+    (2, ["ground beef", "ground turkey", "ground chicken", "ground pork", "ground meat", "fresh fish"]),
+    (4, ["chicken", "beef", "pork", "turkey", "salmon", "shrimp", "fish", "steak", "sausage", "lamb"]),
+    (7, ["bacon", "deli meat", "sliced ham", "hot dog"]),
+    (10, ["milk", "juice", "heavy cream", "whipping cream", "half and half"]),
+    (14, ["yogurt", "yoghurt", "sour cream", "cottage cheese", "cream cheese", "kefir", "hummus"]),
+    (21, ["cheese", "tofu"]),
+    (28, ["eggs", "egg"]),
+    (60, ["butter"]),
+    (6, ["bread", "bagel", "bun", "croissant", "muffin", "baguette"]),
+    (14, ["tortilla", "pita"]),
+    (4, ["salad", "sandwich", "sushi", "rotisserie"]),
+    (5, ["lettuce", "spinach", "berries", "strawberr*", "raspberr*", "blueberr*", "herbs", "mushroom",
+         "banana", "avocado"]),
+    (14, ["apple", "orange", "lemon", "lime", "carrot", "potato", "onion", "cabbage", "grapefruit"]),
+]
+
+# Midpoints of the guideline ranges. Categories not listed ("Other") have no rule
+CATEGORY_DAYS = {
+    "Fruits & Vegetables": 7,
+    "Meat & Seafood": 4,
+    "Dairy & Eggs": 14,
+    "Bread & Bakery": 6,
+    "Ready-to-Eat Meals": 4,
+    "Frozen Foods": 180,
+    "Pantry Staples": NON_PERISHABLE,
+    "Snacks": NON_PERISHABLE,
+    "Canned Goods": NON_PERISHABLE,
+    "Condiments & Sauces": NON_PERISHABLE,
+    "Baking Supplies": NON_PERISHABLE,
+    "Breakfast Foods": NON_PERISHABLE,
+    "Pasta & Rice": NON_PERISHABLE,
+    "Herbs & Spices": NON_PERISHABLE,
+    "Beverages": NON_PERISHABLE,
+    "Baby Food & Formula": NON_PERISHABLE,
+    "Pet Food": NON_PERISHABLE,
+}
+
+# Words that put a product from a shelf-stable category in the fridge
+# ("fresh orange juice" under Beverages)
+CHILLED_KEYWORDS = ["fresh", "refrigerated", "chilled", "not from concentrate", "keep refrigerated"]
+
+_RULES = compile_keyword_rules(KEYWORD_DAYS)
+_CHILLED = compile_keyword_rules([(True, CHILLED_KEYWORDS)])[0][1]
+
+def rule_days(product_data, category=None):
+    """Days until expiry as a string ("7" or "n/a"), or None if no rule applies"""
+    name = str(product_data.get("title") or "").lower()
+    category_days = CATEGORY_DAYS.get(category or product_data.get("category"))
+    if category_days == NON_PERISHABLE and not _CHILLED.search(name):
+        return NON_PERISHABLE
+    if name:
+        for days, pattern in _RULES:
+            if pattern.search(name):
+                return str(days)
+    return None if category_days is None else str(category_days)
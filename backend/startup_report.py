@@ -0,0 +1,79 @@
+"""Where a worker's cold start goes.
+
+app.py creates a StartupTimer before its other imports and marks a phase
+after each group of them, so the import is broken down by phase. Clients
+built on first use record how long they took, and the first request records
+how long after the worker started it arrived. The report is logged once per
+worker and served under ``startup`` in /api/metrics; check_cold_start.py
+turns it into a regression check.
+"""
+import os
+import sys
+import threading
+import time
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._lock = threading.Lock()
+        self.phases = []
+        self.import_ms = None
+        self.lazy = {}
+        self.worker_started = None
+        self.first_request_ms = None
+
+    @staticmethod
+    def _ms(seconds):
+        return round(seconds * 1000, 1)
+
+    def mark(self, phase):
+        """Close ``phase``: the time since the previous mark is charged to it"""
+        now = time.perf_counter()
+        self.phases.append((phase, self._ms(now - self._last)))
+        self._last = now
+
+    def finish_import(self):
+        self.import_ms = self._ms(time.perf_counter() - self.started)
+
+    def worker_start(self):
+        """Restart the time-to-first-request clock in a freshly forked worker"""
+        with self._lock:
+            self.worker_started = time.perf_counter()
+            self.first_request_ms = None
+            self.lazy = {}
+
+    def record_lazy(self, name, started):
+        """Note that ``name`` was initialised on first use, starting at ``started``"""
+        with self._lock:
+            self.lazy[name] = self._ms(time.perf_counter() - started)
+
+    def first_request(self):
+        """Record the first request; True only for the call that recorded it"""
+        if self.first_request_ms is not None:
+            return False
+        with self._lock:
+            if self.first_request_ms is not None:
+                return False
+            since = self.worker_started if self.worker_started is not None else self.started
+            self.first_request_ms = self._ms(time.perf_counter() - since)
+            return True
+
+    def report(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'import_ms': self.import_ms,
+                'phases_ms': dict(self.phases),
+                'first_request_ms': self.first_request_ms,
+                'first_request_since': 'worker start' if self.worker_started is not None else 'import start',
+                'lazy_init_ms': dict(self.lazy),
+                'modules_loaded': len(sys.modules),
+            }
+
+    def summary(self):
+        report = self.report()
+        phases = ', '.join(f"{name} {ms}" for name, ms in report['phases_ms'].items())
+        return (f"Worker {report['pid']} cold start: import {report['import_ms']}ms ({phases}), "
+                f"first request {report['first_request_ms']}ms after {report['first_request_since']}")
@@ -0,0 +1,165 @@
+"""Shared fixtures: the Flask test client, login tokens and a fake database.
+
+The fake database answers each statement from a script of (SQL fragment,
+rows) pairs and counts statements the way query_stats does, so query
+budgets are enforced without a Postgres server. Tests that need the real
+SQL semantics use the ``pg`` fixture instead, which runs against a scratch
+database named by TEST_DATABASE_URL and is skipped when it is not set.
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+os.environ.setdefault('DB_POOL_WARM', '0')
+
+import jwt  # noqa: E402
+
+import app as app_module  # noqa: E402
+from query_stats import CountingConnection, _record  # noqa: E402
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+CREATE_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'create.sql')
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self.rowcount = 0
+        self.description = None
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            self.db.statements.append((' '.join(query.split()), vars))
+            self.rows = list(self.db.answer(query))
+            self.rowcount = len(self.rows)
+        finally:
+            _record('statements', started)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            self.db.statements.append((' '.join(sql.split()), file.read()))
+        finally:
+            _record('statements', started)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        started = time.perf_counter()
+        self.db.commits += 1
+        _record('commits', started)
+
+    def rollback(self):
+        self.db.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Answers statements containing a scripted fragment with its rows; others with none"""
+
+    def __init__(self):
+        self.script = []
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def on(self, fragment, rows):
+        self.script.append((' '.join(fragment.split()), rows))
+        return self
+
+    def answer(self, query):
+        query = ' '.join(query.split())
+        for fragment, rows in self.script:
+            if fragment in query:
+                return rows
+        return []
+
+    def connect(self, *args, **kwargs):
+        return FakeConnection(self)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase()
+    # token_required's user check
+    db.on("SELECT * FROM users WHERE userID", [(1, 'user@example.com')])
+    monkeypatch.setattr(app_module, 'get_db_connection', db.connect)
+    monkeypatch.setattr(app_module, 'get_read_connection', db.connect)
+    monkeypatch.setattr(app_module, 'pg_listener', None)
+    return db
+
+
+@pytest.fixture
+def client():
+    app_module.app.testing = True
+    app_module.pantry_snapshots.clear()
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+    token = jwt.encode({'user_id': 1, 'exp': datetime.now(timezone.utc) + timedelta(hours=1)},
+                       app_module.JWT_SECRET, algorithm='HS256')
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def pg(monkeypatch):
+    """A fresh schema built from create.sql in TEST_DATABASE_URL; yields a connect function.
+
+    The app's connections are pointed at it, and it is dropped afterwards.
+    """
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    import psycopg2
+
+    schema = f"pantry_test_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(TEST_DATABASE_URL)
+    admin.autocommit = True
+    admin_cur = admin.cursor()
+    admin_cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    admin_cur.execute(f"CREATE SCHEMA {schema}")
+
+    def connect(*args, **kwargs):
+        return psycopg2.connect(TEST_DATABASE_URL, connection_factory=CountingConnection,
+                                options=f"-c search_path={schema},public")
+
+    conn = connect()
+    with open(CREATE_SQL) as f:
+        conn.cursor().execute(f.read())
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(app_module, 'get_db_connection', connect)
+    monkeypatch.setattr(app_module, 'get_read_connection', connect)
+    monkeypatch.setattr(app_module, 'pg_listener', None)
+    try:
+        yield connect
+    finally:
+        admin_cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
@@ -0,0 +1,54 @@
+import pytest
+
+import categorizer
+from categorizer import NaiveBayesCategorizer, classify, rule_category
+
+# Names checked by hand against their shelf category
+LABELLED = [
+    ("Jif Creamy Peanut Butter", "Pantry Staples"),
+    ("Cinnamon Toast Crunch", "Breakfast Foods"),
+    ("Cream of Mushroom Soup", "Canned Goods"),
+    ("Salt & Vinegar Potato Chips", "Snacks"),
+    ("Fruit Roll-Ups", "Snacks"),
+    ("Whole Milk", "Dairy & Eggs"),
+    ("Salted Butter", "Dairy & Eggs"),
+    ("Spaghetti", "Pasta & Rice"),
+    ("Purina Dog Chow", "Pet Food"),
+    ("Frozen Broccoli Florets", "Frozen Foods"),
+    ("Ground Cinnamon", "Herbs & Spices"),
+    ("Similac Infant Formula with Milk", "Baby Food & Formula"),
+]
+
+# Names whose keywords point at several categories
+AMBIGUOUS = ["Chicken Noodle Soup", "Swanson Chicken Broth", "Chicken Rice Bowl"]
+
+
+@pytest.mark.parametrize("name,category", LABELLED)
+def test_rule_category(name, category):
+    assert rule_category({'title': name}) == category
+
+
+@pytest.mark.parametrize("name", AMBIGUOUS)
+def test_ambiguous_names_are_left_to_the_model(name):
+    assert rule_category({'title': name}) is None
+
+
+def test_description_is_only_used_when_the_name_has_no_keyword():
+    assert rule_category({'title': "Whole Milk", 'description': "great with cereal"}) == "Dairy & Eggs"
+    assert rule_category({'title': "Acme Original", 'description': "crunchy potato chips"}) == "Snacks"
+
+
+def test_rules_alone_do_not_clear_the_default_threshold(monkeypatch):
+    monkeypatch.setattr(categorizer, 'get_model', lambda: None)
+    category, confidence, source = classify({'title': "Whole Milk"}, threshold=0.9)
+    assert category is None and confidence < 1.0
+
+
+def test_rules_answer_when_the_model_agrees_and_defer_when_it_disagrees():
+    model = NaiveBayesCategorizer.fit([
+        ({'title': "whole milk"}, "Dairy & Eggs"),
+        ({'title': "skim milk"}, "Dairy & Eggs"),
+        ({'title': "milk chocolate bar"}, "Snacks"),
+    ])
+    assert classify({'title': "Whole Milk"}, threshold=0.9, model=model)[::2] == ("Dairy & Eggs", 'rules')
+    assert classify({'title': "Whole Milk"}, threshold=0.9, model=model, rule_confidence=0.95)[0] == "Dairy & Eggs"
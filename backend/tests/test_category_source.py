@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app as app_module
+import train_categorizer
+
+MILK = {'title': 'Whole Milk', 'brand': 'Acme', 'description': ''}
+
+
+def fake_openai(answer):
+    message = SimpleNamespace(content=answer)
+    completions = SimpleNamespace(create=lambda **kwargs: SimpleNamespace(choices=[SimpleNamespace(message=message)]))
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+@pytest.fixture
+def deferred_to_gpt(monkeypatch):
+    monkeypatch.setattr(app_module, 'local_category', lambda product_data: None)
+
+
+def test_local_answer_is_recorded_as_local(monkeypatch):
+    monkeypatch.setattr(app_module, 'local_category', lambda product_data: 'Dairy & Eggs')
+    product = dict(MILK)
+    assert app_module.get_gpt_category(product) == 'Dairy & Eggs'
+    assert product['categorySource'] == 'local'
+
+
+def test_gpt_answer_is_recorded_as_gpt(monkeypatch, deferred_to_gpt):
+    monkeypatch.setattr(app_module, 'openai_client', lambda: fake_openai('Dairy & Eggs'))
+    product = dict(MILK)
+    assert app_module.get_gpt_category(product) == 'Dairy & Eggs'
+    assert product['categorySource'] == 'gpt'
+
+
+@pytest.mark.parametrize('client', [lambda: fake_openai('Milk products'), lambda: 1 / 0])
+def test_other_after_a_bad_answer_or_error_is_a_fallback(monkeypatch, deferred_to_gpt, client):
+    monkeypatch.setattr(app_module, 'openai_client', client)
+    product = dict(MILK)
+    assert app_module.get_gpt_category(product) == 'Other'
+    assert product['categorySource'] == 'fallback'
+
+
+def test_training_uses_only_gpt_labels(pg, monkeypatch):
+    monkeypatch.setattr(train_categorizer, 'get_db_connection', pg)
+    for upc, name, source in [(1, 'Whole Milk', 'gpt'), (2, 'Skim Milk', 'local'), (3, 'Oat Milk', 'rules'),
+                              (4, 'Mystery Tin', 'fallback'), (5, 'Goat Milk', 'user'), (6, 'Old Milk', None)]:
+        product = {'upc': upc, 'title': name, 'category': 'Dairy & Eggs', 'categorySource': source}
+        assert app_module.save_product_to_db(product) == (True, None)
+
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("SELECT productUPC, productCategorySource FROM products ORDER BY productUPC")
+    assert cur.fetchall() == [(1, 'gpt'), (2, 'local'), (3, 'rules'), (4, 'fallback'), (5, 'user'), (6, None)]
+    conn.close()
+
+    assert train_categorizer.fetch_samples() == [
+        ({'title': 'Whole Milk', 'brand': '', 'description': ''}, 'Dairy & Eggs')
+    ]
@@ -0,0 +1,44 @@
+import time
+
+import check_cold_start
+from startup_report import StartupTimer
+
+
+def test_startup_does_not_import_first_use_modules():
+    env = check_cold_start.probe_env()
+    env.pop('TEST_DATABASE_URL', None)
+    probe = check_cold_start.run_probe(env)
+    assert probe['status'] == 200
+    loaded = set(probe['modules'])
+    assert 'openai' not in loaded and 'requests' not in loaded
+    assert list(probe['phases_ms'])[0] == 'flask'
+    assert check_cold_start.slowest_imports(probe['importtime'], 3)
+
+
+def test_first_request_is_timed_once_per_worker():
+    timer = StartupTimer()
+    timer.mark('imports')
+    timer.finish_import()
+    assert timer.first_request() is True
+    assert timer.first_request() is False
+    assert timer.report()['first_request_since'] == 'import start'
+
+    timer.record_lazy('openai', time.perf_counter())
+    timer.worker_start()  # a forked worker starts its own clock
+    report = timer.report()
+    assert report['first_request_ms'] is None and report['lazy_init_ms'] == {}
+    assert timer.first_request() is True
+    report = timer.report()
+    assert report['first_request_since'] == 'worker start'
+    assert list(report['phases_ms']) == ['imports'] and report['import_ms'] is not None
+
+
+def test_lazy_clients_record_their_first_use(monkeypatch):
+    import app as app_module
+    timer = StartupTimer()
+    monkeypatch.setattr(app_module, 'startup', timer)
+    monkeypatch.setattr(app_module, '_openai_client', None)
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    client = app_module.openai_client()
+    assert app_module.openai_client() is client
+    assert list(timer.report()['lazy_init_ms']) == ['openai']
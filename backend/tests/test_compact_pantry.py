@@ -0,0 +1,75 @@
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def pantry(pg):
+    """Two products with several lots each for user 1"""
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO users (userID, userLastName, userFirstName, username, email, password_hash)
+        VALUES (1, 'User', 'Test', 'test', 'user@example.com', 'x')
+    """)
+    cur.execute("""
+        INSERT INTO products (productUPC, productName, productBrand, productCategory, productImages)
+        VALUES (12345678905, 'Whole Milk', 'Acme', 'Dairy & Eggs', ARRAY['https://img.example.com/milk.jpg']),
+               (4011, 'Bananas', NULL, 'Produce', NULL)
+    """)
+    for upc, day in [(12345678905, 1), (4011, 2), (12345678905, 3), (12345678905, 4), (4011, 5)]:
+        cur.execute("""
+            INSERT INTO usersProducts (userID, productUPC, quantity, date_purchased, expiration_date)
+            VALUES (1, %s, %s, %s, %s)
+        """, (upc, day, f'2026-01-0{day}', f'2026-02-0{day}'))
+    conn.commit()
+    conn.close()
+
+
+def get_pantry(client, auth_headers, query=''):
+    response = client.get(f'/api/pantry{query}', headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def expand(body):
+    """Rebuild the default shape from a compact body, as a client would"""
+    lots = body['pantry_items']
+    if isinstance(lots, dict):
+        lots = [dict(zip(lots['columns'], row)) for row in lots['rows']]
+    items = []
+    for lot in lots:
+        item = dict(lot, userid=1)
+        item.update(body['products'][str(lot['productupc'])])
+        items.append(item)
+    return items
+
+
+def test_compact_shape_round_trips_to_the_default_shape(client, auth_headers, pantry):
+    full = get_pantry(client, auth_headers)['pantry_items']
+    compact = get_pantry(client, auth_headers, '?shape=compact')
+    assert len(full) == 5
+    assert compact['shape'] == 'compact'
+    assert compact['products'] == {
+        '12345678905': {'productname': 'Whole Milk', 'productbrand': 'Acme', 'productcategory': 'Dairy & Eggs',
+                        'productimages': ['https://img.example.com/milk.jpg']},
+        '4011': {'productname': 'Bananas', 'productbrand': None, 'productcategory': 'Produce',
+                 'productimages': None},
+    }
+    lot_columns = set(compact['pantry_items'][0])
+    assert 'userid' not in lot_columns and not lot_columns & set(app_module.PANTRY_PRODUCT_FIELDS)
+    assert expand(compact) == full
+
+
+def test_compact_columnar_shape_round_trips_too(client, auth_headers, pantry):
+    full = get_pantry(client, auth_headers)['pantry_items']
+    columnar = get_pantry(client, auth_headers, '?shape=compact&layout=columns')
+    assert set(columnar['pantry_items']) == {'columns', 'rows'}
+    assert len(columnar['pantry_items']['rows']) == 5
+    assert expand(columnar) == full
+
+
+def test_each_shape_has_its_own_snapshot(client, auth_headers, pantry):
+    for _ in range(2):
+        assert 'products' not in get_pantry(client, auth_headers)
+        assert 'products' in get_pantry(client, auth_headers, '?shape=compact')
@@ -0,0 +1,125 @@
+import time
+
+import psycopg2
+import pytest
+
+import app as app_module
+from db_router import ReplicaRouter
+
+from .conftest import FakeConnection, FakeDatabase
+
+# fake_db replaces the app's get_read_connection; keep the real one
+get_read_connection = app_module.get_read_connection
+
+
+class LaggingDatabase(FakeDatabase):
+    """A replica whose LAG_SQL answer can be changed between reads"""
+
+    def __init__(self, lag=0.0):
+        super().__init__()
+        self.lag = lag
+        self.checks = 0
+        self.closed = 0
+
+    def answer(self, query):
+        self.checks += 1
+        return [(self.lag,)]
+
+    def connect(self, *args, **kwargs):
+        return ReplicaConnection(self)
+
+
+class ReplicaConnection(FakeConnection):
+    def close(self):
+        self.db.closed += 1
+
+
+class ReplicaPool:
+    def __init__(self, replica, down=False):
+        self.replica = replica
+        self.down = down
+
+    def acquire(self):
+        if self.down:
+            raise psycopg2.OperationalError("could not connect to server")
+        return self.replica.connect()
+
+    def close_all(self):
+        pass
+
+
+def router(*replicas, **kwargs):
+    kwargs.setdefault('check_interval', 0)
+    return ReplicaRouter([(f'replica-{i}', ReplicaPool(r)) for i, r in enumerate(replicas)], **kwargs)
+
+
+def test_reads_rotate_across_healthy_replicas():
+    a, b = LaggingDatabase(), LaggingDatabase()
+    routing = router(a, b)
+    served = [routing.acquire(7).db for _ in range(4)]
+    assert served == [a, b, a, b]
+    assert routing.stats()['reads'] == {'primary': 0, 'replica-0': 2, 'replica-1': 2}
+
+
+def test_a_replica_over_the_lag_cutoff_leaves_rotation_until_it_catches_up():
+    behind, current = LaggingDatabase(lag=12.5), LaggingDatabase()
+    routing = router(behind, current, max_lag=5)
+    assert all(routing.acquire().db is current for _ in range(3))
+    assert behind.closed == 3  # the measured connection goes back, not to the caller
+    assert routing.stats()['replicas'][0] == {'name': 'replica-0', 'healthy': False, 'lag_seconds': 12.5}
+
+    behind.lag = 5.0  # at the cutoff counts as caught up
+    assert {routing.acquire().db for _ in range(2)} == {behind, current}
+
+
+def test_lag_is_measured_at_most_once_per_interval():
+    replica = LaggingDatabase()
+    routing = router(replica, check_interval=60)
+    for _ in range(5):
+        routing.acquire()
+    assert replica.checks == 1
+
+
+def test_every_replica_behind_or_down_falls_back_to_the_primary():
+    routing = ReplicaRouter([('replica-0', ReplicaPool(LaggingDatabase(lag=30))),
+                             ('replica-1', ReplicaPool(LaggingDatabase(), down=True))],
+                            max_lag=5, check_interval=60)
+    assert routing.acquire() is None
+    stats = routing.stats()
+    assert stats['reads']['primary'] == 1 and stats['primary_reasons']['no_replica'] == 1
+    assert [r['healthy'] for r in stats['replicas']] == [False, False]
+    # Failed replicas are skipped without a reconnect until the interval passes
+    assert routing.acquire() is None
+
+
+def test_a_user_reads_from_the_primary_for_a_while_after_writing():
+    routing = router(LaggingDatabase(), sticky_seconds=0.2)
+    routing.note_write(1)
+    assert routing.acquire(1) is None
+    assert routing.acquire(2) is not None
+    assert routing.stats()['primary_reasons'] == {'sticky': 1, 'no_replica': 0}
+    time.sleep(0.25)
+    assert routing.acquire(1) is not None
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    replica = LaggingDatabase()
+    monkeypatch.setattr(app_module, 'replica_router', router(replica))
+    return replica
+
+
+def test_a_successful_write_request_makes_its_user_sticky(client, fake_db, auth_headers, replicas):
+    assert get_read_connection(1).db is replicas
+    response = client.post('/api/pantry/import', data=b'productUPC,quantity\n',
+                           headers=dict(auth_headers, **{'Content-Type': 'text/csv'}))
+    assert response.status_code == 200, response.get_json()
+    assert get_read_connection(1).db is fake_db
+    assert get_read_connection(2).db is replicas
+    assert get_read_connection(2, primary=True).db is fake_db
+
+
+def test_another_workers_pantry_notification_makes_its_user_sticky(monkeypatch, fake_db, replicas):
+    monkeypatch.setattr(app_module, 'pantry_feed', app_module.ChangeFeed(1))
+    app_module.on_pantry_changed('1')
+    assert get_read_connection(1).db is fake_db
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+import pytest
+
+TODAY = date(2026, 3, 30)
+
+
+@pytest.fixture
+def pantry(pg):
+    """Items for user 1 expiring at offsets from TODAY, plus one for another user"""
+    conn = pg()
+    cur = conn.cursor()
+    for user_id in (1, 2):
+        cur.execute("""
+            INSERT INTO users (userID, userLastName, userFirstName, username, email, password_hash)
+            VALUES (%s, 'User', 'Test', %s, %s, 'x')
+        """, (user_id, f'user{user_id}', f'user{user_id}@example.com'))
+    cur.execute("INSERT INTO products (productUPC, productName) VALUES (12345678905, 'Whole Milk')")
+    for offset in (-1, 0, 2, 3, 6, 7):
+        cur.execute("""
+            INSERT INTO usersProducts (userID, productUPC, quantity, expiration_date)
+            VALUES (1, 12345678905, %s, %s)
+        """, (offset, TODAY + timedelta(days=offset)))
+    cur.execute("INSERT INTO usersProducts (userID, productUPC, quantity) VALUES (1, 12345678905, 99)")
+    cur.execute("""
+        INSERT INTO usersProducts (userID, productUPC, quantity, expiration_date)
+        VALUES (2, 12345678905, 50, %s)
+    """, (TODAY,))
+    conn.commit()
+    conn.close()
+
+
+def quantities(rows):
+    return [row['quantity'] for row in rows]
+
+
+def test_expiring_window_is_half_open_and_bucketed(client, auth_headers, pantry):
+    response = client.get(f'/api/pantry/expiring?today={TODAY}&days=7', headers=auth_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['from'], body['to']) == ('2026-03-30', '2026-04-06')
+    # Yesterday and day 7 fall outside [today, today + 7)
+    assert quantities(body['buckets']['expiring_soon']) == [0, 2]
+    assert quantities(body['buckets']['expiring_week']) == [3, 6]
+    assert body['buckets']['later'] == []
+    assert body['counts'] == {'expiring_soon': 2, 'expiring_week': 2, 'later': 0}
+
+
+def test_longer_window_reaches_the_later_bucket(client, auth_headers, pantry):
+    body = client.get(f'/api/pantry/expiring?today={TODAY}&days=8', headers=auth_headers).get_json()
+    assert quantities(body['buckets']['later']) == [7]
+
+
+def test_expired_excludes_today_and_undated_items(client, auth_headers, pantry):
+    body = client.get(f'/api/pantry/expired?today={TODAY}', headers=auth_headers).get_json()
+    assert body['count'] == 1
+    assert quantities(body['expired_items']) == [-1]
+
+
+def test_calendar_counts_days_within_the_month_only(client, auth_headers, pantry):
+    body = client.get(f'/api/pantry/calendar?today={TODAY}&month=2026-03', headers=auth_headers).get_json()
+    assert body['month'] == '2026-03'
+    assert body['days'] == {
+        '2026-03-29': {'count': 1, 'status': 'expired'},
+        '2026-03-30': {'count': 1, 'status': 'expiring_soon'},
+    }
+
+    body = client.get(f'/api/pantry/calendar?today={TODAY}&month=2026-04', headers=auth_headers).get_json()
+    assert body['days'] == {
+        '2026-04-01': {'count': 1, 'status': 'expiring_soon'},
+        '2026-04-02': {'count': 1, 'status': 'expiring_week'},
+        '2026-04-05': {'count': 1, 'status': 'expiring_week'},
+        '2026-04-06': {'count': 1, 'status': 'later'},
+    }
+
+
+@pytest.mark.parametrize('query', [
+    '/api/pantry/expiring?days=0',
+    '/api/pantry/expiring?days=367',
+    '/api/pantry/expiring?today=30-03-2026',
+    '/api/pantry/expired?today=yesterday',
+    '/api/pantry/calendar?month=2026-13',
+])
+def test_malformed_ranges_are_rejected(client, fake_db, auth_headers, query):
+    response = client.get(query, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'VALIDATION_ERROR'
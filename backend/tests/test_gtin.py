@@ -0,0 +1,16 @@
+from gtin import canonical_upc, upc_keys
+
+
+def test_made_up_six_digit_code_is_tried_as_is_first():
+    assert upc_keys('123456') == (123456, canonical_upc('123456'))
+    assert canonical_upc('123456') == 12345000065
+
+
+def test_forms_of_one_upc_a_share_a_single_key():
+    assert upc_keys('012345678905') == (12345678905,)
+    assert upc_keys('0012345678905') == (12345678905,)
+
+
+def test_codes_without_digits_have_no_keys():
+    assert upc_keys('') == ()
+    assert upc_keys('abc') == ()
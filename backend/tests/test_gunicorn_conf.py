@@ -0,0 +1,80 @@
+import importlib.util
+import os
+import runpy
+
+import pytest
+
+import app as app_module
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+class FakeListener:
+    def __init__(self, params):
+        self.channels = []
+        self.started = False
+
+    def subscribe(self, channel, callback):
+        self.channels.append(channel)
+
+    def start(self):
+        self.started = True
+
+
+@pytest.fixture
+def worker_state(monkeypatch):
+    """Restore the per-worker globals that init_worker replaces"""
+    for name in ('db_pool', 'replica_router', 'pg_listener', '_openai_client'):
+        monkeypatch.setattr(app_module, name, getattr(app_module, name))
+    monkeypatch.setattr(app_module.pantry_feed, 'max_subscribers', app_module.pantry_feed.max_subscribers)
+    monkeypatch.setattr(app_module, 'PgListener', FakeListener)
+    for name in ('DB_POOL_SIZE', 'PANTRY_FEED_MAX_STREAMS', 'DB_REPLICA_URLS', 'WEB_CONCURRENCY'):
+        monkeypatch.delenv(name, raising=False)
+
+
+def load_conf():
+    return runpy.run_path(CONF)
+
+
+def test_gthread_workers_size_the_pool_and_feed_from_the_thread_count(monkeypatch, worker_state):
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'gthread')
+    monkeypatch.setenv('GUNICORN_THREADS', '6')
+    conf = load_conf()
+    assert conf['preload_app'] is True
+    assert conf['worker_class'] == 'gthread'
+    assert conf['threads'] == 6 and conf['db_pool_size'] == 6
+    # Half the threads stay free for ordinary requests
+    assert conf['feed_streams'] == 3
+
+
+def test_gevent_falls_back_to_gthread_when_it_is_not_installed(monkeypatch, worker_state):
+    monkeypatch.delenv('GUNICORN_WORKER_CLASS', raising=False)
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, 'find_spec',
+                        lambda name, *args: None if name == 'gevent' else find_spec(name, *args))
+    assert load_conf()['worker_class'] == 'gthread'
+
+
+def test_post_fork_gives_each_worker_its_own_pool_and_listener(monkeypatch, worker_state):
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'gthread')
+    monkeypatch.setenv('GUNICORN_THREADS', '4')
+    conf = load_conf()
+    inherited = app_module.ConnectionPool({}, 1)
+    monkeypatch.setattr(app_module, 'db_pool', inherited)
+
+    conf['post_fork'](server=None, worker=None)
+
+    assert app_module.db_pool is not inherited and app_module.db_pool.max_idle == 4
+    assert app_module.pantry_feed.max_subscribers == 2
+    assert app_module.replica_router is None
+    listener = app_module.pg_listener
+    assert listener.started
+    assert listener.channels == [app_module.PRODUCT_CHANGED_CHANNEL, app_module.PANTRY_CHANGED_CHANNEL]
+
+
+def test_warm_up_primes_and_returns_pooled_connections(monkeypatch, fake_db):
+    monkeypatch.setenv('DB_POOL_WARM', '3')
+    monkeypatch.setenv('OPENAI_WARM', 'false')
+    monkeypatch.setenv('PRODUCT_CACHE_PRELOAD', '0')
+    app_module.warm_up()
+    assert [sql for sql, _ in fake_db.statements] == ['SELECT 1'] * 3
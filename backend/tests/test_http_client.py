@@ -0,0 +1,115 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import HttpClient, UpstreamError
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """Answers each path from a per-server script of (status, headers, delay) replies"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+            script = self.server.script.get(self.path, [])
+            status, headers, delay = script.pop(0) if script else (200, {}, 0)
+        time.sleep(delay)
+        body = f'{status} {self.path}'.encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.hits = {}
+    server.script = {}
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_retry_statuses_are_retried_until_success(upstream):
+    upstream.script['/flaky'] = [(503, {}, 0), (502, {}, 0)]
+    client = HttpClient(max_attempts=3, backoff_base=0)
+    response = client.get(upstream.url + '/flaky')
+    assert response.status_code == 200
+    assert upstream.hits['/flaky'] == 3
+    stats = client.stats()
+    assert stats['requests'] == 1 and stats['attempts'] == 3 and stats['retries'] == 2
+    assert stats['outcomes'] == {'503': 1, '502': 1, '200': 1}
+    client.close()
+
+
+def test_client_errors_are_not_retried(upstream):
+    upstream.script['/missing'] = [(404, {}, 0)]
+    client = HttpClient(backoff_base=0)
+    assert client.get(upstream.url + '/missing').status_code == 404
+    assert upstream.hits['/missing'] == 1
+    client.close()
+
+
+def test_retry_after_is_honoured(upstream):
+    upstream.script['/limited'] = [(429, {'Retry-After': '0.3'}, 0)]
+    client = HttpClient(backoff_base=0)
+    started = time.monotonic()
+    assert client.get(upstream.url + '/limited').status_code == 200
+    assert time.monotonic() - started >= 0.3
+    client.close()
+
+
+def test_a_retry_after_past_the_deadline_returns_the_last_response(upstream):
+    upstream.script['/limited'] = [(429, {'Retry-After': '30'}, 0)]
+    client = HttpClient(backoff_base=0, deadline=1)
+    started = time.monotonic()
+    assert client.get(upstream.url + '/limited').status_code == 429
+    assert time.monotonic() - started < 1
+    assert client.stats()['retries'] == 0
+    client.close()
+
+
+def test_connection_failures_raise_upstream_error_after_every_attempt():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    client = HttpClient(max_attempts=2, backoff_base=0, connect_timeout=0.5)
+    with pytest.raises(UpstreamError):
+        client.get(f'http://127.0.0.1:{port}/')
+    stats = client.stats()
+    assert stats['attempts'] == 2 and stats['outcomes'] == {'error': 2}
+    client.close()
+
+
+def test_a_slow_attempt_is_hedged_and_the_faster_answer_wins(upstream):
+    upstream.script['/slow'] = [(200, {'X-Attempt': 'first'}, 1.0), (200, {'X-Attempt': 'hedge'}, 0)]
+    client = HttpClient(hedge_after=0.1, backoff_base=0)
+    started = time.monotonic()
+    response = client.get(upstream.url + '/slow')
+    assert time.monotonic() - started < 0.8
+    assert response.headers['X-Attempt'] == 'hedge'
+    stats = client.stats()
+    assert stats['hedges'] == 1 and stats['hedge_wins'] == 1
+    client.close()
+
+
+def test_a_fast_attempt_is_not_hedged(upstream):
+    client = HttpClient(hedge_after=0.5, backoff_base=0)
+    assert client.get(upstream.url + '/fast').status_code == 200
+    assert upstream.hits['/fast'] == 1 and client.stats()['hedges'] == 0
+    client.close()
@@ -0,0 +1,83 @@
+import io
+import json
+import threading
+import urllib.request
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import app as app_module
+from fake_image_origin import make_handler
+from image_cache import ImageCache
+
+
+@pytest.fixture
+def origin():
+    args = Namespace(size=400, latency_ms=50, fail_every=0, quiet=True)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def fetches():
+        with urllib.request.urlopen(f"{base}/stats") as response:
+            return json.loads(response.read())['requests']
+
+    yield base, fetches
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def images(monkeypatch, tmp_path, origin):
+    base, fetches = origin
+    urls = [f"{base}/a.png", f"{base}/b.png", "http://images.example.com/c.png"]
+    monkeypatch.setattr(app_module, 'IMAGE_PROXY_HOSTS', frozenset({'127.0.0.1'}))
+    monkeypatch.setattr(app_module, 'image_cache', ImageCache(str(tmp_path), 64 * 1024 * 1024))
+    monkeypatch.setattr(app_module, 'find_product_in_db', lambda upc: ({'productimages': urls}, None))
+    return fetches
+
+
+def test_each_image_is_fetched_from_the_origin_once(client, images):
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda _: client.get('/api/products/1/images/0'), range(8)))
+    responses.append(client.get('/api/products/1/images/0'))
+    assert all(r.status_code == 200 and r.mimetype == 'image/png' for r in responses)
+    assert len({r.data for r in responses}) == 1
+
+    client.get('/api/products/1/images/1')
+    assert images() == {'/a.png': 1, '/b.png': 1}
+
+
+def test_repeated_etag_gets_304(client, images):
+    first = client.get('/api/products/1/images/0')
+    assert first.headers['ETag']
+    again = client.get('/api/products/1/images/0', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+
+
+def test_range_request_gets_206(client, images):
+    full = client.get('/api/products/1/images/0').data
+    partial = client.get('/api/products/1/images/0', headers={'Range': 'bytes=0-99'})
+    assert partial.status_code == 206
+    assert partial.data == full[:100]
+    assert partial.headers['Content-Range'] == f"bytes 0-99/{len(full)}"
+
+
+def test_thumbnails_have_the_requested_width(client, images):
+    Image = pytest.importorskip('PIL.Image')
+    for width in (96, 192):
+        response = client.get(f'/api/products/1/images/0?w={width}')
+        assert response.status_code == 200
+        assert Image.open(io.BytesIO(response.data)).size == (width, width)
+    assert images() == {'/a.png': 1}
+    assert client.get('/api/products/1/images/0?w=100').status_code == 400
+
+
+def test_image_on_another_host_is_not_found_and_never_redirected(client, images):
+    response = client.get('/api/products/1/images/2')
+    assert response.status_code == 404
+    assert 'Location' not in response.headers
+    assert images() == {}
@@ -0,0 +1,75 @@
+import decimal
+import json
+import uuid
+from datetime import date, datetime
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import json_provider
+from json_provider import OrjsonProvider, Rows, dumps_bytes, split_rows
+
+PAYLOAD = {
+    'expiration_date': date(2026, 3, 1),
+    'date_purchased': datetime(2026, 2, 14, 9, 30),
+    'price': decimal.Decimal('3.49'),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'pair': (1, 'two'),
+    'name': 'Crème fraîche',
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def encoder(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    return request.param
+
+
+def test_output_matches_flasks_default_provider(encoder):
+    expected = json.loads(DefaultJSONProvider(Flask(__name__)).dumps(PAYLOAD))
+    assert json.loads(dumps_bytes(PAYLOAD)) == expected
+    assert expected['expiration_date'] == 'Sun, 01 Mar 2026 00:00:00 GMT'
+
+
+def test_iso_dates(encoder):
+    encoded = json.loads(dumps_bytes({'d': date(2026, 3, 1)}, iso_dates=True))
+    assert encoded == {'d': '2026-03-01'}
+
+
+def test_rows_encode_as_objects_or_columns(encoder):
+    rows = [(1, 'Milk', date(2026, 3, 1)), (2, 'Eggs', None)]
+    as_objects = json.loads(dumps_bytes(Rows(['id', 'name', 'expires'], rows)))
+    assert as_objects == [
+        {'id': 1, 'name': 'Milk', 'expires': 'Sun, 01 Mar 2026 00:00:00 GMT'},
+        {'id': 2, 'name': 'Eggs', 'expires': None},
+    ]
+    as_columns = json.loads(dumps_bytes(Rows(['id', 'name', 'expires'], rows, columnar=True)))
+    assert as_columns == {
+        'columns': ['id', 'name', 'expires'],
+        'rows': [[1, 'Milk', 'Sun, 01 Mar 2026 00:00:00 GMT'], [2, 'Eggs', None]],
+    }
+
+
+def test_split_rows_moves_shared_fields_out_once():
+    rows = Rows(['upc', 'name', 'pantryID', 'quantity'],
+                [('1', 'Milk', 10, 1), ('1', 'Milk', 11, 2), ('2', 'Eggs', 12, 6)])
+    records, lots = split_rows(rows, 'upc', ['name'])
+    assert records == {'1': {'name': 'Milk'}, '2': {'name': 'Eggs'}}
+    assert lots.columns == ['upc', 'pantryID', 'quantity']
+    assert lots.rows == [('1', 10, 1), ('1', 11, 2), ('2', 12, 6)]
+
+
+def test_flask_responses_are_encoded_by_the_provider(encoder):
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+
+    @app.route('/rows')
+    def rows():
+        return {'items': Rows(['id'], [(1,), (2,)])}
+
+    response = app.test_client().get('/rows')
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'items': [{'id': 1}, {'id': 2}]}
+    assert app.json.loads('{"a": [1, 2]}') == {'a': [1, 2]}
@@ -0,0 +1,19 @@
+from merge_duplicate_upcs import find_merges
+
+
+def merges_for(fake_db, *keys):
+    fake_db.on("SELECT productUPC FROM products", [(key,) for key in keys])
+    return find_merges(fake_db.connect().cursor())
+
+
+def test_upce_keys_merge_into_their_upc_a(fake_db):
+    # 01234565 stored as a number, and number system 1
+    assert merges_for(fake_db, 1234565, 11234562) == [(1234565, 12345000065), (11234562, 112345000062)]
+
+
+def test_made_up_six_digit_manual_code_is_left_alone(fake_db):
+    assert merges_for(fake_db, 123456, 999999) == []
+
+
+def test_keys_that_fail_the_upce_check_are_left_alone(fake_db):
+    assert merges_for(fake_db, 1234564, 21234565, 12345678905) == []
@@ -0,0 +1,33 @@
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', 'ops-secret')
+    return 'ops-secret'
+
+
+def test_metrics_are_off_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', None)
+    response = client.get('/api/metrics', headers={'Authorization': 'Bearer anything'})
+    assert response.status_code == 404
+    assert 'db_routing' not in response.get_json()
+
+
+@pytest.mark.parametrize('header', [None, 'Bearer wrong', 'ops-secret'])
+def test_metrics_need_the_metrics_token(client, metrics_token, auth_headers, header):
+    headers = {'Authorization': header} if header else {}
+    response = client.get('/api/metrics', headers=headers)
+    assert response.status_code == 401
+    assert response.get_json()['status'] == 'AUTH_ERROR'
+    # A user's login token is not enough either
+    assert client.get('/api/metrics', headers=auth_headers).status_code == 401
+
+
+def test_metrics_with_the_token(client, metrics_token):
+    response = client.get('/api/metrics', headers={'Authorization': f'Bearer {metrics_token}'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert {'db_routing', 'product_writer', 'startup'} <= set(body)
@@ -0,0 +1,37 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from offline_catalog import HEADER, OfflineCatalog
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def test_builder_sorts_across_runs_and_keeps_the_last_duplicate(tmp_path):
+    dump = tmp_path / 'catalog.jsonl'
+    upcs = ['036000291452', '012345678905', '070662404072', '041196910759', '012000161155']
+    lines = [json.dumps({'code': upc, 'name': f'Product {upc}'}) for upc in upcs]
+    lines.append(json.dumps({'code': '012345678905', 'name': 'Renamed'}))
+    lines.append('[]')
+    dump.write_text('\n'.join(lines) + '\n')
+    output = tmp_path / 'catalog.bin'
+
+    result = subprocess.run([sys.executable, 'build_offline_catalog.py', str(dump), '-o', str(output),
+                             '--run-size', '2'], cwd=BACKEND, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert '1 duplicates, 1 skipped' in result.stdout
+
+    catalog = OfflineCatalog(str(output))
+    assert len(catalog) == 5
+    assert list(catalog._keys) == sorted(catalog._keys)
+    assert catalog.get('012345678905')['title'] == 'Renamed'
+    assert catalog.get('0036000291452')['title'] == 'Product 036000291452'
+    assert catalog.get('999999999993') is None
+
+    # The replaced record is not copied into the file
+    data = output.read_bytes()
+    assert b'Product 012345678905' not in data
+    assert len(data) == HEADER.size + 20 * len(catalog) + sum(catalog._lengths)
+    assert list(catalog._offsets) == [sum(catalog._lengths[:i]) for i in range(len(catalog))]
+    catalog.close()
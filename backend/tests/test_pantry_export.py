@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def pantry(pg, monkeypatch):
+    """Five pantry rows for user 1; records the connection the export is served from"""
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO users (userID, userLastName, userFirstName, username, email, password_hash)
+        VALUES (1, 'User', 'Test', 'test', 'user@example.com', 'x')
+    """)
+    cur.execute("INSERT INTO products (productUPC, productName, productBrand) VALUES (12345678905, 'Whole Milk', 'Acme')")
+    for day in range(1, 6):
+        cur.execute("""
+            INSERT INTO usersProducts (userID, productUPC, quantity, date_purchased, expiration_date)
+            VALUES (1, 12345678905, %s, '2026-01-01', %s)
+        """, (day, f'2026-02-0{day}'))
+    conn.commit()
+    conn.close()
+
+    opened = []
+
+    def connect():
+        conn = pg()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(app_module, 'get_db_connection', connect)
+    monkeypatch.setattr(app_module, 'EXPORT_CHUNK_ROWS', 2)
+    yield opened
+    # A failed assertion mid-stream would otherwise block dropping the schema
+    for conn in opened:
+        conn.close()
+
+
+def test_ndjson_export_streams_chunks_from_a_server_side_cursor(client, auth_headers, pantry):
+    response = client.get('/api/pantry/export', headers=auth_headers, buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+    stream = response.iter_encoded()
+    first = next(stream)
+    # Mid-stream the result set is still held by a named cursor on the server
+    conn = pantry[-1]
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM pg_cursors")
+    assert cur.fetchall() == [('pantry_export_1',)]
+    cur.close()
+
+    chunks = [first] + list(stream)
+    response.close()
+    assert conn.closed
+
+    # Five rows at two per fetch
+    assert [chunk.count(b'\n') for chunk in chunks] == [2, 2, 1]
+    rows = [json.loads(line) for line in b''.join(chunks).splitlines()]
+    assert [row['quantity'] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows[0]['productUPC'] == 12345678905 and rows[0]['productBrand'] == 'Acme'
+    assert rows[0]['expiration_date'] == '2026-02-01'
+    assert list(rows[0]) == app_module.EXPORT_FIELDS
+
+
+def test_csv_export_matches_the_import_columns(client, auth_headers, pantry):
+    response = client.get('/api/pantry/export?format=csv', headers=auth_headers)
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == app_module.EXPORT_FIELDS
+    assert rows[0][:len(app_module.IMPORT_FIELDS)] == app_module.IMPORT_FIELDS
+    assert [float(row[1]) for row in rows[1:]] == [1, 2, 3, 4, 5]
+    response.close()
+    assert pantry[-1].closed
+
+
+def test_unknown_format_is_rejected(client, fake_db, auth_headers):
+    response = client.get('/api/pantry/export?format=xml', headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'VALIDATION_ERROR'
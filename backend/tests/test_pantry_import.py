@@ -0,0 +1,17 @@
+def test_import_rejects_non_utf8_body(client, fake_db, auth_headers):
+    response = client.post('/api/pantry/import', data=b'productUPC,quantity\n\xff\xfe,1\n',
+                           headers=dict(auth_headers, **{'Content-Type': 'text/csv'}))
+    assert response.status_code == 400
+    assert response.json['status'] == 'VALIDATION_ERROR'
+    assert 'UTF-8' in response.json['error']
+
+
+def test_import_prefers_the_codes_own_digits(client, fake_db, auth_headers):
+    fake_db.on("SELECT productUPC FROM products WHERE productUPC = ANY", [(123456,)])
+    response = client.post('/api/pantry/import', data=b'productUPC,quantity\n123456,2\n',
+                           headers=dict(auth_headers, **{'Content-Type': 'text/csv'}))
+    assert response.status_code == 200, response.json
+    lookup = next(vars for sql, vars in fake_db.statements if 'FROM products WHERE productUPC = ANY' in sql)
+    assert set(lookup[0]) == {123456, 12345000065}
+    copied = next(data for sql, data in fake_db.statements if sql.startswith('COPY pantry_import'))
+    assert copied.startswith('123456,2.0,')
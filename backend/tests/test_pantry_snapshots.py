@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+import app as app_module
+from pantry_snapshots import SnapshotCache
+
+
+def test_a_snapshot_read_before_a_change_is_not_stored_after_it():
+    cache = SnapshotCache(max_bytes=1 << 20, ttl=60)
+    started = cache.clock()
+    cache.invalidate_user(1)  # the pantry changes while the query runs
+    cache.put((1, 'full'), b'{"stale": true}', [12345678905], started)
+    assert cache.get((1, 'full')) is None
+
+    cache.put((1, 'full'), b'{"fresh": true}', [12345678905], cache.clock())
+    assert cache.get((1, 'full')).body == b'{"fresh": true}'
+
+
+def test_a_product_change_drops_every_snapshot_showing_it():
+    cache = SnapshotCache(max_bytes=1 << 20, ttl=60)
+    now = cache.clock()
+    cache.put((1, 'full'), b'{"a": 1}', [111, 222], now)
+    cache.put((1, 'compact'), b'{"a": 2}', [111], now)
+    cache.put((2, 'full'), b'{"b": 1}', [333], now)
+    cache.invalidate_upc(111)
+    assert cache.get((1, 'full')) is None and cache.get((1, 'compact')) is None
+    assert cache.get((2, 'full')) is not None
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_snapshots_expire_and_are_evicted_by_size():
+    cache = SnapshotCache(max_bytes=20, ttl=0.05)
+    now = cache.clock()
+    cache.put((1, 'full'), b'x' * 10, [], now)
+    cache.put((2, 'full'), b'y' * 10, [], now)
+    cache.put((3, 'full'), b'z' * 10, [], now)
+    assert cache.get((1, 'full')) is None
+    assert cache.stats()['bytes'] == 20
+    time.sleep(0.06)
+    assert cache.get((3, 'full')) is None
+
+
+@pytest.fixture
+def pantry_item(pg):
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO users (userID, userLastName, userFirstName, username, email, password_hash)
+        VALUES (1, 'User', 'Test', 'test', 'user@example.com', 'x')
+    """)
+    cur.execute("INSERT INTO products (productUPC, productName) VALUES (12345678905, 'Whole Milk')")
+    cur.execute("""
+        INSERT INTO usersProducts (userID, productUPC, quantity, date_purchased, expiration_date)
+        VALUES (1, 12345678905, 1, '2026-01-01', '2026-01-11')
+        RETURNING pantryID
+    """)
+    pantry_id = cur.fetchone()[0]
+    conn.commit()
+    yield conn, pantry_id
+    conn.close()
+
+
+def pantry_quantities(client, auth_headers):
+    response = client.get('/api/pantry', headers=auth_headers)
+    assert response.status_code == 200
+    return [item['quantity'] for item in response.get_json()['pantry_items']]
+
+
+def test_repeat_reads_are_served_from_the_snapshot(client, auth_headers, pantry_item):
+    first = client.get('/api/pantry', headers=auth_headers)
+    second = client.get('/api/pantry', headers=auth_headers)
+    assert second.get_data() == first.get_data()
+    assert app_module.pantry_snapshots.stats()['hits'] >= 1
+
+    unchanged = client.get('/api/pantry', headers=dict(auth_headers, **{'If-None-Match': second.headers['ETag']}))
+    assert unchanged.status_code == 304
+
+
+def test_a_pantry_write_invalidates_the_snapshot(client, auth_headers, pantry_item):
+    _, pantry_id = pantry_item
+    assert pantry_quantities(client, auth_headers) == [1]
+    assert pantry_quantities(client, auth_headers) == [1]
+
+    response = client.put(f'/api/pantry/{pantry_id}', headers=auth_headers,
+                          json={'quantity': 3, 'date_purchased': '2026-01-01', 'expiration_date': '2026-01-11'})
+    assert response.status_code == 200
+    assert pantry_quantities(client, auth_headers) == [3]
+
+    assert client.delete(f'/api/pantry/{pantry_id}', headers=auth_headers).status_code == 200
+    assert pantry_quantities(client, auth_headers) == []
+
+
+def test_another_workers_product_change_invalidates_the_snapshot(client, auth_headers, pantry_item):
+    conn, _ = pantry_item
+    assert client.get('/api/pantry', headers=auth_headers).get_json()['pantry_items'][0]['productname'] == 'Whole Milk'
+
+    cur = conn.cursor()
+    cur.execute("UPDATE products SET productName = 'Skim Milk' WHERE productUPC = 12345678905")
+    conn.commit()
+    app_module.on_product_changed('12345678905')  # as the listener delivers the NOTIFY
+
+    assert client.get('/api/pantry', headers=auth_headers).get_json()['pantry_items'][0]['productname'] == 'Skim Milk'
+
+
+def test_another_workers_pantry_write_invalidates_the_snapshot(client, auth_headers, pantry_item, monkeypatch):
+    conn, pantry_id = pantry_item
+    monkeypatch.setattr(app_module, 'pantry_feed', app_module.ChangeFeed(1))
+    assert pantry_quantities(client, auth_headers) == [1]
+
+    cur = conn.cursor()
+    cur.execute("UPDATE usersProducts SET quantity = 5 WHERE pantryID = %s", (pantry_id,))
+    conn.commit()
+    app_module.on_pantry_changed('1')  # the usersProducts trigger's NOTIFY
+
+    assert pantry_quantities(client, auth_headers) == [5]
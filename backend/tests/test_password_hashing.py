@@ -0,0 +1,86 @@
+import threading
+
+import bcrypt
+import pytest
+
+import app as app_module
+from password_hashing import PasswordHasher, hash_rounds
+
+
+def stored_hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    hasher = PasswordHasher(rounds=5)
+    monkeypatch.setattr(app_module, 'password_hasher', hasher)
+    return hasher
+
+
+def login(client, password='hunter22'):
+    return client.post('/api/login', json={'username': 'test', 'password': password})
+
+
+def rehash_updates(fake_db):
+    return [vars for sql, vars in fake_db.statements if sql.startswith('UPDATE users SET password_hash')]
+
+
+def test_login_upgrades_a_hash_made_at_a_lower_cost(client, fake_db, hasher):
+    fake_db.on("FROM users WHERE username", [(1, 'test', stored_hash('hunter22', 4))])
+    response = login(client)
+    assert response.status_code == 200 and response.get_json()['token']
+
+    (new_hash, user_id), = rehash_updates(fake_db)
+    assert user_id == 1 and hash_rounds(new_hash.encode()) == 5
+    assert bcrypt.checkpw(b'hunter22', new_hash.encode())
+    assert fake_db.commits == 1
+    assert hasher.stats()['rehashes'] == 1
+
+
+def test_login_leaves_a_current_hash_alone(client, fake_db, hasher):
+    fake_db.on("FROM users WHERE username", [(1, 'test', stored_hash('hunter22', 5))])
+    assert login(client).status_code == 200
+    assert rehash_updates(fake_db) == []
+
+
+def test_a_wrong_password_is_never_rehashed(client, fake_db, hasher):
+    fake_db.on("FROM users WHERE username", [(1, 'test', stored_hash('hunter22', 4))])
+    response = login(client, 'wrong')
+    assert response.status_code == 401
+    assert rehash_updates(fake_db) == []
+
+
+def test_a_full_hashing_queue_answers_busy(client, fake_db, monkeypatch):
+    hasher = PasswordHasher(max_workers=1, max_queue=0, rounds=4)
+    monkeypatch.setattr(app_module, 'password_hasher', hasher)
+    fake_db.on("FROM users WHERE username", [(1, 'test', stored_hash('hunter22', 4))])
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+
+    holder = threading.Thread(target=hasher._run, args=(slow_hash,))
+    holder.start()
+    assert started.wait(5)
+    try:
+        response = login(client)
+    finally:
+        release.set()
+        holder.join(5)
+    assert response.status_code == 503
+    assert hasher.stats()['rejected'] == 1
+    assert hasher.check('hunter22', stored_hash('hunter22', 4))
+
+
+def test_calibration_picks_the_highest_cost_within_the_target():
+    assert PasswordHasher(min_rounds=4, target_ms=0).rounds == 4
+    assert PasswordHasher(min_rounds=4, max_rounds=6, target_ms=60000).rounds == 6
+    assert PasswordHasher(rounds=7, min_rounds=4).rounds == 7
+
+
+def test_hash_rounds_reads_the_cost_and_rejects_other_formats():
+    assert hash_rounds(stored_hash('x', 4).encode()) == 4
+    assert hash_rounds(b'plaintext') is None
+    assert PasswordHasher(rounds=5).needs_rehash('plaintext')
@@ -0,0 +1,90 @@
+import os
+import time
+
+import pytest
+
+import app as app_module
+from pg_listener import PgListener
+from product_cache import ProductCache, ProductRecord
+
+
+def product(upc, name='Whole Milk', images=()):
+    return {'productupc': upc, 'productname': name, 'productimages': list(images)}
+
+
+def test_lru_evicts_the_least_recently_used_within_the_byte_budget():
+    one_record = ProductRecord(product(1)).size()
+    cache = ProductCache(max_bytes=one_record * 2 + one_record // 2)
+    cache.put(1, product(1))
+    cache.put(2, product(2))
+    assert cache.get(1).productname == 'Whole Milk'  # 1 is now the most recent
+    cache.put(3, product(3))
+
+    assert cache.get(2) is None
+    assert cache.get(1) and cache.get(3)
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+    assert stats['bytes'] <= cache.max_bytes
+
+
+def test_a_row_read_before_an_invalidation_is_not_cached():
+    cache = ProductCache(max_bytes=1 << 20)
+    generation = cache.generation
+    cache.invalidate(1)  # another worker's write lands while the row is in flight
+    cache.put(1, product(1, 'Stale'), generation)
+    assert cache.get(1) is None
+
+
+def test_records_round_trip_and_share_image_urls():
+    url = 'https://images.example.com/' + 'milk' * 10
+    first = ProductRecord(product(1, images=[url]))
+    second = ProductRecord(product(2, images=[''.join(['https://images.example.com/', 'milk' * 10])]))
+    assert first.productimages[0] is second.productimages[0]
+    assert first.as_row()['productimages'] == [url]
+    assert first.as_row()['productbrand'] is None
+
+
+@pytest.mark.parametrize('payload', ['*', None])
+def test_bulk_changes_and_reconnects_drop_everything(monkeypatch, payload):
+    monkeypatch.setattr(app_module, 'product_cache', ProductCache(max_bytes=1 << 20))
+    app_module.product_cache.put(1, product(1))
+    app_module.product_cache.put(2, product(2))
+    app_module.on_product_changed(payload)
+    assert app_module.product_cache.stats()['entries'] == 0
+
+
+def test_another_workers_write_invalidates_through_notify(pg, monkeypatch):
+    monkeypatch.setattr(app_module, 'product_cache', ProductCache(max_bytes=1 << 20))
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("INSERT INTO products (productUPC, productName) VALUES (12345678905, 'Whole Milk')")
+    conn.commit()
+
+    assert app_module.find_product_in_db('12345678905')[0]['productname'] == 'Whole Milk'
+    assert app_module.product_cache.get(12345678905)
+
+    listener = PgListener({'dsn': os.environ['TEST_DATABASE_URL']})
+    listener.subscribe(app_module.PRODUCT_CHANGED_CHANNEL, app_module.on_product_changed)
+    listener.start()
+    deadline = time.monotonic() + 5
+    listening = 0
+    while not listening and time.monotonic() < deadline:
+        cur.execute("SELECT count(*) FROM pg_stat_activity WHERE query = %s",
+                    (f'LISTEN "{app_module.PRODUCT_CHANGED_CHANNEL}"',))
+        listening = cur.fetchone()[0]
+        conn.commit()
+        time.sleep(0.01)
+
+    # Another worker renames the product; the notification is sent on commit
+    cur.execute("UPDATE products SET productName = 'Skim Milk' WHERE productUPC = 12345678905")
+    app_module.notify_product_changed(cur, 12345678905)
+    assert app_module.product_cache.get(12345678905), "invalidated before the commit"
+    conn.commit()
+    conn.close()
+
+    deadline = time.monotonic() + 5
+    while app_module.product_cache.get(12345678905) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert app_module.product_cache.get(12345678905) is None
+    assert listener.stats()['received'] >= 1
+    assert app_module.find_product_in_db('12345678905')[0]['productname'] == 'Skim Milk'
@@ -0,0 +1,42 @@
+import json
+
+from product_catalog import goupc_to_product, read_catalog
+
+
+def write_lines(tmp_path, lines):
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_read_catalog_skips_records_that_are_not_objects(tmp_path):
+    path = write_lines(tmp_path, [
+        '[1, 2, 3]',
+        '"just a string"',
+        '42',
+        json.dumps({'code': '012345678905', 'product': {'name': 'Milk'}}),
+    ])
+    records = [record for record, _ in read_catalog(path)]
+    assert [type(r).__name__ for r in records] == ['ValueError', 'ValueError', 'ValueError', 'dict']
+    assert goupc_to_product(records[-1])['title'] == 'Milk'
+
+
+def test_read_catalog_skips_non_string_fields(tmp_path):
+    path = write_lines(tmp_path, [
+        json.dumps({'code': '012345678905', 'product': {'name': 'Milk', 'brand': 7}}),
+        json.dumps({'code': '012345678905', 'product': {'name': ['Milk']}}),
+        json.dumps({'code': '012345678905', 'product': {'name': 'Milk', 'specs': [['Size', 1]]}}),
+        json.dumps({'code': '012345678905', 'product': 'Milk'}),
+        json.dumps({'code': None, 'name': 'Milk'}),
+    ])
+    records = [record for record, _ in read_catalog(path)]
+    assert all(isinstance(r, ValueError) for r in records)
+    assert 'brand' in str(records[0])
+
+
+def test_read_catalog_offsets_advance_past_skipped_records(tmp_path):
+    path = write_lines(tmp_path, ['[]', json.dumps({'code': '012345678905', 'name': 'Milk'})])
+    (_, first), (_, second) = list(read_catalog(path))
+    assert 0 < first < second
+    records = list(read_catalog(path, first))
+    assert len(records) == 1 and isinstance(records[0][0], dict)
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+import app as app_module
+
+
+class NotFound:
+    status_code = 404
+
+    def json(self):
+        return {}
+
+
+def test_refresh_of_a_product_gone_from_goupc_restarts_both_clocks(monkeypatch, fake_db):
+    monkeypatch.setattr(app_module, 'call_upc_api', lambda upc: NotFound())
+    app_module.refresh_product(12345678905)
+    update = next(sql for sql, _ in fake_db.statements if sql.startswith('UPDATE products'))
+    assert 'productFetchedAt = now()' in update and 'productEnrichedAt = now()' in update
+    assert fake_db.commits == 1
+
+
+def test_product_refreshed_after_a_404_is_no_longer_stale():
+    now = datetime.now(timezone.utc)
+    refreshed = {'productupc': 12345678905, 'productfetchedat': now, 'productenrichedat': now}
+    assert not app_module.product_is_stale(refreshed)
+    assert app_module.product_is_stale(dict(refreshed, productenrichedat=now - timedelta(days=365)))
+    assert app_module.product_is_stale(dict(refreshed, productfetchedat=now - timedelta(days=365)))
+
+
+def loaded_row(**columns):
+    """A products row as load_catalog writes it without --categorize"""
+    row = {name: None for name in (
+        'productname', 'productbrand', 'productcategory', 'productdescription', 'productlowestprice',
+        'producthighestprice', 'productcurrency', 'productimages', 'productmodel', 'productcolor',
+        'productsize', 'productdimension', 'productweight', 'productenrichedat')}
+    row.update(productupc=12345678905, productname='Whole Milk', productfetchedat=datetime.now(timezone.utc))
+    row.update(columns)
+    return row
+
+
+def test_bulk_loaded_product_is_categorised_locally_not_refetched(monkeypatch, fake_db):
+    refreshes = []
+    monkeypatch.setattr(app_module.product_refresher, 'submit', refreshes.append)
+    monkeypatch.setattr(app_module, 'local_category', lambda product_data: 'Dairy & Eggs')
+    row = loaded_row()
+    assert not app_module.product_is_stale(row)
+
+    body = app_module.database_product_body(row)
+    assert body['items'][0]['category'] == 'Dairy & Eggs'
+    assert refreshes == []
+    update = [(sql, params) for sql, params in fake_db.statements if sql.startswith('UPDATE products')]
+    assert update == [(update[0][0], ('Dairy & Eggs', 'local', 12345678905))]
+    assert 'productEnrichedAt = now()' in update[0][0]
+    assert fake_db.commits == 1
+
+
+def test_enriched_product_is_served_without_writes(monkeypatch, fake_db):
+    monkeypatch.setattr(app_module.product_refresher, 'submit', lambda upc: None)
+    row = loaded_row(productcategory='Dairy & Eggs', productenrichedat=datetime.now(timezone.utc))
+    app_module.database_product_body(row)
+    assert not [sql for sql, _ in fake_db.statements if sql.startswith('UPDATE products')]
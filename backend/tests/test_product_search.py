@@ -0,0 +1,94 @@
+import pytest
+
+import app as app_module
+from app import search_tsquery
+
+PRODUCTS = [
+    (1, 'Whole Milk', 'Acme', 'Fresh whole milk'),
+    (2, 'Milk Chocolate Bar', 'Cocoa Co', 'Creamy chocolate'),
+    (3, 'Oat Drink', 'Oatly', 'A dairy free alternative to milk'),
+    (4, 'Skim Milk', 'Acme', 'Low fat milk'),
+    (5, 'Wholemeal Bread', 'Bakers', 'Sliced loaf'),
+    (6, 'Chocolate Milk', 'Acme', 'Chocolate flavoured milk'),
+]
+
+
+def test_last_word_is_a_prefix():
+    assert search_tsquery('whole mil') == 'whole & mil:*'
+
+
+def test_short_last_word_waits_for_more_typing():
+    assert search_tsquery('milk ch') == 'milk'
+    assert search_tsquery('mi') is None
+    assert search_tsquery(' - ') is None
+
+
+def test_too_short_search_is_rejected_without_a_query(client, fake_db, auth_headers):
+    response = client.get('/api/products/search?q=mi', headers=auth_headers)
+    assert response.status_code == 400
+    assert [sql for sql, _ in fake_db.statements if 'FROM products' in sql] == []
+
+
+def test_search_reads_from_the_read_connection(client, fake_db, auth_headers, monkeypatch):
+    readers = []
+
+    def get_read_connection(user_id=None, primary=False):
+        readers.append(user_id)
+        return fake_db.connect()
+
+    monkeypatch.setattr(app_module, 'get_read_connection', get_read_connection)
+    response = client.get('/api/products/search?q=milk', headers=auth_headers)
+    assert response.status_code == 200
+    assert readers == [1]
+
+
+@pytest.fixture
+def catalog(pg):
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO users (userID, userLastName, userFirstName, username, email, password_hash)
+        VALUES (1, 'User', 'Test', 'test', 'user@example.com', 'x')
+    """)
+    for upc, name, brand, description in PRODUCTS:
+        cur.execute("""
+            INSERT INTO products (productUPC, productName, productBrand, productDescription)
+            VALUES (%s, %s, %s, %s)
+        """, (upc, name, brand, description))
+    conn.commit()
+    conn.close()
+
+
+def search(client, auth_headers, query):
+    response = client.get(f'/api/products/search?{query}', headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def upcs(body):
+    return [row['productupc'] for row in body['results']]
+
+
+def test_name_matches_rank_above_description_matches(client, auth_headers, catalog):
+    found = upcs(search(client, auth_headers, 'q=milk'))
+    assert set(found) == {1, 2, 3, 4, 6}
+    assert found[-1] == 3
+
+
+def test_prefix_matches_as_the_user_types(client, auth_headers, catalog):
+    assert set(upcs(search(client, auth_headers, 'q=whol'))) == {1, 5}
+    assert upcs(search(client, auth_headers, 'q=whole mil')) == [1]
+
+
+def test_misspelt_name_is_found_by_trigram_similarity(client, auth_headers, catalog):
+    assert upcs(search(client, auth_headers, 'q=Chocolate Mlk'))[0] == 6
+
+
+def test_pages_do_not_overlap_and_report_more(client, auth_headers, catalog):
+    first = search(client, auth_headers, 'q=milk&limit=2&page=1')
+    second = search(client, auth_headers, 'q=milk&limit=2&page=2')
+    third = search(client, auth_headers, 'q=milk&limit=2&page=3')
+    assert first['has_more'] and second['has_more'] and not third['has_more']
+    pages = upcs(first) + upcs(second) + upcs(third)
+    assert pages == upcs(search(client, auth_headers, 'q=milk&limit=10'))
+    assert len(set(pages)) == 5
@@ -0,0 +1,57 @@
+from datetime import date
+
+import pytest
+
+import app as app_module
+from query_stats import QueryBudgetExceeded, begin_request, current_stats, query_budget
+
+
+def test_add_to_pantry_fits_its_budget(client, fake_db, auth_headers):
+    fake_db.on("INSERT INTO usersProducts", [
+        (7, 1, '012345678905', 2.0, 'items', date(2026, 1, 2), None, 'Oats', 'Acme')
+    ])
+    response = client.post('/api/pantry', json={'productUPC': '012345678905', 'quantity': 2},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['pantryItem']['pantryID'] == 7
+    assert int(response.headers['X-SQL-Statements']) <= 2
+    assert fake_db.commits == 1
+
+
+def test_update_pantry_item_fits_its_budget(client, fake_db, auth_headers):
+    fake_db.on("UPDATE usersProducts", [
+        {'pantryid': 7, 'userid': 1, 'productupc': '012345678905', 'quantity': 3.0,
+         'expiration_date': date(2026, 3, 1)}
+    ])
+    response = client.put('/api/pantry/7', json={'quantity': 3, 'expiration_date': '2026-03-01'},
+                          headers=auth_headers)
+    assert response.status_code == 200
+    assert int(response.headers['X-SQL-Statements']) <= 2
+    update = [sql for sql, _ in fake_db.statements if 'UPDATE usersProducts' in sql]
+    assert len(update) == 1 and 'WHERE pantryID = %s AND userID = %s' in update[0]
+
+
+def test_remove_from_pantry_fits_its_budget(client, fake_db, auth_headers):
+    fake_db.on("DELETE FROM usersProducts", [(1,)])
+    response = client.delete('/api/pantry/7', headers=auth_headers)
+    assert response.status_code == 200
+    assert int(response.headers['X-SQL-Statements']) <= 2
+
+
+def test_remove_someone_elses_item_is_not_found(client, fake_db, auth_headers):
+    response = client.delete('/api/pantry/7', headers=auth_headers)
+    assert response.status_code == 404
+    assert int(response.headers['X-SQL-Statements']) <= 2
+
+
+def test_going_over_the_budget_fails_when_testing():
+    @query_budget(2)
+    def chatty():
+        current_stats()['statements'] += 3
+        return 'ok'
+
+    app_module.app.testing = True
+    with app_module.app.test_request_context('/api/pantry'):
+        begin_request()
+        with pytest.raises(QueryBudgetExceeded):
+            chatty()
@@ -0,0 +1,41 @@
+import pytest
+
+from shelf_life import rule_days
+
+SHELF_STABLE = [
+    ("Hershey's Milk Chocolate Bar", "Snacks"),
+    ("Campbell's Chicken Noodle Soup", "Canned Goods"),
+    ("Swanson Chicken Broth", "Pantry Staples"),
+    ("Jif Creamy Peanut Butter", "Pantry Staples"),
+    ("Cheez-It Cheese Crackers", "Snacks"),
+    ("Nestle Carnation Evaporated Milk", "Dairy & Eggs"),
+]
+
+PERISHABLE = [
+    ("Whole Milk", "Dairy & Eggs", "10"),
+    ("Boneless Chicken Breast", "Meat & Seafood", "4"),
+    ("Salted Butter", "Dairy & Eggs", "60"),
+    ("Ground Beef 80/20", None, "2"),
+    ("Fresh Orange Juice", "Beverages", "10"),
+    ("Frozen Peas", "Frozen Foods", "180"),
+]
+
+
+@pytest.mark.parametrize("name,category", SHELF_STABLE)
+def test_shelf_stable_category_wins_over_perishable_keywords(name, category):
+    assert rule_days({'title': name}, category) == "n/a"
+
+
+@pytest.mark.parametrize("name,category,days", PERISHABLE)
+def test_perishable_products(name, category, days):
+    assert rule_days({'title': name}, category) == days
+
+
+@pytest.mark.parametrize("name", [name for name, _ in SHELF_STABLE])
+def test_shelf_stable_names_without_a_category(name):
+    assert rule_days({'title': name}) == "n/a"
+
+
+def test_category_from_product_data_and_unknown_products():
+    assert rule_days({'title': "Mystery Item", 'category': "Snacks"}) == "n/a"
+    assert rule_days({'title': "Mystery Item"}, "Other") is None
@@ -0,0 +1,47 @@
+import pytest
+
+
+@pytest.fixture
+def pantry_item(pg):
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO users (userID, userLastName, userFirstName, username, email, password_hash)
+        VALUES (1, 'User', 'Test', 'test', 'user@example.com', 'x')
+    """)
+    cur.execute("INSERT INTO products (productUPC, productName) VALUES (12345678905, 'Whole Milk')")
+    cur.execute("""
+        INSERT INTO usersProducts (userID, productUPC, quantity, date_purchased, expiration_date)
+        VALUES (1, 12345678905, 1, '2026-01-01', '2026-01-11')
+        RETURNING pantryID
+    """)
+    pantry_id = cur.fetchone()[0]
+    conn.commit()
+
+    def shelf_life():
+        cur.execute("SELECT observations, totalDays FROM productShelfLife WHERE productUPC = 12345678905")
+        row = cur.fetchone()
+        conn.commit()
+        return row
+
+    yield pantry_id, shelf_life
+    conn.close()
+
+
+def test_quantity_edit_resending_the_same_date_learns_nothing(client, auth_headers, pantry_item):
+    pantry_id, shelf_life = pantry_item
+    for quantity in (2, 3, 4):
+        response = client.put(f'/api/pantry/{pantry_id}', headers=auth_headers,
+                              json={'quantity': quantity, 'date_purchased': '2026-01-01',
+                                    'expiration_date': '2026-01-11'})
+        assert response.status_code == 200
+        assert response.get_json()['pantry_item']['quantity'] == quantity
+    assert shelf_life() is None
+
+
+def test_changed_expiration_date_is_learned_once(client, auth_headers, pantry_item):
+    pantry_id, shelf_life = pantry_item
+    body = {'quantity': 1, 'date_purchased': '2026-01-01', 'expiration_date': '2026-01-08'}
+    assert client.put(f'/api/pantry/{pantry_id}', headers=auth_headers, json=body).status_code == 200
+    assert client.put(f'/api/pantry/{pantry_id}', headers=auth_headers, json=body).status_code == 200
+    assert shelf_life() == (1, 7)
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Start ``callers`` threads on ``key`` and return once all but the leader are waiting"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.stats()['followers'] < callers - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def lookup():
+        calls.append(1)
+        release.wait(5)
+        return {'upc': '012345678905'}
+
+    threads, results, errors = run_concurrently(flight, '012345678905', lookup, 8)
+    assert flight.stats() == {'in_flight': 1, 'leaders': 1, 'followers': 7}
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1 and not errors
+    assert len(results) == 8 and all(result is results[0] for result in results)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def lookup():
+        release.wait(5)
+        raise TimeoutError("upstream timed out")
+
+    threads, results, errors = run_concurrently(flight, 'key', lookup, 4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [] and len(errors) == 4
+    assert all(isinstance(e, TimeoutError) for e in errors)
+
+
+def test_keys_are_independent_and_finished_calls_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.do('a', lambda: 3) == 3
+    assert flight.stats() == {'in_flight': 0, 'leaders': 3, 'followers': 0}
+
+    with pytest.raises(ValueError):
+        flight.do('a', lambda: int('x'))
+    assert flight.do('a', lambda: 4) == 4
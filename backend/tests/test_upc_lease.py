@@ -0,0 +1,59 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import app as app_module
+
+UPC = '012345678905'
+
+
+class FoundOnGoUPC:
+    status_code = 200
+
+    def json(self):
+        return {'code': UPC, 'product': {'name': 'Whole Milk', 'brand': 'Acme', 'category': 'Dairy'}}
+
+
+def lookup_in_worker(calls, results):
+    """One gunicorn worker: its own process, write-behind queue and product cache"""
+    def call_upc_api(upc):
+        with calls.get_lock():
+            calls.value += 1
+        time.sleep(0.5)
+        return FoundOnGoUPC()
+
+    app_module.call_upc_api = call_upc_api
+    body, status = app_module.fetch_product_with_lease(UPC)
+    results.put((status, body['source']))
+    # Stay up until the queued write has committed and the lease is released
+    app_module.product_writer.flush(5)
+    for thread in threading.enumerate():
+        if thread.name == 'upc-lease-release':
+            thread.join(5)
+
+
+def test_write_behind_holds_the_lease_until_the_product_is_in_the_database(pg, monkeypatch):
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        pytest.skip("needs fork")
+    monkeypatch.setattr(app_module, 'PRODUCT_WRITE_BEHIND', True)
+    monkeypatch.setattr(app_module, 'add_expiry_estimate',
+                        lambda product_data, category=None: product_data.update(category='Dairy & Eggs'))
+    # Wide enough that the waiter is not answered before the write commits
+    monkeypatch.setattr(app_module.product_writer, 'linger', 0.3)
+
+    context = multiprocessing.get_context('fork')
+    calls = context.Value('i', 0)
+    results = context.Queue()
+    holder = context.Process(target=lookup_in_worker, args=(calls, results))
+    holder.start()
+    time.sleep(0.2)
+    waiter = context.Process(target=lookup_in_worker, args=(calls, results))
+    waiter.start()
+    holder.join(15)
+    waiter.join(15)
+
+    assert holder.exitcode == 0 and waiter.exitcode == 0
+    assert sorted(results.get(timeout=1) for _ in range(2)) == [(200, 'api'), (200, 'database')]
+    assert calls.value == 1
@@ -0,0 +1,43 @@
+from write_behind import WriteBehindQueue
+
+
+class BadRow(Exception):
+    pass
+
+
+def test_a_row_that_always_fails_is_dropped_alone():
+    written = []
+
+    def writer(items):
+        if 'bad' in items:
+            raise BadRow("violates a constraint")
+        written.extend(items)
+
+    queue = WriteBehindQueue(writer, batch_size=50, linger=0.2, max_retries=5,
+                             backoff_base=0, permanent_errors=(BadRow,))
+    items = [f'row-{i}' for i in range(20)]
+    items.insert(7, 'bad')
+    for i, item in enumerate(items):
+        assert queue.submit(i, item)
+    assert queue.flush(5)
+
+    assert sorted(written) == sorted(item for item in items if item != 'bad')
+    stats = queue.stats()
+    assert stats['written'] == 20 and stats['dropped'] == 1
+    assert stats['retries'] == 0 and stats['splits'] > 0
+
+
+def test_transient_failures_are_retried_for_the_whole_batch():
+    attempts = []
+
+    def writer(items):
+        attempts.append(list(items))
+        if len(attempts) < 3:
+            raise ConnectionError("database unavailable")
+
+    queue = WriteBehindQueue(writer, linger=0.1, backoff_base=0, permanent_errors=(BadRow,))
+    for i in range(5):
+        queue.submit(i, i)
+    assert queue.flush(5)
+    assert len(attempts) == 3 and attempts[-1] == list(range(5))
+    assert queue.stats()['retries'] == 2 and queue.stats()['dropped'] == 0
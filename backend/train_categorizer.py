@@ -0,0 +1,127 @@
+"""Train the local category model from products GPT has already categorised.
+
+    python train_categorizer.py [--holdout 0.2] [--report report.json]
+
+Only categories GPT itself assigned (productCategorySource = 'gpt',
+migration 007) are used; labels from the local classifier, the keyword
+rules, the "Other" fallback or users would measure the classifier against
+its own output. Holds out a share of those products, prints how often the
+keyword rules and the model agree with the GPT labels and how many products
+each would answer without GPT at the configured threshold, then retrains on
+every row and writes the model to CATEGORY_MODEL_PATH (category_model.json).
+The measured rules accuracy is the value to give CATEGORY_RULE_CONFIDENCE.
+"""
+import argparse
+import json
+import random
+import sys
+from collections import Counter
+
+from app import get_db_connection
+from categorizer import (CONFIDENCE_THRESHOLD, FOOD_CATEGORIES, MODEL_PATH,
+                         NaiveBayesCategorizer, classify, rule_category)
+
+def fetch_samples():
+    conn = get_db_connection()
+    if not conn:
+        sys.exit("Database connection failed")
+    cur = conn.cursor(name='categorizer_training')
+    cur.itersize = 10000
+    cur.execute("""
+        SELECT productName, productBrand, productDescription, productCategory
+        FROM products
+        WHERE productCategory = ANY(%s) AND productCategorySource = 'gpt'
+    """, (FOOD_CATEGORIES,))
+    samples = [
+        ({'title': name, 'brand': brand, 'description': description}, category)
+        for name, brand, description, category in cur
+    ]
+    cur.close()
+    conn.close()
+    return samples
+
+def evaluate(model, samples, threshold):
+    """Agreement with the GPT labels for rules, model and the combined path"""
+    report = {'samples': len(samples), 'threshold': threshold}
+    rules = Counter()
+    answered = Counter()
+    per_category = {c: Counter() for c in FOOD_CATEGORIES}
+
+    for product_data, label in samples:
+        rule = rule_category(product_data)
+        if rule:
+            rules['answered'] += 1
+            rules['correct'] += rule == label
+        predicted, _, _ = classify(product_data, threshold, model)
+
+        per_category[label]['total'] += 1
+        if predicted:
+            answered['answered'] += 1
+            answered['correct'] += predicted == label
+            per_category[label]['answered'] += 1
+            per_category[label]['correct'] += predicted == label
+        model_only, _ = model.predict(product_data)
+        answered['model_correct'] += model_only == label
+
+    n = len(samples) or 1
+    report['rules_coverage'] = rules['answered'] / n
+    report['rules_accuracy'] = rules['correct'] / rules['answered'] if rules['answered'] else None
+    report['model_accuracy_all'] = answered['model_correct'] / n
+    report['local_coverage'] = answered['answered'] / n
+    report['deferral_rate'] = 1 - report['local_coverage']
+    report['local_accuracy'] = answered['correct'] / answered['answered'] if answered['answered'] else None
+    report['per_category'] = {
+        c: {
+            'total': counts['total'],
+            'coverage': counts['answered'] / counts['total'],
+            'accuracy': counts['correct'] / counts['answered'] if counts['answered'] else None,
+        }
+        for c, counts in per_category.items() if counts['total']
+    }
+    return report
+
+def print_report(report):
+    def pct(value):
+        return '   -  ' if value is None else f"{value * 100:5.1f}%"
+
+    print(f"Held-out products: {report['samples']}, confidence threshold {report['threshold']}")
+    print(f"  keyword rules     coverage {pct(report['rules_coverage'])}  accuracy {pct(report['rules_accuracy'])}")
+    print(f"  model alone       coverage {pct(1.0)}  accuracy {pct(report['model_accuracy_all'])}")
+    print(f"  rules + model     coverage {pct(report['local_coverage'])}  accuracy {pct(report['local_accuracy'])}")
+    print(f"  deferred to GPT   {pct(report['deferral_rate'])}")
+    if report['rules_accuracy'] is not None:
+        print(f"  set CATEGORY_RULE_CONFIDENCE={report['rules_accuracy']:.2f} to let the rules answer without the model")
+    print()
+    print(f"  {'category':<24} {'n':>7} {'local':>7} {'accuracy':>9}")
+    for category, row in sorted(report['per_category'].items(), key=lambda kv: -kv[1]['total']):
+        print(f"  {category:<24} {row['total']:>7} {pct(row['coverage']):>7} {pct(row['accuracy']):>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local product category model")
+    parser.add_argument('--holdout', type=float, default=0.2, help="share of products held out for the report")
+    parser.add_argument('--threshold', type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument('--report', help="also write the report as JSON to this path")
+    parser.add_argument('--output', default=MODEL_PATH, help=f"model path (default {MODEL_PATH})")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    samples = fetch_samples()
+    if not samples:
+        sys.exit("No GPT-categorised products to train on; products categorised before "
+                 "migrations/007_product_category_source.sql have no recorded source")
+
+    random.Random(args.seed).shuffle(samples)
+    split = int(len(samples) * (1 - args.holdout))
+    train, test = samples[:split], samples[split:]
+    if test:
+        report = evaluate(NaiveBayesCategorizer.fit(train), test, args.threshold)
+        print_report(report)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    NaiveBayesCategorizer.fit(samples).save(args.output)
+    print(f"\nTrained on {len(samples)} products, model written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Bounded write-behind queue: requests hand off writes and return."""
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+
+class WriteBehindQueue:
+    """Keyed items written in batches by a daemon thread.
+
+    ``submit(key, item)`` never blocks. A newer item for a key still queued
+    replaces the older one. When the queue is full it returns False and the
+    caller should write synchronously. ``writer(items)`` writes a batch of up
+    to ``batch_size`` items in one transaction; if it raises, the batch is
+    retried with jittered exponential backoff, and dropped after
+    ``max_retries`` failures. An exception in ``permanent_errors`` (bad data
+    rather than an unavailable database) is not retried: the batch is split
+    in half until the items that fail on their own are found, and only those
+    are dropped, with their keys logged. The thread starts on first use in
+    each process, so the queue is safe to create before gunicorn forks.
+    """
+
+    def __init__(self, writer, max_pending=1000, batch_size=50, linger=0.05, max_retries=5,
+                 backoff_base=0.5, backoff_cap=30.0, permanent_errors=(), name='write-behind'):
+        self.writer = writer
+        self.permanent_errors = tuple(permanent_errors)
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.name = name
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._items = OrderedDict()  # key -> (item, enqueued at)
+        self._in_flight = set()
+        self._thread = None
+        self._pid = os.getpid()
+        self._counts = {'submitted': 0, 'coalesced': 0, 'rejected': 0, 'written': 0,
+                        'batches': 0, 'retries': 0, 'splits': 0, 'dropped': 0}
+        self._last_lag = None
+        self._max_lag = 0.0
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            self._reset()  # forked: the parent's thread and queue are not ours
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, key, item):
+        with self._cond:
+            self._ensure_started()
+            queued = self._items.get(key)
+            if queued is None and len(self._items) >= self.max_pending:
+                self._counts['rejected'] += 1
+                return False
+            if queued is None:
+                self._items[key] = (item, time.monotonic())
+                self._counts['submitted'] += 1
+            else:
+                self._items[key] = (item, queued[1])
+                self._counts['coalesced'] += 1
+            self._cond.notify_all()
+            return True
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._items:
+                self._cond.wait()
+            # Give a burst a moment to fill the batch
+            give_up_at = time.monotonic() + self.linger
+            while len(self._items) < self.batch_size:
+                remaining = give_up_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            while self._items and len(batch) < self.batch_size:
+                key, (item, enqueued) = self._items.popitem(last=False)
+                self._in_flight.add(key)
+                batch.append((key, item, enqueued))
+            return batch
+
+    def _write(self, batch):
+        """Write ``batch``; returns the (written, dropped) entries"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.writer([item for _, item, _ in batch])
+                return batch, []
+            except self.permanent_errors as e:
+                if len(batch) == 1:
+                    print(f"{self.name}: dropping {batch[0][0]!r}, which cannot be written: {e}")
+                    return [], batch
+                with self._cond:
+                    self._counts['splits'] += 1
+                half = len(batch) // 2
+                written, dropped = self._write(batch[:half])
+                more_written, more_dropped = self._write(batch[half:])
+                return written + more_written, dropped + more_dropped
+            except Exception as e:
+                print(f"{self.name}: writing {len(batch)} item(s) failed (attempt {attempt + 1}): {e}")
+                if attempt < self.max_retries:
+                    with self._cond:
+                        self._counts['retries'] += 1
+                    time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)))
+        print(f"{self.name}: dropping {len(batch)} item(s) after {self.max_retries + 1} attempts: "
+              f"{[key for key, _, _ in batch]}")
+        return [], batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            written, dropped = self._write(batch)
+            with self._cond:
+                for key, _, _ in batch:
+                    self._in_flight.discard(key)
+                if written:
+                    lag = time.monotonic() - min(enqueued for _, _, enqueued in written)
+                    self._last_lag = lag
+                    self._max_lag = max(self._max_lag, lag)
+                    self._counts['written'] += len(written)
+                    self._counts['batches'] += 1
+                self._counts['dropped'] += len(dropped)
+                self._cond.notify_all()
+
+    def is_pending(self, key):
+        with self._cond:
+            return key in self._items or key in self._in_flight
+
+    def wait_for(self, key, timeout):
+        """Block until ``key`` has been written (or dropped); False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: key not in self._items and key not in self._in_flight, timeout)
+
+    def flush(self, timeout):
+        """Block until everything queued has been written (or dropped); False on timeout"""
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                return True
+            return self._cond.wait_for(lambda: not self._items and not self._in_flight, timeout)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counts)
+            stats['queue_depth'] = len(self._items)
+            stats['in_flight'] = len(self._in_flight)
+            oldest = next(iter(self._items.values()), None)
+            stats['oldest_queued_ms'] = round((time.monotonic() - oldest[1]) * 1000, 1) if oldest else None
+            stats['last_write_lag_ms'] = round(self._last_lag * 1000, 1) if self._last_lag is not None else None
+            stats['max_write_lag_ms'] = round(self._max_lag * 1000, 1)
+        return stats
@@ -1,5 +1,6 @@
 
 
+DROP TABLE IF EXISTS productShelfLife;
 DROP TABLE IF EXISTS usersProducts;
 DROP TABLE IF EXISTS users;
 DROP TABLE IF EXISTS products;
@@ -28,9 +29,21 @@ CREATE TABLE products (
     productLowestPrice FLOAT,
     productHighestPrice FLOAT,
     productCurrency VARCHAR (10),
-    productImages TEXT[]
+    productImages TEXT[],
+    productFetchedAt TIMESTAMPTZ,
+    productEnrichedAt TIMESTAMPTZ,
+    productCategorySource TEXT,
+    productSearch tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(productName, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(productBrand, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(productDescription, '')), 'C')
+    ) STORED
 );
 
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX products_search_idx ON products USING GIN (productSearch);
+CREATE INDEX products_name_trgm_idx ON products USING GIN (productName gin_trgm_ops);
+
 CREATE TABLE usersProducts (
     pantryID SERIAL PRIMARY KEY,
     userID INT NOT NULL,
@@ -43,12 +56,33 @@ CREATE TABLE usersProducts (
     FOREIGN KEY (productUPC) REFERENCES products(productUPC)
 );
 
+CREATE INDEX usersProducts_user_expiration_idx ON usersProducts (userID, expiration_date);
+
+CREATE TABLE productShelfLife (
+    productUPC BIGINT PRIMARY KEY,
+    observations INT NOT NULL DEFAULT 0,
+    totalDays BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (productUPC) REFERENCES products(productUPC)
+);
+
+CREATE FUNCTION notify_pantry_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('pantry_changed', COALESCE(NEW.userID, OLD.userID)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER usersProducts_notify
+    AFTER INSERT OR UPDATE OR DELETE ON usersProducts
+    FOR EACH ROW EXECUTE FUNCTION notify_pantry_changed();
+
 
 
 
 GRANT ALL PRIVILEGES ON TABLE products TO postgres;
 GRANT ALL PRIVILEGES ON TABLE users TO postgres;
 GRANT ALL PRIVILEGES ON TABLE usersProducts TO postgres;
+GRANT ALL PRIVILEGES ON TABLE productShelfLife TO postgres;
 
 -- Also grant privileges on the sequences (for SERIAL columns)
 GRANT USAGE, SELECT ON ALL SEQUENCES IN SCHEMA public TO postgres;
\ No newline at end of file
@@ -22,7 +22,16 @@ const ProductCard = ({ item, onItemClick }) => {
       <div className="delete-icon-container" onClick={handleDeleteClick}>
         <DeleteIcon className="delete-icon" />
       </div>
-      <img src={item.image} alt={item.name} className="product-image" />
+      <img
+        src={item.image}
+        alt={item.name}
+        className="product-image"
+        onError={(e) => {
+          if (item.originalImage && e.currentTarget.src !== item.originalImage) {
+            e.currentTarget.src = item.originalImage;
+          }
+        }}
+      />
       <h3 className="product-name">{item.name}</h3>
       {item.quantity && <p className="product-quantity">{item.quantity}</p>}
       <p className="product-expiry">Expiry: {item.expiry}</p>
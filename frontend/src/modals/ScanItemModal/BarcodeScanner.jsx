@@ -19,7 +19,7 @@ const BarcodeScanner = () => {
   // Validate UPC code format
   const isValidUPC = (code) => {
     const cleanCode = code.replace(/[^\d]/g, "");
-    return /^\d{8}$|^\d{12}$/.test(cleanCode);
+    return /^\d{8}$|^\d{12,14}$/.test(cleanCode);
   };
 
   // Clean UPC code
@@ -8,8 +8,10 @@ import { toggleModal } from "../../redux/actions/modalActions";
 import {
   getUserPantry,
   selectProduct,
+  subscribeToPantryChanges,
 } from "../../redux/actions/productActions";
 import { addSnackbar } from "../../redux/actions/snackbarActions";
+import { API_URL } from "../../data/constants";
 
 import "./LandingPage.css";
 
@@ -71,6 +73,14 @@ const LandingPage = () => {
     }
   }, [dispatch, isAuthenticated, authState]);
 
+  // Keep the pantry live across devices
+  useEffect(() => {
+    if (!isAuthenticated) {
+      return undefined;
+    }
+    return dispatch(subscribeToPantryChanges());
+  }, [dispatch, isAuthenticated]);
+
   // Handle toggling category collapse
   const handleToggleCollapse = (category) => {
     setCollapsedCategories((prev) => ({
@@ -122,8 +132,10 @@ const LandingPage = () => {
       expiry: formattedExpiry,
       image:
         item.productimages && item.productimages.length > 0
-          ? item.productimages[0]
+          ? `${API_URL}/products/${item.productupc}/images/0?w=192`
           : "https://via.placeholder.com/150?text=No+Image",
+      // Loaded directly when the proxy refuses the image's host
+      originalImage: item.productimages?.[0],
       quantity: `${item.quantity} ${item.quantitytype || "items"}`,
       // Store original dates for editing
       purchaseDate: item.date_purchased,
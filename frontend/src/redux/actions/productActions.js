@@ -409,3 +409,113 @@ export const updatePantryItems = (pantryItems) => (dispatch) => {
     })
   );
 };
+
+// Reconnect delay after an open pantry feed drops
+const PANTRY_FEED_RECONNECT_MS = 5000;
+// Pantry refetch interval while the feed is unavailable
+const PANTRY_POLL_MS = 60000;
+// Longest wait before trying the feed again after repeated refusals
+const PANTRY_FEED_MAX_WAIT_MS = 15 * 60000;
+
+/**
+ * @function subscribeToPantryChanges
+ * @description Opens the server-sent pantry change feed and refetches the
+ * pantry whenever it changes on any device. Reconnects with a fresh ticket
+ * after an open feed drops. When the server is busy (503) or the feed cannot
+ * be opened, it polls the pantry every minute instead and tries the feed
+ * again no sooner than Retry-After, waiting twice as long after each refusal.
+ * @returns {Function} unsubscribe - closes the feed
+ */
+export const subscribeToPantryChanges = () => (dispatch, getState) => {
+  let source = null;
+  let retryTimer = null;
+  let pollTimer = null;
+  let refusals = 0;
+  let closed = false;
+
+  const refetch = () => {
+    dispatch(getUserPantry()).catch(() => {});
+  };
+
+  const retryIn = (ms) => {
+    clearTimeout(retryTimer);
+    retryTimer = setTimeout(connect, ms);
+  };
+
+  const fallBackToPolling = (retryAfter) => {
+    refusals += 1;
+    if (!pollTimer) {
+      pollTimer = setInterval(refetch, PANTRY_POLL_MS);
+    }
+    const seconds = Number(retryAfter) || 0;
+    const wait = Math.max(seconds * 1000, PANTRY_POLL_MS) * 2 ** (refusals - 1);
+    retryIn(Math.min(wait, PANTRY_FEED_MAX_WAIT_MS));
+  };
+
+  const stopPolling = () => {
+    if (pollTimer) {
+      clearInterval(pollTimer);
+      pollTimer = null;
+      // Catch up on changes since the last poll
+      refetch();
+    }
+  };
+
+  const connect = () => {
+    const token = getState().userState.loginResult?.token;
+    if (closed || !token || typeof EventSource === "undefined") {
+      return;
+    }
+    fetch(`${API_URL}/pantry/events/ticket`, {
+      method: "POST",
+      headers: { Authorization: `Bearer ${token}`, Accept: "application/json" },
+    })
+      .then((response) => {
+        if (response.status === 503) {
+          fallBackToPolling(response.headers.get("Retry-After"));
+          return null;
+        }
+        return response.json();
+      })
+      .then((data) => {
+        if (closed || !data || !data.success) {
+          return;
+        }
+        let opened = false;
+        source = new EventSource(
+          `${API_URL}/pantry/events?ticket=${encodeURIComponent(data.ticket)}`,
+        );
+        source.addEventListener("ready", () => {
+          opened = true;
+          refusals = 0;
+          stopPolling();
+        });
+        source.addEventListener("pantry-changed", refetch);
+        source.onerror = () => {
+          source.close();
+          source = null;
+          if (opened) {
+            // Tickets are short-lived, so reconnect with a new one
+            retryIn(PANTRY_FEED_RECONNECT_MS);
+          } else {
+            // Refused before it opened, most likely a busy worker's 503,
+            // which EventSource does not expose
+            fallBackToPolling();
+          }
+        };
+      })
+      .catch(() => {
+        fallBackToPolling();
+      });
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    clearInterval(pollTimer);
+    if (source) {
+      source.close();
+    }
+  };
+};
@@ -0,0 +1,9 @@
+-- Shelf life learned from the expiration dates users enter (see record_shelf_life in backend/app.py)
+CREATE TABLE IF NOT EXISTS productShelfLife (
+    productUPC BIGINT PRIMARY KEY,
+    observations INT NOT NULL DEFAULT 0,
+    totalDays BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (productUPC) REFERENCES products(productUPC)
+);
+
+GRANT ALL PRIVILEGES ON TABLE productShelfLife TO postgres;
@@ -0,0 +1,3 @@
+-- Range scans for the expiry endpoints (/api/pantry/expiring, /expired, /calendar)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS usersProducts_user_expiration_idx
+    ON usersProducts (userID, expiration_date);
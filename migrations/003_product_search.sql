@@ -0,0 +1,16 @@
+-- Full-text and trigram search for /api/products/search.
+-- Adding the stored generated column rewrites products once; run off-peak.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS productSearch tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(productName, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(productBrand, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(productDescription, '')), 'C')
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_search_idx
+    ON products USING GIN (productSearch);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_name_trgm_idx
+    ON products USING GIN (productName gin_trgm_ops);
@@ -0,0 +1,5 @@
+-- When each product was last fetched from Go-UPC and last enriched, for the
+-- stale-while-revalidate refresh in lookup_upc. Existing rows start NULL
+-- (stale) and are refreshed in the background as they are scanned.
+ALTER TABLE products ADD COLUMN IF NOT EXISTS productFetchedAt TIMESTAMPTZ;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS productEnrichedAt TIMESTAMPTZ;
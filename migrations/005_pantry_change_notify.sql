@@ -0,0 +1,14 @@
+-- NOTIFY pantry_changed with the userID whenever a user's pantry changes,
+-- however it is written. Workers listen for it to keep that user's reads on
+-- the primary for a moment (read-your-writes with replicas).
+CREATE OR REPLACE FUNCTION notify_pantry_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('pantry_changed', COALESCE(NEW.userID, OLD.userID)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS usersProducts_notify ON usersProducts;
+CREATE TRIGGER usersProducts_notify
+    AFTER INSERT OR UPDATE OR DELETE ON usersProducts
+    FOR EACH ROW EXECUTE FUNCTION notify_pantry_changed();
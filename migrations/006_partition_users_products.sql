@@ -0,0 +1,69 @@
+-- OPTIONAL: hash-partition usersProducts on userID, for databases with many
+-- users. Creates usersProducts_partitioned beside the existing table and a
+-- trigger that mirrors every write into it. Nothing changes for the app
+-- until backend/partition_pantry.py has copied the existing rows and swapped
+-- the tables (see backend/README.md).
+--
+-- Layout: LIST on archived, with the live lots hash-partitioned 16 ways on
+-- userID and archived lots (expired long ago or used up, moved there by
+-- partition_pantry.py archive) kept apart so they never bloat the hot
+-- partitions. Keys must include every partition column, so the primary key
+-- is (pantryID, userID, archived); pantryID stays unique through its sequence.
+
+CREATE TABLE usersProducts_partitioned (
+    pantryID INT NOT NULL DEFAULT nextval('usersproducts_pantryid_seq'),
+    userID INT NOT NULL REFERENCES users(userID),
+    productUPC BIGINT NOT NULL REFERENCES products(productUPC),
+    quantity FLOAT,
+    quantityType VARCHAR(25),
+    date_purchased DATE,
+    expiration_date DATE,
+    archived BOOLEAN NOT NULL DEFAULT false,
+    PRIMARY KEY (pantryID, userID, archived)
+) PARTITION BY LIST (archived);
+
+CREATE TABLE usersProducts_live PARTITION OF usersProducts_partitioned
+    FOR VALUES IN (false) PARTITION BY HASH (userID);
+
+DO $$
+BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE usersProducts_live_%s PARTITION OF usersProducts_live FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+            i, i
+        );
+    END LOOP;
+END $$;
+
+-- Rarely written once archived: pack it and vacuum it less often
+CREATE TABLE usersProducts_archive PARTITION OF usersProducts_partitioned
+    FOR VALUES IN (true)
+    WITH (fillfactor = 100, autovacuum_vacuum_scale_factor = 0.4);
+
+-- Created on every partition
+CREATE INDEX usersProducts_part_user_expiration_idx ON usersProducts_partitioned (userID, expiration_date);
+CREATE INDEX usersProducts_part_user_product_idx ON usersProducts_partitioned (userID, productUPC);
+
+-- No pantry_changed trigger here: the old table's trigger still fires for
+-- every mirrored write. partition_pantry.py swap moves it across.
+
+-- Mirror writes to the old table until the swap
+CREATE OR REPLACE FUNCTION sync_users_products_partitioned() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM usersProducts_partitioned WHERE pantryID = OLD.pantryID AND userID = OLD.userID;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO usersProducts_partitioned
+            (pantryID, userID, productUPC, quantity, quantityType, date_purchased, expiration_date)
+        VALUES
+            (NEW.pantryID, NEW.userID, NEW.productUPC, NEW.quantity, NEW.quantityType, NEW.date_purchased, NEW.expiration_date)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER usersProducts_sync_partitioned
+    AFTER INSERT OR UPDATE OR DELETE ON usersProducts
+    FOR EACH ROW EXECUTE FUNCTION sync_users_products_partitioned();
@@ -0,0 +1,6 @@
+-- Where each product's category came from: 'gpt', 'local' (the local
+-- classifier), 'rules' (load_catalog.py --categorize), 'fallback' ("Other"
+-- after a GPT error or an answer outside the list) or 'user'. Only 'gpt'
+-- labels train and evaluate the classifier (backend/train_categorizer.py).
+-- Existing rows start NULL, since their source is unknown.
+ALTER TABLE products ADD COLUMN IF NOT EXISTS productCategorySource TEXT;